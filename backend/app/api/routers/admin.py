@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+from fastapi import APIRouter, Depends, HTTPException, status
+
+from backend import semantic_search
+from backend.app.api.routers.analyses import get_embedding_batcher, get_embedding_cache, get_search_batcher, get_search_executor
+from backend.app.db.models import User
+from backend.app.utils.deps_auth import get_current_user
+
+router = APIRouter(prefix="/api/v1/admin", tags=["admin"])
+
+
+def _require_admin(current_user: User = Depends(get_current_user)) -> User:
+    if current_user.role != "admin":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin role required")
+    return current_user
+
+
+@router.get("/corpus", response_model=dict)
+def get_corpus_status(current_user: User = Depends(_require_admin)) -> dict:
+    return semantic_search.get_load_status()
+
+
+@router.post("/corpus/reload", response_model=dict, status_code=status.HTTP_202_ACCEPTED)
+def reload_corpus(current_user: User = Depends(_require_admin)) -> dict:
+    # 新しい版は裏で組み立て、完了時に差し替える。処理中の分析は旧版のまま完了する
+    semantic_search.start_background_reload()
+    return semantic_search.get_load_status()
+
+
+@router.post("/corpus/deltas/refresh", response_model=dict)
+def refresh_corpus_deltas(current_user: User = Depends(_require_admin)) -> dict:
+    # 追加された差分セグメントだけを取り込む（全体の再読み込みは行わない）
+    semantic_search.refresh_deltas()
+    return semantic_search.get_load_status()
+
+
+@router.post("/corpus/compact", response_model=dict)
+def compact_corpus(current_user: User = Depends(_require_admin)) -> dict:
+    semantic_search.compact_segments()
+    return semantic_search.get_load_status()
+
+
+@router.get("/embedding-cache", response_model=dict)
+def get_embedding_cache_stats(current_user: User = Depends(_require_admin)) -> dict:
+    return {**get_embedding_cache().stats(), "batching": get_embedding_batcher().stats()}
+
+
+@router.get("/result-cache", response_model=dict)
+def get_result_cache_stats(current_user: User = Depends(_require_admin)) -> dict:
+    return semantic_search.get_result_cache_stats()
+
+
+@router.get("/search-executor", response_model=dict)
+def get_search_executor_stats(current_user: User = Depends(_require_admin)) -> dict:
+    return {**get_search_executor().stats(), "batching": get_search_batcher().stats()}
+
+
+__all__ = ["router"]
@@ -1,27 +1,48 @@
 from __future__ import annotations
 
+import asyncio
+import hashlib
 import json
+import logging
 import os
+import unicodedata
+from contextlib import contextmanager
+from dataclasses import dataclass
 from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
-from typing import Any
+from typing import Any, AsyncIterator, Iterator
 
+import httpx
 import numpy as np
-from fastapi import APIRouter, Depends, HTTPException, status
-from openai import OpenAI
+import openai
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy import select
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, sessionmaker
+from starlette.concurrency import run_in_threadpool
 
 from backend import semantic_search
-from backend.app.db.deps import get_db
+from backend.app.core.config import get_settings
+from backend.app.db.deps import get_db, get_session_factory
 from backend.app.db.models import AnalysisHistory, User
 from backend.app.schemas.analyses import (
+    AnalysisBatchRequest,
+    AnalysisBatchResponse,
     AnalysisRequest,
     AnalysisResponse,
     HistoryItemResponse,
     SaveAnalysisRequest,
 )
 from backend.app.utils.deps_auth import get_current_user
+from backend.search.embedding_batcher import EmbeddingBatcher
+from backend.search.embedding_cache import EmbeddingCache
+from backend.search.embedding_providers import EmbeddingProvider, EmbeddingProviderError, create_provider
+from backend.search.executor import DeadlineExceededError, ExecutorSaturatedError, SearchExecutor
+from backend.search.micro_batcher import BatchDeadlineError, BatcherSaturatedError
+from backend.search.search_batcher import SearchBatcher
+from backend.search.singleflight import SingleFlight
+from backend.search.filters import SearchFilters
 
 try:
     from dotenv import load_dotenv
@@ -30,33 +51,257 @@ except ImportError:  # pragma: no cover
 
 
 router = APIRouter(prefix="/api/v1", tags=["analyses"])
+logger = logging.getLogger(__name__)
+
+CORPUS_RETRY_AFTER_SECONDS = 10
+# 検索の実行器が混み合っている場合に再試行を促すまでの秒数
+SEARCH_RETRY_AFTER_SECONDS = 1
+# Embeddings API の1リクエストあたりの入力数の上限
+EMBEDDING_BATCH_SIZE = 1024
+# 埋め込みを計算できない場合に語彙検索だけで続ける例外（プロバイダ・ネットワークの障害）。それ以外は不具合として 500 にする
+EMBEDDING_FAILURES = (EmbeddingProviderError, openai.OpenAIError, httpx.HTTPError, asyncio.TimeoutError)
 
 if load_dotenv is not None:  # pragma: no cover - best effort
     env_path = Path(__file__).resolve().parents[3] / "backend" / ".env"
     load_dotenv(env_path)  # type: ignore[arg-type]
 
 
-def _get_openai_client() -> OpenAI:
+# アプリの寿命の間使い回す埋め込みプロバイダ（OpenAI の場合は接続プールと keep-alive を共有する）
+_embedding_provider: EmbeddingProvider | None = None
+_embedding_provider_key: tuple | None = None
+# 差し替えた古いプロバイダを閉じるタスク（完了まで参照を保持する）
+_retiring_providers: set[asyncio.Task] = set()
+
+
+def _retire_embedding_provider(provider: EmbeddingProvider) -> None:
+    """差し替えた古いプロバイダの接続を閉じる。イベントループ上ではリクエストを待たせないよう裏で閉じる。"""
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        asyncio.run(provider.aclose())
+        return
+    task = loop.create_task(provider.aclose())
+    _retiring_providers.add(task)
+    task.add_done_callback(_retiring_providers.discard)
+
+
+def _get_embedding_provider() -> EmbeddingProvider:
+    """
+    `Settings.embedding_provider` で選んだプロバイダを返す。API キーまたはプロバイダの設定が変わった場合は作り直し、
+    古いプロバイダの接続プールを閉じる。
+    """
+    global _embedding_provider, _embedding_provider_key
+    settings = get_settings()
     api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="OPENAI_API_KEY is not configured",
+    key = (
+        api_key,
+        settings.embedding_provider,
+        settings.embedding_model,
+        settings.embedding_dim,
+        settings.embedding_base_url,
+        settings.openai_max_connections,
+        settings.openai_max_keepalive,
+        settings.openai_timeout_seconds,
+    )
+    if _embedding_provider is None or _embedding_provider_key != key:
+        try:
+            provider = create_provider(
+                settings.embedding_provider,
+                model=settings.embedding_model,
+                dim=settings.embedding_dim,
+                api_key=api_key,
+                base_url=settings.embedding_base_url or None,
+                max_connections=settings.openai_max_connections,
+                max_keepalive=settings.openai_max_keepalive,
+                timeout=settings.openai_timeout_seconds,
+                max_inputs=EMBEDDING_BATCH_SIZE,
+            )
+        except EmbeddingProviderError as exc:
+            raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(exc)) from exc
+        previous = _embedding_provider
+        _embedding_provider, _embedding_provider_key = provider, key
+        if previous is not None:
+            _retire_embedding_provider(previous)
+    return _embedding_provider
+
+
+async def close_embedding_provider() -> None:
+    global _embedding_provider, _embedding_provider_key
+    if _embedding_provider is not None:
+        await _embedding_provider.aclose()
+        _embedding_provider = _embedding_provider_key = None
+    if _retiring_providers:
+        await asyncio.gather(*_retiring_providers, return_exceptions=True)
+
+
+def _corpus_unavailable(detail: str | None = None) -> HTTPException:
+    corpus = semantic_search.get_load_status()
+    if corpus.get("status") == "failed":
+        return HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"参照データの読み込みに失敗しました: {corpus.get('error') or detail}",
         )
-    return OpenAI(api_key=api_key)
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="参照データを読み込み中です。しばらくしてから再試行してください。",
+        headers={"Retry-After": str(CORPUS_RETRY_AFTER_SECONDS)},
+    )
+
+
+@lru_cache(maxsize=1)
+def get_embedding_cache() -> EmbeddingCache:
+    settings = get_settings()
+    return EmbeddingCache(
+        settings.embedding_cache_path or None,
+        memory_items=settings.embedding_cache_items,
+        disk_max_bytes=settings.embedding_cache_max_mb * 1024 * 1024,
+    )
+
+
+@lru_cache(maxsize=1)
+def get_embedding_batcher() -> EmbeddingBatcher:
+    # 呼び出し時に参照し直すため、テストなどで差し替えた `_request_embeddings` も使われる
+    return EmbeddingBatcher(
+        lambda provider, texts: _request_embeddings(provider, texts),
+        max_batch=EMBEDDING_BATCH_SIZE,
+        max_wait=get_settings().embedding_batch_wait_ms / 1000,
+    )
+
+
+@lru_cache(maxsize=1)
+def get_search_executor() -> SearchExecutor:
+    settings = get_settings()
+    return SearchExecutor(max_workers=settings.search_workers, max_queue=settings.search_queue_depth)
 
 
-def _compute_embedding(client: OpenAI, text: str) -> np.ndarray:
-    response = client.embeddings.create(
-        model="text-embedding-3-small",
-        input=text,
+def _search_saturated() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="検索が混み合っています。しばらくしてから再試行してください。",
+        headers={"Retry-After": str(SEARCH_RETRY_AFTER_SECONDS)},
     )
-    embedding = response.data[0].embedding
-    return np.asarray(embedding, dtype="float32")
 
 
-def _store_history(
-    db: Session,
+def _search_timed_out() -> HTTPException:
+    return HTTPException(status_code=status.HTTP_504_GATEWAY_TIMEOUT, detail="検索が制限時間内に終わりませんでした。")
+
+
+async def _run_search(fn, *args, search_timeout: float | None = None, **kwargs):
+    """
+    類似度計算を検索専用の実行器で行う。混み合っている場合は待たせずに 503、
+    `search_timeout`（既定は `Settings.search_timeout_seconds`）秒以内に終わらない場合は 504 を返す。
+    """
+    timeout = get_settings().search_timeout_seconds if search_timeout is None else search_timeout
+    try:
+        return await get_search_executor().run(fn, *args, timeout=timeout, **kwargs)
+    except ExecutorSaturatedError as exc:
+        raise _search_saturated() from exc
+    except DeadlineExceededError as exc:
+        raise _search_timed_out() from exc
+
+
+@dataclass(frozen=True)
+class _SearchQuery:
+    vec_overview: np.ndarray
+    vec_situation: np.ndarray
+    filters: SearchFilters | None
+    query_text: str
+
+
+async def _search_queries(queries: list[_SearchQuery], timeout: float | None = None) -> list[dict]:
+    """
+    同時に届いた分析のクエリを1回の行列積で検索する（1件だけの場合はそのまま検索する）。
+    `timeout` はバッチ内で最も早いリクエストの期限までの残り秒数。
+    """
+    if len(queries) == 1:
+        query = queries[0]
+        result = await _run_search(
+            semantic_search.analyze_similarity,
+            query.vec_overview,
+            query.vec_situation,
+            search_timeout=timeout,
+            filters=query.filters,
+            query_text=query.query_text,
+        )
+        return [result]
+    return await _run_search(
+        semantic_search.analyze_similarity_batch,
+        np.stack([query.vec_overview for query in queries]),
+        np.stack([query.vec_situation for query in queries]),
+        search_timeout=timeout,
+        filters=[query.filters for query in queries],
+        query_texts=[query.query_text for query in queries],
+    )
+
+
+@lru_cache(maxsize=1)
+def get_search_batcher() -> SearchBatcher:
+    settings = get_settings()
+    # 呼び出し時に参照し直すため、テストなどで差し替えた `_search_queries` も使われる
+    # まとめ待ちの件数は実行器の待ち行列と同じ上限にする（計算の枠は実行器のワーカー数に揃える）
+    return SearchBatcher(
+        lambda queries, timeout: _search_queries(queries, timeout),
+        max_batch=settings.search_batch_max,
+        max_wait=settings.search_batch_wait_ms / 1000,
+        max_concurrency=settings.search_workers,
+        max_pending=settings.search_queue_depth,
+    )
+
+
+async def _submit_search(query: _SearchQuery) -> dict:
+    """
+    同時に届いた他の分析とまとめて検索する。期限（`Settings.search_timeout_seconds`）はまとめ待ちを含めて登録時から数え、
+    まとめ待ちが上限に達している場合は待たせずに 503 を返す。
+    """
+    try:
+        return await get_search_batcher().submit(query, timeout=get_settings().search_timeout_seconds)
+    except BatcherSaturatedError as exc:
+        raise _search_saturated() from exc
+    except BatchDeadlineError as exc:
+        raise _search_timed_out() from exc
+
+
+async def _request_embeddings(provider: EmbeddingProvider, texts: list[str]) -> np.ndarray:
+    """プロバイダで埋め込み、(テキスト数 × 次元数) の行列で返す。"""
+    return np.asarray(await provider.embed(texts), dtype="float32")
+
+
+async def _compute_embeddings(provider: EmbeddingProvider, texts: list[str]) -> np.ndarray:
+    """
+    複数のテキストをまとめて埋め込み、(テキスト数 × 次元数) の行列で返す。
+    キャッシュ（キーはプロバイダのモデル名とテキスト）にあるテキストは API に送らず、残りは同時に届いた他のリクエストの分とまとめて
+    1回の呼び出しで計算する（このリクエストのテキストは必ず同じ呼び出しに入る）。
+    キャッシュのディスク側（SQLite）の読み書きはスレッドプールで行う。
+    """
+    cache = get_embedding_cache()
+    cached = await run_in_threadpool(cache.get_many, provider.model, texts)
+    missing = list(dict.fromkeys(text for text, vector in zip(texts, cached) if vector is None))
+    if missing:
+        computed = dict(zip(missing, await get_embedding_batcher().embed(provider, missing)))
+        await run_in_threadpool(cache.put_many, provider.model, missing, np.stack(list(computed.values())))
+        cached = [vector if vector is not None else computed[text] for text, vector in zip(texts, cached)]
+    return np.stack(cached).astype("float32", copy=False)
+
+
+def _search_filters(request: AnalysisRequest) -> SearchFilters | None:
+    """リクエストの絞り込み条件を検索用の条件に変換する（重複した値は1つにまとめる）。"""
+    filters = request.filters
+    if filters is None:
+        return None
+    return SearchFilters(
+        ministries=tuple(dict.fromkeys(filters.ministries)),
+        fiscal_years=tuple(dict.fromkeys(filters.fiscalYears)),
+        budget_min=filters.budgetMin,
+        budget_max=filters.budgetMax,
+    )
+
+
+def _lexical_query(request: AnalysisRequest) -> str:
+    """語彙検索に使う文字列（参照データの事業名・事業の概要に対応する項目）。"""
+    return f"{request.projectName}\n{request.projectOverview}"
+
+
+def _new_history(
     *,
     project_name: str,
     project_overview: str,
@@ -64,8 +309,8 @@ def _store_history(
     initial_budget: float | None,
     estimated_budget: float | None,
     references: list[dict[str, Any]] | None,
-) -> int:
-    history = AnalysisHistory(
+) -> AnalysisHistory:
+    return AnalysisHistory(
         project_name=project_name,
         project_overview=project_overview,
         current_situation=current_situation,
@@ -73,12 +318,23 @@ def _store_history(
         estimated_budget=estimated_budget,
         references_json=json.dumps(references or [], ensure_ascii=False),
     )
+
+
+def _store_history(db: Session, **fields: Any) -> int:
+    history = _new_history(**fields)
     db.add(history)
     db.commit()
     db.refresh(history)
     return history.id
 
 
+def _store_histories(db: Session, histories: list[AnalysisHistory]) -> list[int | None]:
+    # 履歴はまとめて1回のコミットで保存する
+    db.add_all(histories)
+    db.commit()
+    return [history.id for history in histories]
+
+
 def _serialize_history(item: AnalysisHistory) -> HistoryItemResponse:
     references: list[dict[str, Any]]
     if item.references_json:
@@ -103,46 +359,294 @@ def _serialize_history(item: AnalysisHistory) -> HistoryItemResponse:
     )
 
 
+def _analysis_key(user: User, payload: AnalysisRequest) -> str:
+    """同じ利用者の同じ内容の分析（NFKC 正規化・前後の空白を除いた入力と条件）に共通のキー。"""
+    filters = payload.filters
+    content = {
+        "user": user.id,
+        "projectName": _normalize_text(payload.projectName),
+        "projectOverview": _normalize_text(payload.projectOverview),
+        "currentSituation": _normalize_text(payload.currentSituation),
+        "initialBudget": payload.initialBudget,
+        "filters": None
+        if filters is None
+        else {
+            "ministries": sorted(set(filters.ministries)),
+            "fiscalYears": sorted(set(filters.fiscalYears)),
+            "budgetMin": filters.budgetMin,
+            "budgetMax": filters.budgetMax,
+        },
+    }
+    return hashlib.sha256(json.dumps(content, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def _normalize_text(text: str) -> str:
+    return unicodedata.normalize("NFKC", text).strip()
+
+
+@lru_cache(maxsize=1)
+def get_analysis_flights() -> SingleFlight:
+    return SingleFlight(linger=get_settings().analysis_dedup_seconds)
+
+
 @router.post("/analyses", response_model=AnalysisResponse)
-def create_analysis(
+async def create_analysis(
     payload: AnalysisRequest,
-    db: Session = Depends(get_db),
+    sessions: sessionmaker = Depends(get_session_factory),
     current_user: User = Depends(get_current_user),
 ) -> AnalysisResponse:
-    client = _get_openai_client()
+    """
+    同じ内容の分析が同時に届いた場合（二重クリック・再送）は1回だけ計算・保存し、
+    全員に同じ結果（同じ `history_id`）を返す。
+    相乗りした処理は最初の呼び出し元が切断しても続くため、リクエストの DB セッションは借りずに自分で開く。
+    """
+    if not semantic_search.is_ready():
+        raise _corpus_unavailable()
+
+    provider = _get_embedding_provider()
+    response, _ = await get_analysis_flights().do(
+        _analysis_key(current_user, payload), lambda: _analyze(payload, sessions, provider)
+    )
+    return response.model_copy(update={"request_data": payload}, deep=True)
+
+
+async def _embed_payload(
+    provider: EmbeddingProvider, payload: AnalysisRequest
+) -> tuple[np.ndarray | None, np.ndarray | None, Exception | None]:
+    """事業概要と現状・課題を1回の呼び出しで埋め込む。失敗した場合はベクトルの代わりに例外を返す。"""
     try:
-        query_vec_overview = _compute_embedding(client, payload.projectOverview)
-        query_vec_situation = _compute_embedding(client, payload.currentSituation)
-    except Exception as exc:  # pragma: no cover - network / client errors
-        raise HTTPException(status_code=500, detail=f"Failed to compute embeddings: {exc}") from exc
+        query_vec_overview, query_vec_situation = await _compute_embeddings(
+            provider, [payload.projectOverview, payload.currentSituation]
+        )
+    except EMBEDDING_FAILURES as exc:
+        # 埋め込みを計算できない場合は語彙検索だけで結果を返す
+        logger.warning("embedding failed, falling back to lexical search: %r", exc)
+        return None, None, exc
+    return query_vec_overview, query_vec_situation, None
 
+
+@contextmanager
+def _search_errors(embedding_error: Exception | None) -> Iterator[None]:
+    """
+    類似度計算の失敗を HTTP エラーにする（503/504 などの HTTPException はそのまま）。
+    埋め込みに失敗して語彙検索も使えなかった場合は、埋め込みの失敗を原因として返す。
+    """
     try:
-        result = semantic_search.analyze_similarity(query_vec_overview, query_vec_situation)
+        yield
+    except HTTPException:
+        raise
+    except semantic_search.CorpusNotReadyError as exc:
+        raise _corpus_unavailable(str(exc)) from exc
+    except ValueError as exc:
+        if embedding_error is not None:
+            raise HTTPException(
+                status_code=500, detail=f"Failed to compute embeddings: {embedding_error}"
+            ) from embedding_error
+        raise HTTPException(status_code=500, detail=str(exc)) from exc
     except Exception as exc:  # pragma: no cover - semantic search errors
         raise HTTPException(status_code=500, detail=str(exc)) from exc
 
-    references = result.get("similar_projects", []) if isinstance(result, dict) else []
-    estimated_budget = result.get("predicted_budget") if isinstance(result, dict) else None
 
-    initial_budget = payload.initialBudget if payload.initialBudget is not None else None
-    history_id = _store_history(
+async def _search_payload(
+    payload: AnalysisRequest,
+    query_vec_overview: np.ndarray | None,
+    query_vec_situation: np.ndarray | None,
+    embedding_error: Exception | None,
+) -> dict:
+    with _search_errors(embedding_error):
+        if query_vec_overview is None:
+            result = await _run_search(
+                semantic_search.analyze_similarity,
+                None,
+                None,
+                filters=_search_filters(payload),
+                query_text=_lexical_query(payload),
+            )
+        else:
+            # 同時に届いた他の分析とまとめて1回の行列積で検索する
+            result = await _submit_search(
+                _SearchQuery(query_vec_overview, query_vec_situation, _search_filters(payload), _lexical_query(payload))
+            )
+    return result if isinstance(result, dict) else {}
+
+
+async def _store_payload_history(db: Session, payload: AnalysisRequest, result: dict) -> int:
+    return await run_in_threadpool(
+        _store_history,
         db,
         project_name=payload.projectName,
         project_overview=payload.projectOverview,
         current_situation=payload.currentSituation,
-        initial_budget=initial_budget,
-        estimated_budget=estimated_budget,
-        references=references,
+        initial_budget=payload.initialBudget,
+        estimated_budget=result.get("predicted_budget"),
+        references=result.get("similar_projects", []),
     )
 
-    response = AnalysisResponse(
+
+def _analysis_response(payload: AnalysisRequest, result: dict, history_id: int | None) -> AnalysisResponse:
+    return AnalysisResponse(
         request_data=payload,
-        references=references,
-        estimated_budget=estimated_budget,
-        initial_budget=initial_budget,
+        references=result.get("similar_projects", []),
+        estimated_budget=result.get("predicted_budget"),
+        initial_budget=payload.initialBudget,
         history_id=history_id,
+        corpus_version=result.get("corpus_version"),
+        retrieval_mode=result.get("retrieval_mode"),
+        matched_count=result.get("matched_rows"),
+        ministry_facets=result.get("ministry_facets", {}),
+    )
+
+
+async def _analyze(
+    payload: AnalysisRequest, sessions: sessionmaker, provider: EmbeddingProvider
+) -> AnalysisResponse:
+    """
+    埋め込みの計算はイベントループ上で待ち、類似度計算は検索専用の実行器、DB への保存は
+    スレッドプールに明示的に渡す。待っている間はワーカーが他のリクエストを処理できる。
+    履歴は `sessions` から開いたこの処理専用のセッションで保存する。
+    """
+    query_vec_overview, query_vec_situation, embedding_error = await _embed_payload(provider, payload)
+    result = await _search_payload(payload, query_vec_overview, query_vec_situation, embedding_error)
+    db = sessions()
+    try:
+        history_id = await _store_payload_history(db, payload, result)
+    finally:
+        await run_in_threadpool(db.close)
+    return _analysis_response(payload, result, history_id)
+
+
+def _format_event(event: str, data: dict, sse: bool) -> str:
+    body = json.dumps(data, ensure_ascii=False, default=str)
+    if sse:
+        return f"event: {event}\ndata: {body}\n\n"
+    return json.dumps({"event": event, **data}, ensure_ascii=False, default=str) + "\n"
+
+
+async def _analysis_events(
+    payload: AnalysisRequest, db: Session, provider: EmbeddingProvider, sse: bool
+) -> AsyncIterator[str]:
+    """
+    分析の進み具合と結果を順に送る。類似事業は検索が終わった時点で送り、推定予算・履歴 ID はその後に送る。
+    途中で失敗した場合は `error`（HTTP のステータスと詳細）を送って終わる。
+    """
+    try:
+        yield _format_event("embedding", {}, sse)
+        query_vec_overview, query_vec_situation, embedding_error = await _embed_payload(provider, payload)
+        # `_search_payload` は常にクエリ文字列を渡すため、埋め込みがあれば統合検索、無ければ語彙検索だけになる
+        retrieval = semantic_search.retrieval_mode(query_vec_overview is not None, has_text=True)
+        yield _format_event("searching", {"retrieval": retrieval}, sse)
+        result = await _search_payload(payload, query_vec_overview, query_vec_situation, embedding_error)
+        yield _format_event(
+            "references",
+            {
+                "references": result.get("similar_projects", []),
+                "corpus_version": result.get("corpus_version"),
+                "retrieval_mode": result.get("retrieval_mode"),
+                "matched_count": result.get("matched_rows"),
+                "ministry_facets": result.get("ministry_facets", {}),
+            },
+            sse,
+        )
+        yield _format_event(
+            "budget",
+            {"estimated_budget": result.get("predicted_budget"), "initial_budget": payload.initialBudget},
+            sse,
+        )
+        history_id = await _store_payload_history(db, payload, result)
+        yield _format_event("history", {"history_id": history_id}, sse)
+        yield _format_event("done", _analysis_response(payload, result, history_id).model_dump(mode="json"), sse)
+    except HTTPException as exc:
+        yield _format_event("error", {"status": exc.status_code, "detail": exc.detail}, sse)
+    except Exception:
+        # ステータスは送信済みのため、想定外の失敗も `error` で伝えてからストリームを閉じる
+        logger.exception("analysis stream failed")
+        yield _format_event(
+            "error", {"status": status.HTTP_500_INTERNAL_SERVER_ERROR, "detail": "分析中にエラーが発生しました。"}, sse
+        )
+
+
+@router.post("/analyses:stream")
+async def stream_analysis(
+    payload: AnalysisRequest,
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+) -> StreamingResponse:
+    """
+    `/api/v1/analyses` の逐次送信版。`Accept: text/event-stream` の場合は SSE、それ以外は NDJSON
+    （1行1イベント、`event` に embedding / searching / references / budget / history / done / error）で返す。
+    参照データの読み込み中などリクエスト時点で分かるエラーは通常の HTTP エラーで返す。
+    """
+    if not semantic_search.is_ready():
+        raise _corpus_unavailable()
+
+    provider = _get_embedding_provider()
+    sse = "text/event-stream" in request.headers.get("accept", "")
+    return StreamingResponse(
+        _analysis_events(payload, db, provider, sse),
+        media_type="text/event-stream" if sse else "application/x-ndjson",
+        # プロキシにバッファリングさせず、イベントをすぐ届ける
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
-    return response
+
+
+@router.post("/analyses:batch", response_model=AnalysisBatchResponse)
+async def create_analyses_batch(
+    payload: AnalysisBatchRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+) -> AnalysisBatchResponse:
+    """
+    複数の案をまとめて分析する（埋め込みは1回の API 呼び出し、類似度は1回の行列積で計算する）。
+    語彙検索は `hybrid` を指定した場合と、埋め込みを計算できなかった場合だけ使う。
+    """
+    if not semantic_search.is_ready():
+        raise _corpus_unavailable()
+
+    items = payload.items
+    provider = _get_embedding_provider()
+    embedding_error: Exception | None = None
+    try:
+        # 事業概要と現状・課題を1回の呼び出しで埋め込み、前半・後半に分ける
+        vectors = await _compute_embeddings(
+            provider,
+            [item.projectOverview for item in items] + [item.currentSituation for item in items],
+        )
+    except EMBEDDING_FAILURES as exc:
+        # 埋め込みを計算できない場合は語彙検索だけで結果を返す
+        logger.warning("embedding failed, falling back to lexical search: %r", exc)
+        embedding_error = exc
+        vectors = None
+
+    with _search_errors(embedding_error):
+        results = await _run_search(
+            semantic_search.analyze_similarity_batch,
+            vectors[: len(items)] if vectors is not None else None,
+            vectors[len(items) :] if vectors is not None else None,
+            filters=[_search_filters(item) for item in items],
+            query_texts=[_lexical_query(item) for item in items] if payload.hybrid or vectors is None else None,
+        )
+
+    history_ids: list[int | None] = [None] * len(items)
+    if payload.saveHistory:
+        histories = [
+            _new_history(
+                project_name=item.projectName,
+                project_overview=item.projectOverview,
+                current_situation=item.currentSituation,
+                initial_budget=item.initialBudget,
+                estimated_budget=result.get("predicted_budget"),
+                references=result.get("similar_projects", []),
+            )
+            for item, result in zip(items, results)
+        ]
+        history_ids = await run_in_threadpool(_store_histories, db, histories)
+
+    responses = [
+        _analysis_response(item, result, history_id) for item, result, history_id in zip(items, results, history_ids)
+    ]
+    corpus_version = results[0].get("corpus_version") if results else None
+    return AnalysisBatchResponse(results=responses, corpus_version=corpus_version)
 
 
 @router.post("/save_analysis", response_model=dict)
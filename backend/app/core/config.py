@@ -21,6 +21,35 @@ class Settings:
     jwt_secret_key: str = os.getenv("JWT_SECRET_KEY", "change-me")
     jwt_algorithm: str = os.getenv("JWT_ALGORITHM", "HS256")
     access_token_expire_minutes: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "60"))
+    # クエリ埋め込みのキャッシュ（空文字でディスク側を無効化し、プロセス内の LRU だけを使う）
+    embedding_cache_path: str = os.getenv(
+        "EMBEDDING_CACHE_PATH", str(_BASE_DIR / "backend" / "embedding_cache.sqlite3")
+    )
+    embedding_cache_items: int = int(os.getenv("EMBEDDING_CACHE_ITEMS", "2048"))
+    embedding_cache_max_mb: int = int(os.getenv("EMBEDDING_CACHE_MAX_MB", "256"))
+    # クエリ埋め込みの提供元: openai / http（OpenAI 互換サーバ・ローカルの代替サーバ） / local（ハッシュ埋め込み）
+    embedding_provider: str = os.getenv("EMBEDDING_PROVIDER", "openai")
+    embedding_model: str = os.getenv("EMBEDDING_MODEL", "text-embedding-3-small")
+    embedding_base_url: str = os.getenv("EMBEDDING_BASE_URL", "")
+    # local プロバイダの次元数（参照データの埋め込みと揃える）
+    embedding_dim: int = int(os.getenv("EMBEDDING_DIM", "1536"))
+    # Embeddings API の HTTP 接続プール（アプリ全体で1つのクライアントを共有する）
+    openai_max_connections: int = int(os.getenv("OPENAI_MAX_CONNECTIONS", "32"))
+    openai_max_keepalive: int = int(os.getenv("OPENAI_MAX_KEEPALIVE", "16"))
+    openai_timeout_seconds: float = float(os.getenv("OPENAI_TIMEOUT_SECONDS", "30"))
+    # 同時に届いたリクエストの埋め込みをまとめて送るまでの最大待ち時間（ミリ秒）
+    embedding_batch_wait_ms: float = float(os.getenv("EMBEDDING_BATCH_WAIT_MS", "5"))
+    # 類似度計算の専用実行器（同時に計算する数・待ち行列の長さ・1件あたりの制限時間）
+    search_workers: int = int(os.getenv("SEARCH_WORKERS", str(min(4, os.cpu_count() or 1))))
+    search_queue_depth: int = int(os.getenv("SEARCH_QUEUE_DEPTH", "32"))
+    search_timeout_seconds: float = float(os.getenv("SEARCH_TIMEOUT_SECONDS", "10"))
+    # 同時に届いた分析のクエリをまとめて1回の行列積で検索するまでの最大待ち時間（ミリ秒、0 で無効）と最大件数
+    search_batch_wait_ms: float = float(os.getenv("SEARCH_BATCH_WAIT_MS", "2"))
+    search_batch_max: int = int(os.getenv("SEARCH_BATCH_MAX", "32"))
+    # 同じ内容の分析の完了後も、再送に同じ結果（同じ履歴）を返す秒数（同時に届いたものは常に相乗りする）
+    analysis_dedup_seconds: float = float(os.getenv("ANALYSIS_DEDUP_SECONDS", "2"))
+    # ワーカーごとの BLAS のスレッド数（0 で変更しない）
+    search_blas_threads: int = int(os.getenv("SEARCH_BLAS_THREADS", "1"))
 
 
 @lru_cache(maxsize=1)
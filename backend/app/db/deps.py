@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from collections.abc import Generator
 
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, sessionmaker
 
 from backend.app.db.base import SessionLocal
 
@@ -15,4 +15,12 @@ def get_db() -> Generator[Session, None, None]:
         db.close()
 
 
-__all__ = ["get_db"]
+def get_session_factory() -> sessionmaker:
+    """
+    リクエストの寿命に縛られないセッションを自分で開く場合のファクトリ
+    （複数のリクエストが相乗りする処理など。開いた側が閉じる）。
+    """
+    return SessionLocal
+
+
+__all__ = ["get_db", "get_session_factory"]
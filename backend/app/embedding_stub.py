@@ -0,0 +1,105 @@
+"""
+Embeddings API のローカル代替サーバ（負荷試験・CI 用）。
+
+OpenAI の `POST /v1/embeddings` と同じ形の応答を返す。ベクトルは `LocalHashProvider`
+（文字 n-gram のハッシュ）で作るため決定的で、応答の遅延と失敗率を指定できる。
+
+    python -m backend.app.embedding_stub --port 8100 --latency-ms 80 --jitter-ms 40 --failure-rate 0.02
+
+分析 API 側は `EMBEDDING_PROVIDER=http EMBEDDING_BASE_URL=http://127.0.0.1:8100/v1` で向け先を切り替える。
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+
+from fastapi import FastAPI, HTTPException
+from pydantic import BaseModel
+
+from backend.search.embedding_providers import DEFAULT_DIM, LocalHashProvider
+
+
+class EmbeddingsRequest(BaseModel):
+    model: str
+    input: str | list[str]
+    encoding_format: str | None = None
+
+
+def create_embedding_stub_app(
+    *,
+    dim: int = DEFAULT_DIM,
+    latency_ms: float = 0.0,
+    jitter_ms: float = 0.0,
+    failure_rate: float = 0.0,
+    failure_status: int = 500,
+    seed: int | None = None,
+) -> FastAPI:
+    """
+    代替サーバのアプリを作る。各リクエストは `latency_ms` ± `jitter_ms` ミリ秒待ってから応答し、
+    `failure_rate` の確率で `failure_status`（500 や 429）を返す。`seed` を指定すると遅延・失敗の列も再現できる。
+    """
+    provider = LocalHashProvider(dim)
+    rng = random.Random(seed)
+    counters = {"requests": 0, "inputs": 0, "failures": 0}
+    app = FastAPI(title="Embeddings API stand-in")
+
+    @app.post("/v1/embeddings")
+    async def create_embeddings(payload: EmbeddingsRequest) -> dict:
+        texts = [payload.input] if isinstance(payload.input, str) else payload.input
+        counters["requests"] += 1
+        delay = max(latency_ms + rng.uniform(-jitter_ms, jitter_ms), 0.0)
+        if delay:
+            await asyncio.sleep(delay / 1000)
+        if failure_rate and rng.random() < failure_rate:
+            counters["failures"] += 1
+            raise HTTPException(status_code=failure_status, detail="simulated failure")
+        counters["inputs"] += len(texts)
+        vectors = provider.embed_sync(texts)
+        return {
+            "object": "list",
+            "model": payload.model,
+            "data": [
+                {"object": "embedding", "index": i, "embedding": vector.tolist()} for i, vector in enumerate(vectors)
+            ],
+            "usage": {"prompt_tokens": sum(len(text) for text in texts), "total_tokens": sum(len(text) for text in texts)},
+        }
+
+    @app.get("/stats")
+    def stats() -> dict:
+        return dict(counters)
+
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Local stand-in for the embeddings API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--dim", type=int, default=DEFAULT_DIM, help="参照データの埋め込みと同じ次元数にする")
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--failure-status", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    import uvicorn
+
+    app = create_embedding_stub_app(
+        dim=args.dim,
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        failure_rate=args.failure_rate,
+        failure_status=args.failure_status,
+        seed=args.seed,
+    )
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+__all__ = ["create_embedding_stub_app"]
+
+
+if __name__ == "__main__":
+    main()
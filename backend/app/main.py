@@ -1,14 +1,22 @@
 from __future__ import annotations
 
-from fastapi import FastAPI
+from fastapi import FastAPI, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 
 from backend import semantic_search
+from backend.app.api.routers.admin import router as admin_router
 from backend.app.api.routers.auth import router as auth_router
-from backend.app.api.routers.analyses import router as analyses_router
+from backend.app.api.routers.analyses import (
+    close_embedding_provider,
+    get_search_executor,
+    router as analyses_router,
+)
 from backend.app.api.routers.cases import router as cases_router
 from backend.app.api.routers.decisions import router as decisions_router
 from backend.app.api.routers.options import router as options_router
+from backend.app.core.config import get_settings
+from backend.search.executor import limit_blas_threads
 
 app = FastAPI(title="Policy Simulation API", version="1.0.0")
 
@@ -34,6 +42,7 @@ app.include_router(decisions_router)
 app.include_router(cases_router)
 app.include_router(options_router)
 app.include_router(analyses_router)
+app.include_router(admin_router)
 
 
 @app.get("/healthz")
@@ -41,6 +50,27 @@ def health_check() -> dict[str, str]:
     return {"status": "ok"}
 
 
+@app.get("/readyz")
+def readiness_check() -> JSONResponse:
+    corpus = semantic_search.get_load_status()
+    ready = semantic_search.is_ready()
+    return JSONResponse(
+        status_code=status.HTTP_200_OK if ready else status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"status": "ready" if ready else "not_ready", "corpus": corpus},
+    )
+
+
 @app.on_event("startup")
 def _load_semantic_data() -> None:
-    semantic_search.load_data_and_vectors()
+    # 同時リクエスト・複数ワーカーの行列積が CPU を奪い合わないよう、ワーカーごとに BLAS のスレッド数を固定する
+    limit_blas_threads(get_settings().search_blas_threads)
+    # 参照データは裏で読み込み、認証・案管理・履歴などは起動直後から応答する
+    semantic_search.start_background_load()
+    semantic_search.start_file_watcher()
+
+
+@app.on_event("shutdown")
+async def _close_clients() -> None:
+    await close_embedding_provider()
+    get_search_executor().shutdown()
+    get_search_executor.cache_clear()
@@ -11,11 +11,19 @@ except Exception:  # pragma: no cover
     ConfigDict = dict  # type: ignore
 
 
+class AnalysisFilters(BaseModel):
+    ministries: list[str] = Field(default_factory=list)
+    fiscalYears: list[int] = Field(default_factory=list)
+    budgetMin: Optional[float] = Field(default=None)
+    budgetMax: Optional[float] = Field(default=None)
+
+
 class AnalysisRequest(BaseModel):
     projectName: str
     projectOverview: str
     currentSituation: str
     initialBudget: Optional[float] = Field(default=None)
+    filters: Optional[AnalysisFilters] = Field(default=None)
 
 
 class AnalysisResponse(BaseModel):
@@ -24,10 +32,31 @@ class AnalysisResponse(BaseModel):
     estimated_budget: Optional[float]
     initial_budget: Optional[float]
     history_id: Optional[int]
+    corpus_version: Optional[str] = None
+    # "hybrid"（語彙検索と埋め込みの統合）/ "dense" / "lexical"（埋め込みを計算できなかった場合）
+    retrieval_mode: Optional[str] = None
+    matched_count: Optional[int] = None
+    ministry_facets: dict[str, int] = Field(default_factory=dict)
 
     model_config = ConfigDict(from_attributes=True)  # type: ignore
 
 
+# `/api/v1/analyses:batch` で1回に受け付ける案の上限
+ANALYSIS_BATCH_MAX_ITEMS = 500
+
+
+class AnalysisBatchRequest(BaseModel):
+    items: list[AnalysisRequest] = Field(min_length=1, max_length=ANALYSIS_BATCH_MAX_ITEMS)
+    saveHistory: bool = Field(default=False)
+    # True の場合は語彙検索（BM25）と埋め込みを統合する。既定は埋め込みだけ（案ごとの語彙検索を省いて大量の案を速く処理する）
+    hybrid: bool = Field(default=False)
+
+
+class AnalysisBatchResponse(BaseModel):
+    results: list[AnalysisResponse]
+    corpus_version: Optional[str] = None
+
+
 class SaveAnalysisRequest(BaseModel):
     projectName: str
     projectOverview: str
@@ -52,8 +81,12 @@ class HistoryItemResponse(BaseModel):
 
 
 __all__ = [
+    "ANALYSIS_BATCH_MAX_ITEMS",
+    "AnalysisFilters",
     "AnalysisRequest",
     "AnalysisResponse",
+    "AnalysisBatchRequest",
+    "AnalysisBatchResponse",
     "SaveAnalysisRequest",
     "HistoryItemResponse",
 ]
@@ -3,6 +3,8 @@ from __future__ import annotations
 import sys
 from pathlib import Path
 
+import pytest
+
 from backend import semantic_search
 
 
@@ -24,4 +26,12 @@ def _noop_load_data() -> None:
     """Stub semantic_search data loading during tests."""
 
 
+_original_load_data = semantic_search.load_data_and_vectors
 semantic_search.load_data_and_vectors = _noop_load_data  # type: ignore[attr-defined]
+
+
+@pytest.fixture()
+def real_corpus_loader(monkeypatch):
+    """Restore the real loader for tests that build a small corpus on disk."""
+    monkeypatch.setattr(semantic_search, "load_data_and_vectors", _original_load_data)
+    return _original_load_data
@@ -0,0 +1,96 @@
+"""
+`POST /api/v1/analyses` の負荷試験。
+
+起動済みの API に同時にリクエストを送り、スループットと遅延の分位点を表示する。
+Embeddings API を呼ばずに試す場合は、ローカルの代替サーバかハッシュ埋め込みに切り替えて起動する。
+
+    python -m backend.app.embedding_stub --port 8100 --latency-ms 80 --jitter-ms 40 --failure-rate 0.01
+    EMBEDDING_PROVIDER=http EMBEDDING_BASE_URL=http://127.0.0.1:8100/v1 uvicorn backend.app.main:app --workers 4
+    python backend/scripts/bench_analyses_api.py --email bench@example.com --password bench-pass --requests 500 --concurrency 32
+
+    # ネットワークなし（EMBEDDING_PROVIDER=local）の場合は代替サーバは不要
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+import httpx
+
+
+def _payload(rng: random.Random, distinct: int) -> dict:
+    n = rng.randrange(distinct)
+    return {
+        "projectName": f"負荷試験 {n}",
+        "projectOverview": f"地域の公共施設の老朽化対策と維持管理の効率化 {n}",
+        "currentSituation": f"点検記録が紙で管理されており更新計画が立てにくい {n}",
+        "initialBudget": 1_000_000 + n,
+    }
+
+
+async def _token(client: httpx.AsyncClient, email: str, password: str) -> str:
+    response = await client.post("/api/v1/auth/login", json={"email": email, "password": password})
+    if response.status_code == 401:
+        response = await client.post(
+            "/api/v1/auth/register", json={"org_name": "bench", "email": email, "password": password}
+        )
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+async def _run(args: argparse.Namespace) -> None:
+    rng = random.Random(args.seed)
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=args.timeout) as client:
+        client.headers["Authorization"] = f"Bearer {await _token(client, args.email, args.password)}"
+        latencies: list[float] = []
+        statuses: dict[int, int] = {}
+        queue: asyncio.Queue = asyncio.Queue()
+        for _ in range(args.requests):
+            queue.put_nowait(_payload(rng, args.distinct))
+
+        async def worker() -> None:
+            while not queue.empty():
+                payload = queue.get_nowait()
+                start = time.perf_counter()
+                try:
+                    code = (await client.post("/api/v1/analyses", json=payload)).status_code
+                except httpx.HTTPError:
+                    code = 0
+                latencies.append(time.perf_counter() - start)
+                statuses[code] = statuses.get(code, 0) + 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    quantiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+    print(f"requests={args.requests} concurrency={args.concurrency} distinct={args.distinct}")
+    print(f"throughput: {args.requests / elapsed:.1f} req/s ({elapsed:.2f} s)")
+    print(
+        f"latency ms: p50={quantiles[49] * 1000:.1f} p90={quantiles[89] * 1000:.1f} "
+        f"p99={quantiles[98] * 1000:.1f} max={latencies[-1] * 1000:.1f}"
+    )
+    print("status:", ", ".join(f"{code}={count}" for code, count in sorted(statuses.items())))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load test POST /api/v1/analyses")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--email", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--distinct", type=int, default=1000, help="異なる入力の種類数（小さいほどキャッシュが効く）")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--seed", type=int, default=0)
+    asyncio.run(_run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+候補を絞ってから正確に採点し直す検索のベンチマーク（recall@5 と1クエリあたりの処理時間を全件検索と比較）。
+
+  - ivf    : IVF インデックス（`--lists` / `--pq` / `--nprobe`）
+  - binary : 符号ビットのハミング距離による前段フィルタ（`--pool`）
+  - truncated : 先頭の次元だけを使った粗い検索（`--truncate-dim` / `--pool`）
+
+合成データはいくつかの話題（クラスタ）のまわりに事業ベクトルを散らしたもの。
+実データで測る場合は `python -m backend.semantic_search eval-index` / `eval-binary` / `eval-truncation` を使う。
+合成データは次元ごとの情報量に偏りが無いため、切り詰めの一致率は実データ（Matryoshka 学習済み）より低く出る。
+
+    python backend/scripts/bench_candidate_search.py ivf --rows 50000 --dim 1536 --lists 256
+    python backend/scripts/bench_candidate_search.py ivf --rows 50000 --lists 256 --pq 96 --nprobe 4 8 16
+    python backend/scripts/bench_candidate_search.py binary --rows 50000 --pool 100 200 400 800
+    python backend/scripts/bench_candidate_search.py truncated --rows 50000 --truncate-dim 256 --pool 100 200 400
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+CURRENT_FILE = Path(__file__).resolve()
+PROJECT_ROOT = CURRENT_FILE.parents[2]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from backend import semantic_search  # noqa: E402
+
+
+def synthetic_corpus(rows: int, dim: int, topics: int, seed: int = 0) -> semantic_search.Corpus:
+    rng = np.random.default_rng(seed)
+    centers_1 = rng.normal(size=(topics, dim)).astype("float32")
+    centers_2 = rng.normal(size=(topics, dim)).astype("float32")
+    labels = rng.integers(0, topics, size=rows)
+    X1 = semantic_search.normalize_rows(centers_1[labels] + rng.normal(scale=1.5, size=(rows, dim)).astype("float32"))
+    X2 = semantic_search.normalize_rows(centers_2[labels] + rng.normal(scale=1.5, size=(rows, dim)).astype("float32"))
+    frame = pd.DataFrame(
+        {
+            "予算事業ID": [f"ID-{i}" for i in range(rows)],
+            "当初予算": rng.lognormal(mean=12, sigma=1.5, size=rows),
+        }
+    )
+    base = semantic_search._make_segment("base", frame, X1, X2, precision="float32")
+    return semantic_search.Corpus(version="synthetic", base=base)
+
+
+def _print_reports(key: str, reports: list[dict]) -> None:
+    print(f"{key:>6} {'recall@5':>9} {'latency':>10} {'speedup':>8}")
+    for report in reports:
+        print(
+            f"{report[key]:>6} {report['recall_at_5']:>9.4f} "
+            f"{report['latency_ms']:>7.2f} ms {report['speedup']:>7.2f}x"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark candidate search + exact re-rank against exact search")
+    parser.add_argument("method", choices=["ivf", "binary", "truncated"])
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--topics", type=int, default=200, help="合成データのクラスタ数")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--lists", type=int, default=128, help="[ivf] リスト数")
+    parser.add_argument("--pq", type=int, default=0, help="[ivf] 残差 PQ の部分空間数（0 で無効）")
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 2, 4, 8, 16], help="[ivf] 調べるリスト数")
+    parser.add_argument("--pool", type=int, nargs="+", default=[100, 200, 400, 800], help="[binary/truncated] 候補数")
+    parser.add_argument("--truncate-dim", type=int, nargs="+", default=[256], help="[truncated] 粗い検索の次元数")
+    args = parser.parse_args()
+
+    corpus = synthetic_corpus(args.rows, args.dim, args.topics)
+    header = f"rows={args.rows} dim={args.dim} float32={corpus.base.X12_n.nbytes / (1 << 20):.1f} MB"
+    started = time.perf_counter()
+    if args.method == "ivf":
+        corpus = semantic_search.with_index(corpus, args.lists, args.pq)
+        index = corpus.base.index
+        print(
+            f"{header} lists={index.n_lists} pq={index.pq_subspaces} "
+            f"build={time.perf_counter() - started:.1f} s index={index.nbytes / (1 << 20):.1f} MB"
+        )
+        _print_reports("nprobe", semantic_search.evaluate_index(corpus, tuple(args.nprobe), args.queries))
+    elif args.method == "truncated":
+        print(header)
+        reports = semantic_search.evaluate_truncation(corpus, tuple(args.truncate_dim), tuple(args.pool), args.queries)
+        print(f"{'dim':>5} {'pool':>6} {'top5 agree':>11} {'latency':>10} {'speedup':>8}")
+        for report in reports:
+            print(
+                f"{report['dim']:>5} {report['pool']:>6} {report['recall_at_5']:>11.4f} "
+                f"{report['latency_ms']:>7.2f} ms {report['speedup']:>7.2f}x"
+            )
+    else:
+        corpus = semantic_search.with_binary(corpus)
+        signs = corpus.base.signs
+        print(f"{header} build={time.perf_counter() - started:.1f} s signs={signs.nbytes / (1 << 20):.2f} MB")
+        _print_reports("pool", semantic_search.evaluate_binary(corpus, tuple(args.pool), args.queries))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+埋め込み列パーサのベンチマーク。
+
+従来の1行ずつの `ast.literal_eval` による変換と
+`backend.search.parsing.parse_embedding_column`（一括トークナイズ・プロセス並列）を比較する。
+
+    python backend/scripts/bench_embedding_parser.py --rows 20000 --dim 1536
+    python backend/scripts/bench_embedding_parser.py --source data/final.parquet
+"""
+
+from __future__ import annotations
+
+import argparse
+import ast
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+CURRENT_FILE = Path(__file__).resolve()
+PROJECT_ROOT = CURRENT_FILE.parents[2]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from backend.search.parsing import parse_embedding_column  # noqa: E402
+
+
+def synthetic_column(rows: int, dim: int, seed: int = 0) -> pd.Series:
+    rng = np.random.default_rng(seed)
+    matrix = rng.normal(scale=0.05, size=(rows, dim)).astype("float32")
+    return pd.Series(["[" + ", ".join(map(repr, row.tolist())) + "]" for row in matrix])
+
+
+def literal_eval_rows(column: pd.Series) -> np.ndarray:
+    """従来の変換（1行ずつ Python のリストにしてから float32 の配列にする）。"""
+    return np.vstack([np.array(ast.literal_eval(value), dtype="float32") for value in column])
+
+
+def load_column(source: Path, column: str, limit: int | None) -> pd.Series:
+    if source.suffix == ".parquet":
+        series = pd.read_parquet(source, columns=[column])[column]
+    else:
+        series = pd.read_csv(source, usecols=[column])[column]
+    return series.iloc[:limit] if limit else series
+
+
+def _timed(label: str, fn) -> tuple[float, object]:
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<32} {elapsed:8.3f} s")
+    return elapsed, result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark embedding column parsers")
+    parser.add_argument("--source", type=Path, default=None, help="実データ（parquet/CSV）のパス")
+    parser.add_argument("--column", default="embedding_sum")
+    parser.add_argument("--rows", type=int, default=5000, help="合成データの行数（--source 指定時は上限）")
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    if args.source is not None:
+        column = load_column(args.source, args.column, args.rows)
+    else:
+        column = synthetic_column(args.rows, args.dim)
+    print(f"rows={len(column)} workers={args.workers}")
+
+    baseline, legacy = _timed("literal_eval + vstack", lambda: literal_eval_rows(column))
+    serial, parsed_serial = _timed("parse_embedding_column (1 proc)", lambda: parse_embedding_column(column, workers=1))
+    parallel, parsed = _timed(
+        f"parse_embedding_column ({args.workers} proc)",
+        lambda: parse_embedding_column(column, workers=args.workers),
+    )
+
+    assert np.array_equal(parsed.matrix, legacy), "parsed matrix differs from literal_eval"
+    assert np.array_equal(parsed_serial.matrix, legacy), "parsed matrix differs from literal_eval"
+    print(f"speedup (1 proc): {baseline / serial:6.1f}x")
+    print(f"speedup ({args.workers} proc): {baseline / parallel:6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+2フィールド類似度のベンチマーク。
+
+従来の2パス（`Q1 @ X1.T` と `Q2 @ X2.T` を別々に計算して ALPHA/BETA で混ぜる）と、
+連結行列 `[X1 | X2]` に `[ALPHA*Q1 | BETA*Q2]` を掛ける1回の行列積を比較する。
+
+    python backend/scripts/bench_fused_scoring.py --rows 50000 --dim 1536
+    python backend/scripts/bench_fused_scoring.py --batch 1 8 32 --precision float32 int8
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+CURRENT_FILE = Path(__file__).resolve()
+PROJECT_ROOT = CURRENT_FILE.parents[2]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from backend import semantic_search  # noqa: E402
+from backend.search import precision as vector_precision  # noqa: E402
+
+
+def _timed(fn, repeat: int) -> float:
+    fn()  # ウォームアップ
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark two-pass vs fused similarity scoring")
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--batch", type=int, nargs="+", default=[1, 16], help="1回に計算するクエリ数")
+    parser.add_argument("--precision", nargs="+", default=["float32"], choices=vector_precision.PRECISIONS)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    X1 = semantic_search.normalize_rows(rng.normal(size=(args.rows, args.dim)).astype("float32"))
+    X2 = semantic_search.normalize_rows(rng.normal(size=(args.rows, args.dim)).astype("float32"))
+    frame = pd.DataFrame(index=range(args.rows))
+    alpha, beta = semantic_search.SCORE_ALPHA, semantic_search.SCORE_BETA
+
+    print(f"rows={args.rows} dim={args.dim} alpha={alpha} beta={beta}")
+    print(f"{'precision':<10} {'batch':>5} {'two-pass':>12} {'fused':>12} {'speedup':>8} {'max |diff|':>11}")
+    for precision in args.precision:
+        fused = semantic_search._make_segment("base", frame, X1.copy(), X2.copy(), precision=precision)
+        if precision == "float32":
+            two_pass = semantic_search.Segment("base", frame, X1, X2)
+        else:
+            # 2パス側も同じ精度で比較する（フィールドごとに量子化した行列を使う）
+            Q1_mat = vector_precision.quantize(X1, precision)
+            Q2_mat = vector_precision.quantize(X2, precision)
+
+        for batch in args.batch:
+            Q1 = semantic_search.normalize_rows(rng.normal(size=(batch, args.dim)).astype("float32"))
+            Q2 = semantic_search.normalize_rows(rng.normal(size=(batch, args.dim)).astype("float32"))
+
+            if precision == "float32":
+                run_two_pass = lambda: semantic_search.two_pass_scores(two_pass, Q1, Q2, alpha, beta)  # noqa: E731
+            else:
+                run_two_pass = lambda: alpha * Q1_mat.dot(Q1) + beta * Q2_mat.dot(Q2)  # noqa: E731
+            run_fused = lambda: semantic_search.blended_scores(fused, Q1, Q2, alpha, beta)  # noqa: E731
+
+            diff = float(np.abs(run_two_pass() - run_fused()).max())
+            t_two = _timed(run_two_pass, args.repeat)
+            t_fused = _timed(run_fused, args.repeat)
+            print(
+                f"{precision:<10} {batch:>5} {t_two * 1000:>9.2f} ms {t_fused * 1000:>9.2f} ms "
+                f"{t_two / t_fused:>7.2f}x {diff:>11.2e}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+ワーカープロセスごとの RSS / PSS を計測し、コーパス行列のメモリマップ共有の効果を確認する（Linux のみ）。
+
+PSS は共有ページを共有プロセス数で按分した値で、ワーカーを増やしたときの実際の
+メモリ増分に相当する。メモリマップ有効時は行列のページがページキャッシュで共有されるため、
+ワーカー数を増やしても PSS の合計はほぼ一定になる。
+
+    python backend/scripts/measure_worker_memory.py --workers 4
+    python backend/scripts/measure_worker_memory.py --workers 4 --no-mmap
+    python backend/scripts/measure_worker_memory.py --synthetic 20000 --workers 4
+    python backend/scripts/measure_worker_memory.py --pids 1234 1235   # 起動中の uvicorn ワーカー
+"""
+
+from __future__ import annotations
+
+import argparse
+import multiprocessing as mp
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+CURRENT_FILE = Path(__file__).resolve()
+PROJECT_ROOT = CURRENT_FILE.parents[2]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from backend import semantic_search  # noqa: E402
+
+_FIELDS = ("Rss", "Pss", "Shared_Clean", "Private_Clean", "Private_Dirty")
+
+
+def read_memory(pid: int) -> dict[str, int]:
+    """/proc/<pid>/smaps_rollup から主要な項目を KiB 単位で読み取る。"""
+    values: dict[str, int] = {}
+    with open(f"/proc/{pid}/smaps_rollup", encoding="ascii") as fh:
+        for line in fh:
+            key, _, rest = line.partition(":")
+            if key in _FIELDS:
+                values[key] = int(rest.split()[0])
+    return values
+
+
+def _worker(data_path: str, mmap: bool, ready, release) -> None:
+    semantic_search.MMAP_VECTORS = mmap
+    semantic_search.AUTO_BUILD_BUNDLE = mmap
+    _, X1, X2 = semantic_search.load_corpus(Path(data_path))
+    # 1回分の全件スキャンで行列の全ページに触れておく
+    query = np.ones(X1.shape[1], dtype=np.float32)
+    _ = X1 @ query + X2 @ query
+    ready.put(mp.current_process().pid)
+    release.wait()
+
+
+def _synthetic_source(rows: int, dim: int, directory: Path) -> Path:
+    rng = np.random.default_rng(0)
+    strings = lambda: ["[" + ",".join(f"{v:.5f}" for v in row) + "]" for row in rng.normal(size=(rows, dim))]  # noqa: E731
+    frame = pd.DataFrame(
+        {
+            "予算事業ID": [str(i) for i in range(rows)],
+            "事業名": [f"事業{i}" for i in range(rows)],
+            "当初予算": rng.uniform(1, 1e6, size=rows),
+            "embedding_sum": strings(),
+            "embedding_ass": strings(),
+        }
+    )
+    path = directory / "final.parquet"
+    frame.to_parquet(path, index=False)
+    return path
+
+
+def _print_table(rows: list[tuple[int, dict[str, int]]]) -> None:
+    print(f"{'pid':>8} " + " ".join(f"{name:>14}" for name in _FIELDS))
+    for pid, values in rows:
+        print(f"{pid:>8} " + " ".join(f"{values.get(name, 0) / 1024:>11.1f} MB" for name in _FIELDS))
+    total_rss = sum(values.get("Rss", 0) for _, values in rows) / 1024
+    total_pss = sum(values.get("Pss", 0) for _, values in rows) / 1024
+    print(f"total RSS: {total_rss:.1f} MB, total PSS: {total_pss:.1f} MB")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure RSS/PSS per worker process")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--source", type=Path, default=None, help="参照データのパス（省略時は既定の探索順）")
+    parser.add_argument("--synthetic", type=int, default=0, help="指定行数の合成データで計測する")
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--no-mmap", action="store_true", help="行列を各プロセスのメモリに読み込む（比較用）")
+    parser.add_argument("--pids", type=int, nargs="*", default=None, help="既存プロセスを計測する")
+    args = parser.parse_args()
+
+    if args.pids:
+        _print_table([(pid, read_memory(pid)) for pid in args.pids])
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.synthetic:
+            data_path = _synthetic_source(args.synthetic, args.dim, Path(tmp))
+        else:
+            data_path = args.source or semantic_search._resolve_data_path()
+
+        mmap = not args.no_mmap
+        if mmap:
+            # 計測前にバンドルを用意しておき、生成コストを計測対象から外す
+            semantic_search.load_corpus(data_path)
+
+        ctx = mp.get_context("spawn")
+        ready = ctx.Queue()
+        release = ctx.Event()
+        procs = [
+            ctx.Process(target=_worker, args=(str(data_path), mmap, ready, release))
+            for _ in range(args.workers)
+        ]
+        for proc in procs:
+            proc.start()
+        try:
+            pids = [ready.get(timeout=1800) for _ in procs]
+            print(f"mode: {'mmap (shared)' if mmap else 'in-memory (private)'}, workers: {args.workers}")
+            _print_table([(pid, read_memory(pid)) for pid in sorted(pids)])
+        finally:
+            release.set()
+            for proc in procs:
+                proc.join()
+
+
+if __name__ == "__main__":
+    main()
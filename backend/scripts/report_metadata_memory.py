@@ -0,0 +1,66 @@
+"""
+参照データのメタデータが占めるメモリを、従来の読み込み方（全列を pandas の既定型で保持）と
+`semantic_search.compact_metadata`（必要な列のみ・カテゴリ型・Arrow 文字列）で比較する。
+
+    python backend/scripts/report_metadata_memory.py
+    python backend/scripts/report_metadata_memory.py --source data/final.parquet
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+CURRENT_FILE = Path(__file__).resolve()
+PROJECT_ROOT = CURRENT_FILE.parents[2]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from backend import semantic_search  # noqa: E402
+
+
+def _read_full(source: Path) -> pd.DataFrame:
+    if source.suffix == ".parquet":
+        return pd.read_parquet(source)
+    return pd.read_csv(source)
+
+
+def _column_bytes(frame: pd.DataFrame) -> dict[str, int]:
+    usage = frame.memory_usage(index=False, deep=True)
+    return {column: int(usage[column]) for column in frame.columns}
+
+
+def _mb(value: int) -> str:
+    return f"{value / (1 << 20):10.2f} MB"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare metadata memory before/after compaction")
+    parser.add_argument("--source", type=Path, default=None, help="参照データのパス（省略時は既定の探索順）")
+    args = parser.parse_args()
+
+    source = args.source or semantic_search._resolve_data_path()
+    full = _read_full(source)
+    compact = semantic_search.compact_metadata(full)
+
+    before = _column_bytes(full)
+    after = _column_bytes(compact)
+    print(f"source: {source} ({len(full)} rows)")
+    print(f"{'column':<24} {'dtype (before)':<16} {'before':>13} {'dtype (after)':<16} {'after':>13}")
+    for column in full.columns:
+        after_dtype = str(compact[column].dtype) if column in compact.columns else "(dropped)"
+        print(
+            f"{column:<24} {str(full[column].dtype):<16} {_mb(before[column])} "
+            f"{after_dtype:<16} {_mb(after.get(column, 0))}"
+        )
+    total_before = sum(before.values())
+    total_after = sum(after.values())
+    print(f"{'total':<24} {'':<16} {_mb(total_before)} {'':<16} {_mb(total_after)}")
+    print(f"reduction: {total_before / max(total_after, 1):.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+バンドル内に保存する派生データ（低精度行列・符号ビット・切り詰め行列・IVF インデックス）の読み込みと作成。
+
+保存済みのものが使えればそれを開き、無い・形状が合わない場合は作り直してバンドルに保存する。
+書き込みは一時ファイル（ディレクトリ）に行ってから置き換えるため、他のワーカーが書き込み途中のものを読むことはない。
+保存できない場合（読み取り専用の配置など）はメモリ上のみで保持する。
+"""
+
+from __future__ import annotations
+
+import os
+import shutil
+from pathlib import Path
+from typing import Callable, Sequence, TypeVar
+
+import numpy as np
+
+T = TypeVar("T")
+
+
+def _staging(path: Path) -> Path:
+    return path.with_name(f"{path.name}.tmp-{os.getpid()}")
+
+
+def _remove(path: Path) -> None:
+    if path.is_dir():
+        shutil.rmtree(path)
+    elif path.exists():
+        path.unlink()
+
+
+def _replace(staging: Path, path: Path) -> None:
+    if staging.is_dir():
+        _remove(path)
+        staging.rename(path)
+    else:
+        os.replace(staging, path)
+
+
+def save_array(array: np.ndarray, path: Path) -> None:
+    with path.open("wb") as fh:
+        np.save(fh, array)
+
+
+def write_atomic(value: T, paths: Sequence[Path], save: Callable[[T, Sequence[Path]], None]) -> None:
+    """
+    `save(value, staging_paths)` で一時パス（ファイルまたはディレクトリ）に書き出してから `paths` の順に置き換える。
+    失敗した場合は一時パスを消して OSError をそのまま送出する。
+    """
+    staging = [_staging(path) for path in paths]
+    try:
+        for path in staging:
+            _remove(path)
+        save(value, staging)
+        for tmp, path in zip(staging, paths):
+            _replace(tmp, path)
+    except OSError:
+        for path in staging:
+            try:
+                _remove(path)
+            except OSError:
+                pass
+        raise
+
+
+def load_or_build(
+    paths: Sequence[Path] | None,
+    build: Callable[[], T],
+    load: Callable[[Sequence[Path], str | None], T | None],
+    save: Callable[[T, Sequence[Path]], None],
+    mmap: bool = True,
+) -> T:
+    """
+    `load(paths, mmap_mode)` で保存済みのものを開き（無い・合わない場合は None を返す）、使えなければ `build()` で作って
+    `write_atomic` で保存する。`mmap` の場合は保存したものを開き直して返す。
+    置き換えは `paths` の順に行うため、読み込みの可否を決めるもの（存在を確かめるファイル）を最後に置く。
+    `paths` が None（バンドルが無い）の場合は作るだけで保存しない。
+    """
+    if paths is None:
+        return build()
+    mode = "r" if mmap else None
+    if all(path.exists() for path in paths):
+        try:
+            existing = load(paths, mode)
+        except (OSError, ValueError):
+            existing = None
+        if existing is not None:
+            return existing
+
+    value = build()
+    try:
+        write_atomic(value, paths, save)
+    except OSError:
+        return value
+    if not mmap:
+        return value
+    reopened = load(paths, mode)
+    return reopened if reopened is not None else value
+
+
+__all__ = ["load_or_build", "save_array", "write_atomic"]
@@ -0,0 +1,105 @@
+"""
+符号ビット（1次元あたり1ビット）で圧縮したベクトルによる前段フィルタ。
+
+各フィールドの値の正負だけを uint64 に詰めて保持し（float32 の 1/32）、
+クエリとのハミング距離（XOR + popcount）で候補を絞り込む。
+絞り込んだ候補は呼び出し側で float32 のベクトルを使って正確に採点し直す。
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+
+from backend.search import artifacts
+
+# ハミング距離を計算する1ブロックあたりの行数（一時配列を小さく保つ）
+BLOCK_ROWS = 8192
+
+if hasattr(np, "bitwise_count"):
+    _popcount = np.bitwise_count
+else:  # pragma: no cover - numpy < 2.0
+    _BYTE_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+    def _popcount(words: np.ndarray) -> np.ndarray:
+        counts = _BYTE_POPCOUNT[words.view(np.uint8)]
+        return counts.reshape(*words.shape, 8).sum(axis=-1, dtype=np.uint8)
+
+
+def pack_signs(X: np.ndarray, block_rows: int = BLOCK_ROWS) -> np.ndarray:
+    """正の要素を 1 とするビット列を uint64 の語に詰める（行数 × ceil(次元数 / 64)）。"""
+    rows, dim = X.shape[0], X.shape[-1]
+    words = -(-dim // 64)
+    packed = np.zeros((rows, words * 8), dtype=np.uint8)
+    for start in range(0, rows, block_rows):
+        bits = np.packbits(np.asarray(X[start : start + block_rows]) > 0, axis=1)
+        packed[start : start + block_rows, : bits.shape[1]] = bits
+    return packed.view(np.uint64)
+
+
+@dataclass(frozen=True)
+class SignCodes:
+    """2つのフィールドの符号ビットを横に並べたもの。`codes[:, :words_1]` が1つ目のフィールド。"""
+
+    codes: np.ndarray
+    words_1: int
+
+    @property
+    def rows(self) -> int:
+        return int(self.codes.shape[0])
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.codes.nbytes)
+
+    def distances(self, q1: np.ndarray, q2: np.ndarray, alpha: float, beta: float) -> np.ndarray:
+        """
+        クエリ（各フィールド1次元）との重み付きハミング距離 alpha*h1 + beta*h2 を全行について返す。
+        コサイン類似度は概ね 1 - 2h/次元数 に対応するため、距離の小さい順が類似度の大きい順の近似になる。
+        """
+        query = np.concatenate([pack_signs(q1[None, :])[0], pack_signs(q2[None, :])[0]])
+        out = np.empty(self.rows, dtype=np.float32)
+        for start in range(0, self.rows, BLOCK_ROWS):
+            counts = _popcount(np.asarray(self.codes[start : start + BLOCK_ROWS]) ^ query)
+            h1 = counts[:, : self.words_1].sum(axis=1, dtype=np.int32)
+            h2 = counts[:, self.words_1 :].sum(axis=1, dtype=np.int32)
+            out[start : start + BLOCK_ROWS] = alpha * h1 + beta * h2
+        return out
+
+    def candidates(self, q1: np.ndarray, q2: np.ndarray, alpha: float, beta: float, pool: int) -> np.ndarray:
+        """重み付きハミング距離の小さい順に最大 `pool` 行の行番号を返す（順不同）。"""
+        distances = self.distances(q1, q2, alpha, beta)
+        if pool >= distances.size:
+            return np.arange(distances.size)
+        return np.argpartition(distances, pool - 1)[:pool]
+
+
+def encode(X_1: np.ndarray, X_2: np.ndarray) -> SignCodes:
+    codes_1 = pack_signs(X_1)
+    return SignCodes(np.ascontiguousarray(np.hstack([codes_1, pack_signs(X_2)])), int(codes_1.shape[1]))
+
+
+def load_or_build(directory: Path | None, name: str, X_1: np.ndarray, X_2: np.ndarray, mmap: bool = True) -> SignCodes:
+    """
+    バンドル内の符号ビットを読み込む。無い・形状が合わない場合は作成してバンドルに保存する
+    （保存できない場合はメモリ上のみで保持する）。
+    """
+    words_1 = -(-X_1.shape[1] // 64)
+    expected = (X_1.shape[0], words_1 + -(-X_2.shape[1] // 64))
+
+    def _load(paths, mmap_mode):
+        codes = np.load(paths[0], mmap_mode=mmap_mode)
+        return SignCodes(codes, words_1) if codes.shape == expected and codes.dtype == np.uint64 else None
+
+    return artifacts.load_or_build(
+        None if directory is None else [directory / f"{name}.sign.npy"],
+        lambda: encode(X_1, X_2),
+        _load,
+        lambda signs, paths: artifacts.save_array(signs.codes, paths[0]),
+        mmap=mmap,
+    )
+
+
+__all__ = ["SignCodes", "pack_signs", "encode", "load_or_build"]
@@ -0,0 +1,74 @@
+"""
+埋め込み API 呼び出しのリクエスト横断のまとめ送り（マイクロバッチ）。
+
+同時に届いた複数のリクエストのテキストを最大 `max_wait` 秒・最大 `max_batch` 件まで集め、
+1回の呼び出し（リスト入力）で埋め込んでから、各リクエストに自分の分のベクトルを返す。
+1つのリクエストのテキスト（事業概要と現状・課題など）は必ず同じ呼び出しに入る。
+集め方・同時実行数の制御は `MicroBatcher` に任せる。
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable
+
+import numpy as np
+
+from backend.search.micro_batcher import MicroBatcher
+
+DEFAULT_MAX_BATCH = 1024
+DEFAULT_MAX_WAIT = 0.005
+# 同時に実行する API 呼び出しの数（呼び出し中も次のバッチを集め続ける）
+DEFAULT_MAX_CONCURRENCY = 4
+
+
+@dataclass(frozen=True)
+class _EmbedRequest:
+    client: Any
+    texts: list[str]
+
+
+class EmbeddingBatcher(MicroBatcher):
+    """
+    `await embed(client, texts)` を呼び出すディスパッチャ。`embed` は (テキスト数 × 次元数) の行列を返す。
+    `max_batch` はテキスト数で数える。バッチ内で重複したテキストは1回だけ送る。
+    呼び出しが失敗した場合はバッチ内の全リクエストに例外を返す。
+    """
+
+    def __init__(
+        self,
+        embed: Callable[[Any, list[str]], Awaitable[np.ndarray]],
+        max_batch: int = DEFAULT_MAX_BATCH,
+        max_wait: float = DEFAULT_MAX_WAIT,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    ) -> None:
+        super().__init__(
+            self._embed_requests,
+            max_batch=max_batch,
+            max_wait=max_wait,
+            max_concurrency=max_concurrency,
+            weight=lambda request: len(request.texts),
+        )
+        self._embed = embed
+        self._counters["texts"] = 0
+
+    async def _embed_requests(self, requests: list[_EmbedRequest], timeout: float | None) -> list[np.ndarray]:
+        texts = list(dict.fromkeys(text for request in requests for text in request.texts))
+        vectors = np.asarray(await self._embed(requests[0].client, texts), dtype=np.float32)
+        self._count("texts", len(texts))
+        position = {text: i for i, text in enumerate(texts)}
+        return [vectors[[position[text] for text in request.texts]] for request in requests]
+
+    async def embed(self, client: Any, texts: list[str]) -> np.ndarray:
+        """テキストを登録し、まとめ送りの結果から (テキスト数 × 次元数) の行列を返す。"""
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+        return await self.submit(_EmbedRequest(client, list(texts)))
+
+    def stats(self) -> dict:
+        stats = super().stats()
+        stats["texts_per_batch"] = stats["texts"] / stats["batches"] if stats["batches"] else None
+        return stats
+
+
+__all__ = ["EmbeddingBatcher"]
@@ -0,0 +1,222 @@
+"""
+クエリ埋め込みのキャッシュ。
+
+キーは (モデル名, NFKC 正規化したテキスト) の SHA-256。プロセス内の LRU と、
+全ワーカーで共有する SQLite のテーブル（float32 のバイト列）の2段で保持する。
+SQLite 側は件数と合計バイト数を1行の集計テーブルに持ち（トリガーで更新）、合計が上限を超えたら
+最終利用時刻の古いものから削除する。
+"""
+
+from __future__ import annotations
+
+import hashlib
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+
+DEFAULT_MEMORY_ITEMS = 2048
+DEFAULT_DISK_MAX_BYTES = 256 * 1024 * 1024
+# 1回の SELECT で問い合わせるキーの数（SQLite のプレースホルダ数の上限より小さくする）
+SQL_BATCH = 500
+
+_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS embeddings (
+        key TEXT PRIMARY KEY,
+        model TEXT NOT NULL,
+        dim INTEGER NOT NULL,
+        vector BLOB NOT NULL,
+        last_used REAL NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)",
+    # 件数と合計バイト数（1行だけ）。全ワーカーの書き込みをトリガーで反映し、容量の確認でテーブルを走査しない
+    """
+    CREATE TABLE IF NOT EXISTS embeddings_usage (
+        id INTEGER PRIMARY KEY CHECK (id = 0),
+        items INTEGER NOT NULL,
+        bytes INTEGER NOT NULL
+    )
+    """,
+    """
+    INSERT OR IGNORE INTO embeddings_usage
+    SELECT 0, COUNT(*), COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS embeddings_usage_insert AFTER INSERT ON embeddings BEGIN
+        UPDATE embeddings_usage SET items = items + 1, bytes = bytes + LENGTH(NEW.vector) WHERE id = 0;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS embeddings_usage_update AFTER UPDATE OF vector ON embeddings BEGIN
+        UPDATE embeddings_usage SET bytes = bytes + LENGTH(NEW.vector) - LENGTH(OLD.vector) WHERE id = 0;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS embeddings_usage_delete AFTER DELETE ON embeddings BEGIN
+        UPDATE embeddings_usage SET items = items - 1, bytes = bytes - LENGTH(OLD.vector) WHERE id = 0;
+    END
+    """,
+)
+
+
+def cache_key(model: str, text: str) -> str:
+    normalized = unicodedata.normalize("NFKC", text)
+    return hashlib.sha256(f"{model}\0{normalized}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    2段の埋め込みキャッシュ。`path` が None の場合はプロセス内の LRU だけを使う。
+    ディスク側の読み書きに失敗した場合はキャッシュ無しとして扱い、呼び出し側には例外を出さない。
+    """
+
+    def __init__(
+        self,
+        path: Path | str | None = None,
+        memory_items: int = DEFAULT_MEMORY_ITEMS,
+        disk_max_bytes: int = DEFAULT_DISK_MAX_BYTES,
+    ) -> None:
+        self.path = Path(path) if path else None
+        self.memory_items = memory_items
+        self.disk_max_bytes = disk_max_bytes
+        self._memory: OrderedDict[str, np.ndarray] = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0, "disk_errors": 0}
+        if self.path is not None:
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                with self._connect() as conn:
+                    conn.execute("PRAGMA journal_mode=WAL")
+                    for statement in _SCHEMA:
+                        conn.execute(statement)
+            except sqlite3.Error:
+                self._counters["disk_errors"] += 1
+                self.path = None
+
+    @contextmanager
+    def _connect(self):
+        """接続してトランザクションを1つ実行し、終わったら閉じる。"""
+        conn = sqlite3.connect(str(self.path), timeout=5.0)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _remember(self, key: str, vector: np.ndarray) -> None:
+        with self._lock:
+            self._memory[key] = vector
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_items:
+                self._memory.popitem(last=False)
+
+    def get_many(self, model: str, texts: list[str]) -> list[np.ndarray | None]:
+        """各テキストのキャッシュ済みベクトル（無いものは None）を返す。"""
+        keys = [cache_key(model, text) for text in texts]
+        found: list[np.ndarray | None] = [None] * len(texts)
+        with self._lock:
+            for i, key in enumerate(keys):
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    found[i] = vector
+                    self._counters["memory_hits"] += 1
+
+        pending: dict[str, list[int]] = {}
+        for i, key in enumerate(keys):
+            if found[i] is None:
+                pending.setdefault(key, []).append(i)
+        if pending and self.path is not None:
+            wanted = list(pending)
+            rows = []
+            try:
+                with self._connect() as conn:
+                    for start in range(0, len(wanted), SQL_BATCH):
+                        chunk = wanted[start : start + SQL_BATCH]
+                        marks = ",".join("?" * len(chunk))
+                        rows += conn.execute(
+                            f"SELECT key, vector FROM embeddings WHERE key IN ({marks})", chunk
+                        ).fetchall()
+                    conn.executemany(
+                        "UPDATE embeddings SET last_used = ? WHERE key = ?", [(time.time(), key) for key, _ in rows]
+                    )
+            except sqlite3.Error:
+                rows = []
+                with self._lock:
+                    self._counters["disk_errors"] += 1
+            for key, blob in rows:
+                vector = np.frombuffer(blob, dtype=np.float32)
+                for i in pending[key]:
+                    found[i] = vector
+                self._remember(key, vector)
+            with self._lock:
+                self._counters["disk_hits"] += sum(len(pending[key]) for key, _ in rows)
+
+        with self._lock:
+            self._counters["misses"] += sum(1 for vector in found if vector is None)
+        return found
+
+    def put_many(self, model: str, texts: list[str], vectors: np.ndarray) -> None:
+        """計算したベクトルを両方の段に保存する。"""
+        entries = []
+        for text, vector in zip(texts, vectors):
+            key = cache_key(model, text)
+            vector = np.array(vector, dtype=np.float32)
+            vector.flags.writeable = False
+            self._remember(key, vector)
+            entries.append((key, model, int(vector.size), vector.tobytes(), time.time()))
+        if not entries or self.path is None:
+            return
+        try:
+            with self._connect() as conn:
+                # 置き換えは UPDATE にする（REPLACE の削除では削除トリガーが動かず、合計バイト数がずれる）
+                conn.executemany(
+                    "INSERT INTO embeddings VALUES (?, ?, ?, ?, ?) ON CONFLICT (key) DO UPDATE SET "
+                    "model = excluded.model, dim = excluded.dim, vector = excluded.vector, last_used = excluded.last_used",
+                    entries,
+                )
+                self._evict(conn)
+        except sqlite3.Error:
+            with self._lock:
+                self._counters["disk_errors"] += 1
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        """合計バイト数が上限を超えていれば、最終利用時刻の古いものから超過分を見込んだ件数をまとめて削除する。"""
+        removed = 0
+        while True:
+            items, total = conn.execute("SELECT items, bytes FROM embeddings_usage WHERE id = 0").fetchone()
+            if total <= self.disk_max_bytes or items <= 0:
+                break
+            # 1件あたりの平均バイト数から、超過分を空けるのに要る件数を見積もる（次元の違うベクトルが混ざって足りなければ繰り返す）
+            count = -(-(total - self.disk_max_bytes) * items // total)
+            removed += conn.execute(
+                "DELETE FROM embeddings WHERE key IN (SELECT key FROM embeddings ORDER BY last_used LIMIT ?)", (count,)
+            ).rowcount
+        with self._lock:
+            self._counters["evictions"] += removed
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._counters, memory_items=len(self._memory))
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_ratio"] = (stats["memory_hits"] + stats["disk_hits"]) / lookups if lookups else None
+        stats["disk_items"] = stats["disk_bytes"] = None
+        if self.path is not None:
+            try:
+                with self._connect() as conn:
+                    stats["disk_items"], stats["disk_bytes"] = conn.execute(
+                        "SELECT items, bytes FROM embeddings_usage WHERE id = 0"
+                    ).fetchone()
+            except sqlite3.Error:
+                pass
+        return stats
+
+
+__all__ = ["EmbeddingCache", "cache_key"]
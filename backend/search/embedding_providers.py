@@ -0,0 +1,160 @@
+"""
+埋め込みの提供元（プロバイダ）。
+
+  - openai : OpenAI の Embeddings API（`base_url` を変えれば互換 API・ローカルの代替サーバにも向けられる）
+  - local  : 文字 n-gram をハッシュして固定次元に射影する決定的な埋め込み（ネットワーク不要・無料）
+
+どちらも `await provider.embed(texts)` で (テキスト数 × 次元数) の float32 行列を返す。
+キャッシュのキーにはプロバイダごとの `model` を使う。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import unicodedata
+from collections import Counter
+from typing import Protocol
+
+import numpy as np
+
+DEFAULT_DIM = 1536
+# ローカル埋め込みで使う文字 n-gram の長さ
+LOCAL_NGRAMS = (1, 2, 3)
+
+
+class EmbeddingProviderError(RuntimeError):
+    """プロバイダの設定が不正、または利用できない。"""
+
+
+class EmbeddingProvider(Protocol):
+    model: str
+
+    async def embed(self, texts: list[str]) -> np.ndarray: ...
+
+    async def aclose(self) -> None: ...
+
+
+class OpenAIProvider:
+    """
+    OpenAI 互換の Embeddings API。アプリの寿命の間1つのクライアント（接続プール・keep-alive）を使い回す。
+    `max_inputs` 件ごとに分けて呼び出す。`transport` は httpx のトランスポート（テストで代替サーバのアプリに直結する場合など）。
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        model: str,
+        *,
+        base_url: str | None = None,
+        max_connections: int = 32,
+        max_keepalive: int = 16,
+        timeout: float = 30.0,
+        max_inputs: int = 1024,
+        transport=None,
+    ) -> None:
+        import httpx
+        from openai import AsyncOpenAI
+
+        self.model = model
+        self.max_inputs = max_inputs
+        http_client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_keepalive),
+            timeout=timeout,
+            transport=transport,
+        )
+        self.client = AsyncOpenAI(api_key=api_key, base_url=base_url, http_client=http_client)
+
+    async def embed(self, texts: list[str]) -> np.ndarray:
+        rows: list[list[float]] = []
+        for start in range(0, len(texts), self.max_inputs):
+            response = await self.client.embeddings.create(model=self.model, input=texts[start : start + self.max_inputs])
+            rows.extend(item.embedding for item in sorted(response.data, key=lambda item: item.index))
+        return np.asarray(rows, dtype=np.float32)
+
+    async def aclose(self) -> None:
+        await self.client.close()
+
+
+def _hashed_ngrams(text: str, dim: int, ngrams: tuple[int, ...]) -> np.ndarray:
+    vector = np.zeros(dim, dtype=np.float32)
+    normalized = unicodedata.normalize("NFKC", text).lower()
+    counts: Counter[str] = Counter()
+    for n in ngrams:
+        counts.update(normalized[i : i + n] for i in range(len(normalized) - n + 1))
+    for gram, count in counts.items():
+        # Python の hash() はプロセスごとに変わるため、blake2b で位置と符号を決める
+        digest = int.from_bytes(hashlib.blake2b(gram.encode("utf-8"), digest_size=8).digest(), "little")
+        vector[digest % dim] += (1.0 if digest >> 63 else -1.0) * (1.0 + np.log(count))
+    norm = float(np.linalg.norm(vector))
+    return vector / norm if norm > 0 else vector
+
+
+class LocalHashProvider:
+    """
+    文字 n-gram（既定 1〜3 文字）をハッシュで `dim` 次元に射影する決定的な埋め込み（feature hashing）。
+    同じテキストからは常に同じベクトルができ、文字列の重なりが多いほどコサイン類似度が高くなる。
+    負荷試験・オフライン開発用で、意味的な近さは表さない。
+    """
+
+    def __init__(self, dim: int = DEFAULT_DIM, ngrams: tuple[int, ...] = LOCAL_NGRAMS) -> None:
+        self.dim = dim
+        self.ngrams = ngrams
+        self.model = f"local-hash-{dim}"
+
+    def embed_sync(self, texts: list[str]) -> np.ndarray:
+        if not texts:
+            return np.empty((0, self.dim), dtype=np.float32)
+        return np.stack([_hashed_ngrams(text, self.dim, self.ngrams) for text in texts])
+
+    async def embed(self, texts: list[str]) -> np.ndarray:
+        # ハッシュの計算は CPU を使うため、イベントループを塞がないようスレッドで行う
+        return await asyncio.to_thread(self.embed_sync, texts)
+
+    async def aclose(self) -> None:
+        return None
+
+
+def create_provider(
+    name: str,
+    *,
+    model: str,
+    dim: int = DEFAULT_DIM,
+    api_key: str | None = None,
+    base_url: str | None = None,
+    max_connections: int = 32,
+    max_keepalive: int = 16,
+    timeout: float = 30.0,
+    max_inputs: int = 1024,
+) -> EmbeddingProvider:
+    """
+    設定名からプロバイダを作る。"openai" は API キーが必要、"http" は `base_url` の
+    OpenAI 互換サーバ（ローカルの代替サーバなど）に向けた "openai" で、キーは任意。
+    """
+    name = name.strip().lower()
+    if name == "local":
+        return LocalHashProvider(dim)
+    if name in ("openai", "http"):
+        if name == "http" and not base_url:
+            raise EmbeddingProviderError("EMBEDDING_PROVIDER=http には EMBEDDING_BASE_URL が必要です")
+        if name == "openai" and not api_key:
+            raise EmbeddingProviderError("OPENAI_API_KEY is not configured")
+        return OpenAIProvider(
+            api_key or "local-stand-in",
+            model,
+            base_url=base_url,
+            max_connections=max_connections,
+            max_keepalive=max_keepalive,
+            timeout=timeout,
+            max_inputs=max_inputs,
+        )
+    raise EmbeddingProviderError(f"未対応の埋め込みプロバイダです: {name!r}（openai / http / local）")
+
+
+__all__ = [
+    "EmbeddingProvider",
+    "EmbeddingProviderError",
+    "OpenAIProvider",
+    "LocalHashProvider",
+    "create_provider",
+]
@@ -0,0 +1,135 @@
+"""
+検索（行列積などの CPU 処理）専用の、大きさを制限した実行器。
+
+FastAPI の既定のスレッドプールとは分け、同時に計算する数（`max_workers`）と待ち行列の長さ
+（`max_queue`）に上限を設ける。上限を超えた分は待たせずに `ExecutorSaturatedError` で断り、
+期限（`timeout`）までに終わらない分は `DeadlineExceededError` にする。
+あわせて BLAS のスレッド数をワーカー単位で固定し、同時リクエスト・複数ワーカーで CPU を奪い合わないようにする。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+try:
+    from threadpoolctl import threadpool_limits
+except ImportError:  # pragma: no cover - optional dependency
+    threadpool_limits = None  # type: ignore
+
+DEFAULT_MAX_WORKERS = min(4, os.cpu_count() or 1)
+DEFAULT_MAX_QUEUE = 32
+# BLAS の実装ごとのスレッド数の環境変数（子プロセス・読み込み前のライブラリ向け）
+BLAS_THREAD_ENV = ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS", "BLIS_NUM_THREADS")
+
+
+class ExecutorSaturatedError(RuntimeError):
+    """計算中・待ちの件数が上限に達している。"""
+
+
+class DeadlineExceededError(TimeoutError):
+    """期限までに計算が終わらなかった（待ち行列で期限を過ぎた場合も含む）。"""
+
+
+def limit_blas_threads(threads: int) -> dict:
+    """
+    このプロセスの BLAS のスレッド数を `threads` に固定する（0 以下なら何もしない）。
+    読み込み済みのライブラリは threadpoolctl があればそれで変更し、無い場合は環境変数だけを設定する
+    （numpy の読み込み前に設定した場合・子プロセスにだけ効く）。
+    """
+    if threads <= 0:
+        return {"threads": None, "applied": False}
+    for name in BLAS_THREAD_ENV:
+        os.environ[name] = str(threads)
+    applied = False
+    if threadpool_limits is not None:
+        threadpool_limits(limits=threads, user_api="blas")
+        applied = True
+    return {"threads": threads, "applied": applied}
+
+
+class SearchExecutor:
+    """`await run(fn, *args, timeout=...)` で `fn` を専用のスレッドで実行する。"""
+
+    def __init__(self, max_workers: int = DEFAULT_MAX_WORKERS, max_queue: int = DEFAULT_MAX_QUEUE) -> None:
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max(0, max_queue)
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="search")
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+        self._counters = {"completed": 0, "failed": 0, "rejected": 0, "expired": 0, "timeouts": 0}
+
+    def _call(self, deadline: float | None, fn: Callable[..., Any], args: tuple, kwargs: dict) -> Any:
+        with self._lock:
+            self._queued -= 1
+            expired = deadline is not None and time.monotonic() >= deadline
+            if expired:
+                self._counters["expired"] += 1
+            else:
+                self._running += 1
+        if expired:
+            # 待ち行列にいる間に期限を過ぎた分は計算しない
+            raise DeadlineExceededError("search deadline exceeded while queued")
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException:
+            with self._lock:
+                self._counters["failed"] += 1
+            raise
+        finally:
+            with self._lock:
+                self._running -= 1
+        with self._lock:
+            self._counters["completed"] += 1
+        return result
+
+    async def run(self, fn: Callable[..., Any], *args: Any, timeout: float | None = None, **kwargs: Any) -> Any:
+        with self._lock:
+            if self._queued + self._running >= self.max_workers + self.max_queue:
+                self._counters["rejected"] += 1
+                raise ExecutorSaturatedError(
+                    f"search executor saturated ({self._running} running, {self._queued} queued)"
+                )
+            self._queued += 1
+        deadline = time.monotonic() + timeout if timeout else None
+        try:
+            future = self._pool.submit(self._call, deadline, fn, args, kwargs)
+        except BaseException:
+            with self._lock:
+                self._queued -= 1
+            raise
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout=timeout or None)
+        except asyncio.TimeoutError as exc:
+            # 待ち行列にいた分は取り消される。実行中の計算は止められないため結果を捨てる
+            with self._lock:
+                self._counters["timeouts"] += 1
+                if future.cancelled():
+                    self._queued -= 1
+            raise DeadlineExceededError(f"search did not finish within {timeout} s") from exc
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(
+                self._counters,
+                running=self._running,
+                queued=self._queued,
+                max_workers=self.max_workers,
+                max_queue=self.max_queue,
+            )
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+__all__ = [
+    "DeadlineExceededError",
+    "ExecutorSaturatedError",
+    "SearchExecutor",
+    "limit_blas_threads",
+]
@@ -0,0 +1,129 @@
+"""
+府省庁・年度・予算額による絞り込み。
+
+セグメントごとに府省庁別・年度別の行番号配列と、予算額で並べた行番号を事前に作っておき、
+条件に合う行だけを採点できるようにする。府省庁ごとの件数（ファセット）も同じ行番号から数える。
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+MINISTRY_COLUMN = "府省庁"
+FISCAL_YEAR_COLUMN = "年度"
+BUDGET_COLUMN = "当初予算"
+
+
+@dataclass(frozen=True)
+class SearchFilters:
+    """検索対象の絞り込み条件。空のタプル・None の条件は絞り込まない。予算の範囲は両端を含む。"""
+
+    ministries: tuple[str, ...] = ()
+    fiscal_years: tuple[int, ...] = ()
+    budget_min: float | None = None
+    budget_max: float | None = None
+
+    @property
+    def is_empty(self) -> bool:
+        return not self.ministries and not self.fiscal_years and self.budget_min is None and self.budget_max is None
+
+
+def _group_rows(codes: np.ndarray, groups: int) -> list[np.ndarray]:
+    """`pd.factorize` の符号からグループごとの行番号配列（昇順）を作る。欠損（-1）の行は含めない。"""
+    if groups == 0:
+        return []
+    order = np.argsort(codes, kind="stable")
+    missing = int((codes < 0).sum())
+    bounds = missing + np.cumsum(np.bincount(codes[codes >= 0], minlength=groups))
+    return np.split(order, np.concatenate([[missing], bounds[:-1]]))[1:]
+
+
+@dataclass(frozen=True)
+class Partitions:
+    """1セグメント分の事前計算済みの分割。"""
+
+    rows: int
+    ministry_codes: np.ndarray
+    ministry_names: tuple[str, ...]
+    ministry_rows: dict[str, np.ndarray]
+    year_rows: dict[int, np.ndarray]
+    budget_order: np.ndarray
+    sorted_budgets: np.ndarray
+
+    def select(self, filters: SearchFilters | None) -> np.ndarray | None:
+        """条件に合う行番号（昇順）を返す。条件が無い場合は None（全行）。"""
+        if filters is None or filters.is_empty:
+            return None
+        selected: np.ndarray | None = None
+
+        def narrow(current: np.ndarray | None, rows: np.ndarray) -> np.ndarray:
+            return rows if current is None else np.intersect1d(current, rows, assume_unique=True)
+
+        # 同じ値を重ねて指定しても行が重複しないよう、値ごとに1回だけ取り出す
+        if filters.ministries:
+            groups = [self.ministry_rows[name] for name in dict.fromkeys(filters.ministries) if name in self.ministry_rows]
+            selected = narrow(selected, np.sort(np.concatenate(groups)) if groups else np.empty(0, np.int64))
+        if filters.fiscal_years:
+            groups = [self.year_rows[year] for year in dict.fromkeys(filters.fiscal_years) if year in self.year_rows]
+            selected = narrow(selected, np.sort(np.concatenate(groups)) if groups else np.empty(0, np.int64))
+        if filters.budget_min is not None or filters.budget_max is not None:
+            low = -np.inf if filters.budget_min is None else filters.budget_min
+            high = np.inf if filters.budget_max is None else filters.budget_max
+            start = np.searchsorted(self.sorted_budgets, low, side="left")
+            end = np.searchsorted(self.sorted_budgets, high, side="right")
+            selected = narrow(selected, np.sort(self.budget_order[start:end]))
+        return selected
+
+    def ministry_counts(self, rows: np.ndarray | None) -> dict[str, int]:
+        """指定した行（None は全行）の府省庁ごとの件数。"""
+        codes = self.ministry_codes if rows is None else self.ministry_codes[rows]
+        counts = np.bincount(codes[codes >= 0], minlength=len(self.ministry_names))
+        return {name: int(count) for name, count in zip(self.ministry_names, counts) if count}
+
+
+def build_partitions(frame: pd.DataFrame) -> Partitions:
+    rows = len(frame)
+    if MINISTRY_COLUMN in frame.columns:
+        codes, names = pd.factorize(frame[MINISTRY_COLUMN], sort=True)
+        names = tuple(str(name) for name in names)
+    else:
+        codes, names = np.full(rows, -1), ()
+    codes = np.asarray(codes, dtype=np.int64)
+    ministry_rows = dict(zip(names, _group_rows(codes, len(names))))
+
+    year_rows: dict[int, np.ndarray] = {}
+    if FISCAL_YEAR_COLUMN in frame.columns:
+        year_codes, years = pd.factorize(pd.to_numeric(frame[FISCAL_YEAR_COLUMN], errors="coerce"), sort=True)
+        year_rows = dict(zip((int(year) for year in years), _group_rows(np.asarray(year_codes, np.int64), len(years))))
+
+    if BUDGET_COLUMN in frame.columns:
+        budgets = pd.to_numeric(frame[BUDGET_COLUMN], errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+    else:
+        budgets = np.full(rows, np.nan)
+    finite = np.flatnonzero(np.isfinite(budgets))
+    budget_order = finite[np.argsort(budgets[finite], kind="stable")]
+
+    return Partitions(
+        rows=rows,
+        ministry_codes=codes,
+        ministry_names=names,
+        ministry_rows=ministry_rows,
+        year_rows=year_rows,
+        budget_order=budget_order,
+        sorted_budgets=budgets[budget_order],
+    )
+
+
+def merge_counts(counts: list[dict[str, int]]) -> dict[str, int]:
+    """セグメントごとの件数を合計し、件数の多い順に並べる。"""
+    total: dict[str, int] = {}
+    for part in counts:
+        for name, count in part.items():
+            total[name] = total.get(name, 0) + count
+    return dict(sorted(total.items(), key=lambda item: (-item[1], item[0])))
+
+
+__all__ = ["SearchFilters", "Partitions", "build_partitions", "merge_counts"]
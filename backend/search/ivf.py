@@ -0,0 +1,245 @@
+"""
+転置ファイル（IVF）による近似最近傍インデックス。
+
+行を k-means（コサイン）でリストに分割し、クエリに近い `nprobe` 個のリストだけを候補にする。
+直積量子化（PQ）を有効にした場合は、リスト中心からの残差を符号化し、候補を近似スコアで
+絞り込んでから呼び出し側で正確なスコアに並べ直す。
+"""
+
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+
+from backend.search import artifacts
+
+# k-means の反復回数と、学習に使う1リストあたりの標本数
+KMEANS_ITERATIONS = 20
+TRAIN_ROWS_PER_LIST = 256
+# 割り当て計算の1ブロックあたりの行数（一時配列を小さく保つ）
+BLOCK_ROWS = 4096
+# PQ の各部分空間の代表ベクトル数（uint8 で符号化する）
+PQ_CODEBOOK_SIZE = 256
+
+INDEX_FORMAT_VERSION = 1
+INDEX_META = "meta.json"
+
+
+def _normalize(M: np.ndarray) -> np.ndarray:
+    return M / (np.linalg.norm(M, axis=1, keepdims=True) + 1e-12)
+
+
+def _assign(X: np.ndarray, centroids: np.ndarray, spherical: bool, block_rows: int = BLOCK_ROWS) -> np.ndarray:
+    """各行に最も近い中心の番号を返す（spherical なら内積最大、そうでなければユークリッド距離最小）。"""
+    labels = np.empty(X.shape[0], dtype=np.int64)
+    half_norms = None if spherical else 0.5 * np.einsum("ij,ij->i", centroids, centroids)
+    for start in range(0, X.shape[0], block_rows):
+        block = np.asarray(X[start : start + block_rows], dtype=np.float32)
+        scores = block @ centroids.T
+        if half_norms is not None:
+            scores -= half_norms
+        labels[start : start + block_rows] = scores.argmax(axis=1)
+    return labels
+
+
+def kmeans(
+    X: np.ndarray,
+    n_clusters: int,
+    *,
+    spherical: bool = True,
+    iterations: int = KMEANS_ITERATIONS,
+    train_rows: int | None = None,
+    seed: int = 0,
+) -> np.ndarray:
+    """
+    Lloyd 法の k-means。spherical の場合は中心を単位長に正規化する（コサイン類似度でのクラスタリング）。
+    学習は最大 `train_rows` 行の標本で行い、空になったクラスタは標本から選び直す。
+    """
+    rng = np.random.default_rng(seed)
+    rows = X.shape[0]
+    n_clusters = int(min(n_clusters, rows))
+    train_rows = train_rows or n_clusters * TRAIN_ROWS_PER_LIST
+    picks = np.sort(rng.choice(rows, size=min(rows, train_rows), replace=False))
+    sample = np.asarray(X[picks], dtype=np.float32)
+    if spherical:
+        sample = _normalize(sample)
+
+    centroids = sample[rng.choice(sample.shape[0], size=n_clusters, replace=False)].copy()
+    for _ in range(iterations):
+        labels = _assign(sample, centroids, spherical)
+        order = np.argsort(labels, kind="stable")
+        counts = np.bincount(labels, minlength=n_clusters)
+        sums = np.zeros_like(centroids)
+        present = np.flatnonzero(counts)
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]])[present]
+        sums[present] = np.add.reduceat(sample[order], starts, axis=0)
+        updated = sums / np.maximum(counts, 1)[:, None]
+        empty = counts == 0
+        if empty.any():
+            updated[empty] = sample[rng.choice(sample.shape[0], size=int(empty.sum()), replace=False)]
+        if spherical:
+            updated = _normalize(updated)
+        if np.allclose(updated, centroids, atol=1e-6):
+            centroids = updated
+            break
+        centroids = updated
+    return centroids.astype(np.float32)
+
+
+@dataclass(frozen=True)
+class IVFIndex:
+    """
+    転置ファイルインデックス。`rows[offsets[l]:offsets[l + 1]]` がリスト l に属する行番号。
+    PQ が有効な場合、`codes[i]` は `rows[i]` の行の（リスト中心からの）残差の符号。
+    """
+
+    centroids: np.ndarray
+    offsets: np.ndarray
+    rows: np.ndarray
+    codebooks: np.ndarray | None = None
+    codes: np.ndarray | None = None
+
+    @property
+    def n_lists(self) -> int:
+        return int(self.centroids.shape[0])
+
+    @property
+    def pq_subspaces(self) -> int:
+        return int(self.codebooks.shape[0]) if self.codebooks is not None else 0
+
+    @property
+    def nbytes(self) -> int:
+        arrays = (self.centroids, self.offsets, self.rows, self.codebooks, self.codes)
+        return sum(int(a.nbytes) for a in arrays if a is not None)
+
+    def probe(self, q: np.ndarray, nprobe: int, min_candidates: int = 0) -> np.ndarray:
+        """
+        クエリ（1次元）に近い順にリストを選ぶ。`nprobe` 個を選んでも候補が `min_candidates` 件に
+        満たない場合は、足りるまで次に近いリストを追加する。
+        """
+        order = np.argsort(-(self.centroids @ q))
+        sizes = np.diff(self.offsets)[order]
+        needed = int(np.searchsorted(np.cumsum(sizes), min_candidates)) + 1 if min_candidates > 0 else 0
+        return order[: max(nprobe, needed)]
+
+    def candidates(self, q: np.ndarray, nprobe: int, min_candidates: int = 0, rerank: int | None = None) -> np.ndarray:
+        """
+        クエリ（1次元）の候補行番号を返す。PQ が有効で `rerank` が指定されている場合は、
+        近似スコアの上位 `rerank` 件に絞る（正確なスコアでの並べ直しは呼び出し側で行う）。
+        """
+        lists = self.probe(q, nprobe, min_candidates)
+        slices = [slice(self.offsets[l], self.offsets[l + 1]) for l in lists]
+        positions = np.concatenate([np.arange(s.start, s.stop) for s in slices]) if slices else np.empty(0, np.int64)
+        if self.codebooks is None or rerank is None or positions.size <= rerank:
+            return np.asarray(self.rows[positions])
+
+        # 非対称距離計算: q・c_l + Σ_j q_j・codebook_j[code_j]
+        m, _, sub_dim = self.codebooks.shape
+        table = np.einsum("md,mkd->mk", q.reshape(m, sub_dim), self.codebooks)
+        base = np.repeat(self.centroids[lists] @ q, [s.stop - s.start for s in slices])
+        codes = np.asarray(self.codes[positions])
+        approx = base + table[np.arange(m), codes].sum(axis=1)
+        keep = np.argpartition(-approx, rerank - 1)[:rerank]
+        return np.asarray(self.rows[positions[keep]])
+
+
+def _train_pq(residuals: np.ndarray, subspaces: int, seed: int) -> tuple[np.ndarray, np.ndarray]:
+    rows, dim = residuals.shape
+    if dim % subspaces != 0:
+        raise ValueError(f"PQ の部分空間数 {subspaces} は次元数 {dim} を割り切れる必要があります")
+    sub_dim = dim // subspaces
+    ksub = int(min(PQ_CODEBOOK_SIZE, rows))
+    codebooks = np.empty((subspaces, ksub, sub_dim), dtype=np.float32)
+    codes = np.empty((rows, subspaces), dtype=np.uint8)
+    for j in range(subspaces):
+        part = np.ascontiguousarray(residuals[:, j * sub_dim : (j + 1) * sub_dim])
+        codebooks[j] = kmeans(part, ksub, spherical=False, seed=seed + j, train_rows=ksub * 64)
+        codes[:, j] = _assign(part, codebooks[j], spherical=False)
+    return codebooks, codes
+
+
+def build(X: np.ndarray, n_lists: int, *, pq_subspaces: int = 0, seed: int = 0) -> IVFIndex:
+    """行列 X（行数 × 次元数）から IVF インデックスを作る。`pq_subspaces` > 0 で残差を PQ 符号化する。"""
+    centroids = kmeans(X, n_lists, spherical=True, seed=seed)
+    labels = _assign(X, centroids, spherical=True)
+    rows = np.argsort(labels, kind="stable").astype(np.int64)
+    counts = np.bincount(labels, minlength=centroids.shape[0])
+    offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+
+    if pq_subspaces <= 0:
+        return IVFIndex(centroids, offsets, rows)
+
+    residuals = np.empty((X.shape[0], X.shape[1]), dtype=np.float32)
+    for start in range(0, X.shape[0], BLOCK_ROWS):
+        ordered = rows[start : start + BLOCK_ROWS]
+        residuals[start : start + BLOCK_ROWS] = np.asarray(X[ordered], dtype=np.float32) - centroids[labels[ordered]]
+    codebooks, codes = _train_pq(residuals, pq_subspaces, seed)
+    return IVFIndex(centroids, offsets, rows, codebooks, codes)
+
+
+def _index_dir(directory: Path, name: str, n_lists: int, pq_subspaces: int) -> Path:
+    suffix = f".pq{pq_subspaces}" if pq_subspaces > 0 else ""
+    return directory / f"{name}.ivf{n_lists}{suffix}"
+
+
+def _write(index: IVFIndex, directory: Path, fields: dict) -> None:
+    directory.mkdir(parents=True)
+    arrays = {"centroids": index.centroids, "offsets": index.offsets, "rows": index.rows}
+    if index.codebooks is not None:
+        arrays.update(codebooks=index.codebooks, codes=index.codes)
+    for key, array in arrays.items():
+        np.save(directory / f"{key}.npy", array)
+    meta = {"format_version": INDEX_FORMAT_VERSION, "n_lists": index.n_lists, "pq_subspaces": index.pq_subspaces, **fields}
+    (directory / INDEX_META).write_text(json.dumps(meta, indent=2), encoding="utf-8")
+
+
+def save(index: IVFIndex, target: Path, **fields) -> Path:
+    """インデックスをディレクトリに書き出す。書き込み途中のものは読まれないよう最後に置き換える。"""
+    artifacts.write_atomic(index, [target], lambda value, paths: _write(value, paths[0], fields))
+    return target
+
+
+def load(target: Path, mmap: bool = True) -> tuple[IVFIndex, dict]:
+    meta = json.loads((target / INDEX_META).read_text(encoding="utf-8"))
+    mmap_mode = "r" if mmap else None
+    arrays = {
+        key: np.load(target / f"{key}.npy", mmap_mode=mmap_mode)
+        for key in ("centroids", "offsets", "rows", "codebooks", "codes")
+        if (target / f"{key}.npy").exists()
+    }
+    return IVFIndex(**arrays), meta
+
+
+def load_or_build(
+    directory: Path | None,
+    name: str,
+    X: np.ndarray,
+    n_lists: int,
+    *,
+    pq_subspaces: int = 0,
+    mmap: bool = True,
+) -> IVFIndex:
+    """
+    バンドル内のインデックスを読み込む。無い・行列と形状が合わない場合は作成してバンドルに保存する
+    （保存できない場合はメモリ上のみで保持する）。
+    """
+
+    def _load(paths, mmap_mode):
+        index, meta = load(paths[0], mmap=mmap_mode is not None)
+        if meta.get("format_version") == INDEX_FORMAT_VERSION and meta.get("shape") == list(X.shape):
+            return index
+        return None
+
+    return artifacts.load_or_build(
+        None if directory is None else [_index_dir(directory, name, n_lists, pq_subspaces)],
+        lambda: build(X, n_lists, pq_subspaces=pq_subspaces),
+        _load,
+        lambda index, paths: _write(index, paths[0], {"shape": list(X.shape)}),
+        mmap=mmap,
+    )
+
+
+__all__ = ["IVFIndex", "kmeans", "build", "save", "load", "load_or_build"]
@@ -0,0 +1,153 @@
+"""
+文字 n-gram の BM25 による語彙検索。
+
+日本語は分かち書きをせず、NFKC 正規化した文字列の n-gram（既定は2文字）を語として扱う。
+転置リストは CSR 形式（語ごとの `indptr` と、連結した文書番号・出現回数の配列）で保持し、
+クエリの語の転置リストをまとめて取り出して `np.bincount` で文書ごとのスコアを一度に集計する。
+"""
+
+from __future__ import annotations
+
+import re
+import unicodedata
+from collections import Counter
+from dataclasses import dataclass
+from typing import Iterable, Sequence
+
+import numpy as np
+
+NGRAM = 2
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# 語の区切りとして扱う文字（空白・句読点・記号）
+_SEPARATORS = re.compile(r"[\s　、。，．・「」『』（）()\[\]【】〔〕,.:;：；!?！？\"'\-―/]+")
+
+
+def tokenize(text: str, n: int = NGRAM) -> list[str]:
+    """NFKC 正規化・小文字化した文字列を区切り文字で分け、各部分の文字 n-gram を返す（n 文字未満の部分はそのまま）。"""
+    if not text:
+        return []
+    normalized = unicodedata.normalize("NFKC", text).lower()
+    tokens: list[str] = []
+    for part in _SEPARATORS.split(normalized):
+        if len(part) <= n:
+            if part:
+                tokens.append(part)
+            continue
+        tokens.extend(part[i : i + n] for i in range(len(part) - n + 1))
+    return tokens
+
+
+@dataclass(frozen=True)
+class LexicalIndex:
+    """
+    CSR 形式の転置インデックス。語 t の転置リストは
+    `doc_ids[indptr[t]:indptr[t + 1]]`（昇順）と、同じ位置の `term_freqs`。
+    """
+
+    vocabulary: dict[str, int]
+    indptr: np.ndarray
+    doc_ids: np.ndarray
+    term_freqs: np.ndarray
+    # 文書ごとの BM25 の長さ正規化項 k1 * (1 - b + b * 文書長 / 平均文書長)
+    doc_norms: np.ndarray
+    idf: np.ndarray
+    k1: float = BM25_K1
+
+    @property
+    def rows(self) -> int:
+        return int(self.doc_norms.shape[0])
+
+    @property
+    def nbytes(self) -> int:
+        arrays = (self.indptr, self.doc_ids, self.term_freqs, self.doc_norms, self.idf)
+        return sum(int(a.nbytes) for a in arrays)
+
+    def scores(self, text: str) -> np.ndarray:
+        """クエリ文字列に対する全文書の BM25 スコア（float32）。"""
+        counts = Counter(self.vocabulary[token] for token in tokenize(text) if token in self.vocabulary)
+        if not counts:
+            return np.zeros(self.rows, dtype=np.float32)
+        terms = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+        weights = self.idf[terms] * np.fromiter(counts.values(), dtype=np.float32, count=len(counts))
+        starts, ends = self.indptr[terms], self.indptr[terms + 1]
+        lengths = ends - starts
+        positions = np.repeat(ends - lengths.cumsum(), lengths) + np.arange(lengths.sum())
+        docs = self.doc_ids[positions]
+        tf = self.term_freqs[positions].astype(np.float32)
+        contrib = np.repeat(weights, lengths) * tf * (self.k1 + 1) / (tf + self.doc_norms[docs])
+        return np.bincount(docs, weights=contrib, minlength=self.rows).astype(np.float32)
+
+    def top_k(self, text: str, k: int, rows: np.ndarray | None = None) -> tuple[np.ndarray, np.ndarray]:
+        """クエリ文字列に対する上位 k 件の (文書番号, スコア)。`top_k` を参照。"""
+        return top_k(self.scores(text), k, rows)
+
+
+def top_k(scores: np.ndarray, k: int, rows: np.ndarray | None = None) -> tuple[np.ndarray, np.ndarray]:
+    """
+    スコアが正の文書のうち上位 k 件の (文書番号, スコア) をスコアの高い順に返す。
+    rows（昇順の文書番号）を指定した場合はその中から選ぶ。
+    """
+    candidates = np.flatnonzero(scores > 0)
+    if rows is not None:
+        candidates = np.intersect1d(candidates, rows, assume_unique=True)
+    if candidates.size > k:
+        keep = np.argpartition(-scores[candidates], k - 1)[:k]
+        candidates = candidates[keep]
+    order = np.lexsort((candidates, -scores[candidates]))
+    candidates = candidates[order]
+    return candidates, scores[candidates]
+
+
+def build(texts: Sequence[str] | Iterable[str], *, k1: float = BM25_K1, b: float = BM25_B) -> LexicalIndex:
+    """文書の文字列から転置インデックスを作る。"""
+    vocabulary: dict[str, int] = {}
+    term_ids: list[int] = []
+    doc_ids: list[int] = []
+    freqs: list[int] = []
+    lengths: list[int] = []
+    for doc, text in enumerate(texts):
+        tokens = tokenize(text)
+        lengths.append(len(tokens))
+        for token, count in Counter(tokens).items():
+            term_ids.append(vocabulary.setdefault(token, len(vocabulary)))
+            doc_ids.append(doc)
+            freqs.append(count)
+
+    rows = len(lengths)
+    terms = np.asarray(term_ids, dtype=np.int64)
+    # 語番号で安定ソートすると、各転置リストの中は文書番号の昇順になる
+    order = np.argsort(terms, kind="stable")
+    df = np.bincount(terms, minlength=len(vocabulary))
+    indptr = np.concatenate([[0], np.cumsum(df)]).astype(np.int64)
+
+    doc_lengths = np.asarray(lengths, dtype=np.float32)
+    average = float(doc_lengths.mean()) if rows and doc_lengths.mean() > 0 else 1.0
+    return LexicalIndex(
+        vocabulary=vocabulary,
+        indptr=indptr,
+        doc_ids=np.asarray(doc_ids, dtype=np.int32)[order],
+        term_freqs=np.minimum(np.asarray(freqs, dtype=np.int64), np.iinfo(np.uint16).max).astype(np.uint16)[order],
+        doc_norms=(k1 * (1 - b + b * doc_lengths / average)).astype(np.float32),
+        idf=np.log1p((rows - df + 0.5) / (df + 0.5)).astype(np.float32),
+        k1=k1,
+    )
+
+
+def reciprocal_rank_fusion(rankings: Sequence[np.ndarray], k: int = 60) -> tuple[np.ndarray, np.ndarray]:
+    """
+    複数の順位付け（キーを良い順に並べた配列）を RRF で統合し、(キー, スコア) をスコアの高い順に返す。
+    各キーのスコアは Σ 1 / (k + 順位)（順位は 1 始まり）。
+    """
+    keys = np.concatenate([np.asarray(ranking, dtype=np.int64) for ranking in rankings])
+    if keys.size == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+    contrib = np.concatenate([1.0 / (k + np.arange(1, len(ranking) + 1)) for ranking in rankings])
+    unique, inverse = np.unique(keys, return_inverse=True)
+    fused = np.bincount(inverse, weights=contrib)
+    order = np.lexsort((unique, -fused))
+    return unique[order], fused[order]
+
+
+__all__ = ["LexicalIndex", "tokenize", "build", "top_k", "reciprocal_rank_fusion"]
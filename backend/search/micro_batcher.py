@@ -0,0 +1,206 @@
+"""
+リクエスト横断のまとめ処理（マイクロバッチ）の共通部分。
+
+同時に届いた要素を最大 `max_wait` 秒・最大 `max_batch`（要素の重みの合計）まで集め、
+1回の `flush(items, timeout)` で処理してから各呼び出しに自分の分の結果を返す。
+処理中も次のバッチを集め続け（同時に処理するのは `max_concurrency` 件まで）、処理の枠が空くまで待つ間に
+届いた分も同じバッチに入れるため、混み合うほど1回あたりの件数が増える。
+イベントループ上で動き、待っている間はワーカーのスレッドを占有しない。
+埋め込み API の呼び出し（`EmbeddingBatcher`）と類似度検索（`SearchBatcher`）がこれを使う。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable
+
+
+class BatcherSaturatedError(RuntimeError):
+    """まとめ待ちの要素数が上限に達している。"""
+
+
+class BatchDeadlineError(TimeoutError):
+    """登録から期限までに結果が返らなかった（まとめ待ち・処理中のいずれでも）。"""
+
+
+@dataclass
+class _Pending:
+    item: Any
+    deadline: float | None
+    future: asyncio.Future = field(default_factory=lambda: asyncio.get_running_loop().create_future())
+    # まとめ待ち（処理に渡す前）かどうか
+    waiting: bool = True
+
+
+class MicroBatcher:
+    """
+    `await flush(items, timeout)` でまとめて処理するディスパッチャ。`flush` は要素と同じ順で結果のリストを返す。
+    `timeout` はバッチ内で最も早い期限までの残り秒数（期限の無い要素だけなら None）。
+    処理が失敗した場合はバッチ内の全要素に例外を返す。`max_wait` が 0 以下・`max_batch` が 1 以下の場合はまとめずにすぐ処理する。
+    `max_pending` が正の場合、まとめ待ちの要素数がそれを超えた分は待たせずに `BatcherSaturatedError` で断る。
+    `unit` は統計に使う要素の呼び名。
+    """
+
+    def __init__(
+        self,
+        flush: Callable[[list[Any], float | None], Awaitable[list[Any]]],
+        *,
+        max_batch: int,
+        max_wait: float,
+        max_concurrency: int,
+        max_pending: int = 0,
+        weight: Callable[[Any], int] | None = None,
+        unit: str = "items",
+    ) -> None:
+        self._flush_items = flush
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max_wait
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_pending = max(0, max_pending)
+        self._weight = weight or (lambda item: 1)
+        self.unit = unit
+        # キュー・収集タスクは最初に使われたイベントループに結び付ける（ループが変わったら作り直す）
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._queue: asyncio.Queue[_Pending] | None = None
+        self._slots: asyncio.Semaphore | None = None
+        self._collector: asyncio.Task | None = None
+        self._flushes: set[asyncio.Task] = set()
+        # まとめ待ちの要素数（処理に渡した・呼び出し元があきらめた時点で減らす）
+        self._waiting = 0
+        self._lock = threading.Lock()
+        self._counters = {
+            "requests": 0,
+            "batches": 0,
+            unit: 0,
+            "failures": 0,
+            "rejected": 0,
+            "expired": 0,
+            "max_batch_seen": 0,
+        }
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_wait > 0 and self.max_batch > 1
+
+    def _ensure_started(self) -> asyncio.Queue:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._collector is None or self._collector.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._waiting = 0
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+            self._collector = loop.create_task(self._run(self._queue))
+        return self._queue
+
+    def _leave(self, pending: _Pending) -> None:
+        if pending.waiting:
+            pending.waiting = False
+            self._waiting -= 1
+
+    def _count(self, name: str, value: int = 1) -> None:
+        with self._lock:
+            self._counters[name] += value
+
+    async def submit(self, item: Any, timeout: float | None = None) -> Any:
+        """
+        要素を登録し、まとめて処理した結果のうち自分の分を返す。`timeout` 秒（登録時から数える）以内に
+        結果が返らない場合は `BatchDeadlineError` にする（まとめ待ちの間に期限を過ぎた要素は処理しない）。
+        """
+        self._count("requests")
+        loop = asyncio.get_running_loop()
+        if not self.enabled:
+            try:
+                return (await asyncio.wait_for(self._flush_now([item], timeout), timeout=timeout or None))[0]
+            except asyncio.TimeoutError as exc:
+                self._count("expired")
+                raise BatchDeadlineError(f"batch did not finish within {timeout} s") from exc
+        queue = self._ensure_started()
+        if self.max_pending and self._waiting >= self.max_pending:
+            self._count("rejected")
+            raise BatcherSaturatedError(f"{self._waiting} {self.unit} already waiting to be batched")
+        pending = _Pending(item, loop.time() + timeout if timeout else None)
+        self._waiting += 1
+        queue.put_nowait(pending)
+        try:
+            # 期限切れ・呼び出し元の取り消しで future を取り消すと、まとめる際に読み飛ばされる
+            return await asyncio.wait_for(pending.future, timeout=timeout or None)
+        except asyncio.TimeoutError as exc:
+            self._count("expired")
+            raise BatchDeadlineError(f"batch did not finish within {timeout} s") from exc
+        finally:
+            self._leave(pending)
+
+    async def _run(self, queue: asyncio.Queue) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            first = await queue.get()
+            # 処理の枠が空くまで待つ間に届いた分も同じバッチに入れる
+            await self._slots.acquire()
+            batch = [first]
+            size = self._weight(first.item)
+            deadline = loop.time() + self.max_wait
+            while size < self.max_batch:
+                if not queue.empty():
+                    pending = queue.get_nowait()
+                else:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        pending = await asyncio.wait_for(queue.get(), timeout=remaining)
+                    except asyncio.TimeoutError:
+                        break
+                batch.append(pending)
+                size += self._weight(pending.item)
+            for pending in batch:
+                self._leave(pending)
+            task = loop.create_task(self._flush(batch))
+            self._flushes.add(task)
+            task.add_done_callback(self._flushes.discard)
+
+    async def _flush_now(self, items: list[Any], timeout: float | None) -> list[Any]:
+        try:
+            results = await self._flush_items(items, timeout)
+        except Exception:
+            self._count("failures")
+            raise
+        with self._lock:
+            self._counters["batches"] += 1
+            self._counters[self.unit] += len(items)
+            self._counters["max_batch_seen"] = max(self._counters["max_batch_seen"], len(items))
+        return results
+
+    async def _flush(self, batch: list[_Pending]) -> None:
+        try:
+            # 期限切れ・取り消し済みの要素は処理しない
+            batch = [pending for pending in batch if not pending.future.done()]
+            if not batch:
+                return
+            deadlines = [pending.deadline for pending in batch if pending.deadline is not None]
+            timeout = max(1e-3, min(deadlines) - asyncio.get_running_loop().time()) if deadlines else None
+            try:
+                results = await self._flush_now([pending.item for pending in batch], timeout)
+            except Exception as exc:
+                for pending in batch:
+                    if not pending.future.done():
+                        pending.future.set_exception(exc)
+                return
+        finally:
+            self._slots.release()
+        for pending, result in zip(batch, results):
+            if not pending.future.done():
+                pending.future.set_result(result)
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(
+                self._counters, max_batch=self.max_batch, max_wait_ms=self.max_wait * 1000, max_pending=self.max_pending
+            )
+        stats["pending"] = self._waiting
+        stats[f"{self.unit}_per_batch"] = stats[self.unit] / stats["batches"] if stats["batches"] else None
+        return stats
+
+
+__all__ = ["BatchDeadlineError", "BatcherSaturatedError", "MicroBatcher"]
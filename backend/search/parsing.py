@@ -0,0 +1,189 @@
+"""
+文字列化された埋め込み列（"[0.1, 0.2, ...]"）を一括で float32 行列に変換する。
+
+1行ずつ `ast.literal_eval` で Python のリストを作る変換は、
+数万行 × 1536 次元でロードに数分かかる。ここではチャンク単位で文字列を連結し、
+`np.fromstring` の数値トークナイザで一度に読み込む。チャンクはプロセスプールで
+並列に処理し、parquet がリスト型で保持している場合は pyarrow のバッファをそのまま使う。
+不正な行はロード全体を止めずに行番号で報告する。
+"""
+
+from __future__ import annotations
+
+import multiprocessing
+import os
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Sequence
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+# 1チャンクあたりの行数と、プロセスプールを使い始める行数
+CHUNK_ROWS = 2048
+PARALLEL_MIN_ROWS = 8192
+
+_STRIP_CHARS = " \t\r\n[]"
+
+
+@dataclass
+class ParsedEmbeddings:
+    """一括パースの結果。不正な行は NaN で埋め、行番号を `invalid_rows` に記録する。"""
+
+    matrix: np.ndarray
+    invalid_rows: list[int] = field(default_factory=list)
+
+    @property
+    def valid_mask(self) -> np.ndarray:
+        mask = np.ones(self.matrix.shape[0], dtype=bool)
+        if self.invalid_rows:
+            mask[np.asarray(self.invalid_rows, dtype=np.int64)] = False
+        return mask
+
+
+def _parse_text(text: str) -> np.ndarray:
+    with warnings.catch_warnings():
+        # 古い NumPy では読み残しが DeprecationWarning になるため例外として扱う
+        warnings.simplefilter("error", DeprecationWarning)
+        return np.fromstring(text, dtype=np.float32, sep=",")
+
+
+def _parse_row(value: Any, dim: int | None) -> np.ndarray | None:
+    if isinstance(value, str):
+        try:
+            vec = _parse_text(value.strip(_STRIP_CHARS))
+        except (ValueError, DeprecationWarning):
+            return None
+    elif value is None:
+        return None
+    else:
+        try:
+            vec = np.asarray(value, dtype=np.float32).reshape(-1)
+        except (TypeError, ValueError):
+            return None
+    if vec.size == 0 or (dim is not None and vec.size != dim) or not np.isfinite(vec).all():
+        return None
+    return vec
+
+
+def _parse_chunk(values: Sequence[Any], dim: int, offset: int) -> tuple[np.ndarray, list[int]]:
+    """
+    1チャンク分の行をパースする（プロセスプールのワーカーからも呼ばれる）。
+    各行の区切り（カンマ）の数が次元数と合う場合は全行を連結して一度に読み、
+    合わない行がある・件数が合わない場合は行単位で不正行を特定する。
+    合計の件数だけを見ると、ある行の過不足が隣の行で相殺されて値が行をまたいでずれるため、行ごとに確かめる。
+    """
+    rows = len(values)
+    if all(isinstance(v, str) for v in values):
+        stripped = [v.strip(_STRIP_CHARS) for v in values]
+    else:
+        stripped = None
+    if stripped is not None and all(v.count(",") == dim - 1 for v in stripped):
+        joined = ",".join(stripped)
+        try:
+            flat = _parse_text(joined)
+        except (ValueError, DeprecationWarning):
+            flat = None
+        if flat is not None and flat.size == rows * dim and np.isfinite(flat).all():
+            return flat.reshape(rows, dim), []
+
+    out = np.full((rows, dim), np.nan, dtype=np.float32)
+    invalid: list[int] = []
+    for i, value in enumerate(values):
+        vec = _parse_row(value, dim)
+        if vec is None:
+            invalid.append(offset + i)
+        else:
+            out[i] = vec
+    return out, invalid
+
+
+def _infer_dim(values: Sequence[Any]) -> int:
+    for value in values:
+        vec = _parse_row(value, None)
+        if vec is not None:
+            return int(vec.size)
+    raise ValueError("有効な埋め込みベクトルが1件もありません。")
+
+
+def _parse_arrow_list(array: pa.ChunkedArray | pa.Array, dim: int | None) -> ParsedEmbeddings:
+    """リスト型の列を pyarrow のバッファから直接 float32 行列にする。"""
+    if isinstance(array, pa.ChunkedArray):
+        array = array.combine_chunks()
+    rows = len(array)
+    lengths = pc.fill_null(pc.list_value_length(array), 0).to_numpy(zero_copy_only=False)
+    if dim is None:
+        nonzero = lengths[lengths > 0]
+        if nonzero.size == 0:
+            raise ValueError("有効な埋め込みベクトルが1件もありません。")
+        dim = int(np.bincount(nonzero).argmax())
+
+    ok = lengths == dim
+    if not ok.all():
+        array = pc.filter(array, pa.array(ok))
+    flat = pc.list_flatten(array).cast(pa.float32()).to_numpy(zero_copy_only=False)
+
+    out = np.full((rows, dim), np.nan, dtype=np.float32)
+    out[ok] = flat.reshape(-1, dim)
+    ok &= np.isfinite(out).all(axis=1)
+    invalid = np.flatnonzero(~ok).tolist()
+    return ParsedEmbeddings(out, invalid)
+
+
+def _default_workers() -> int:
+    return max(1, min(os.cpu_count() or 1, 8))
+
+
+def parse_embedding_column(
+    column: pd.Series | pa.ChunkedArray | pa.Array | Sequence[Any],
+    *,
+    dim: int | None = None,
+    workers: int | None = None,
+    chunk_rows: int = CHUNK_ROWS,
+) -> ParsedEmbeddings:
+    """
+    埋め込み列全体を1つの連続した float32 行列（行数 × 次元数）に変換する。
+
+    - pyarrow のリスト型列はバッファから直接読み込む
+    - 文字列列はチャンクごとに一括トークナイズし、行数が多い場合はプロセスプールで並列化する
+    - 不正な行（空・パース不能・次元違い・非有限値）は NaN 行として残し行番号を返す
+    """
+    if isinstance(column, (pa.ChunkedArray, pa.Array)):
+        if pa.types.is_list(column.type) or pa.types.is_large_list(column.type) or pa.types.is_fixed_size_list(column.type):
+            return _parse_arrow_list(column, dim)
+        column = column.to_pylist()
+
+    values = column.tolist() if isinstance(column, pd.Series) else list(column)
+    rows = len(values)
+    if rows == 0:
+        return ParsedEmbeddings(np.empty((0, dim or 0), dtype=np.float32))
+
+    if dim is None:
+        dim = _infer_dim(values)
+
+    bounds = [(start, min(start + chunk_rows, rows)) for start in range(0, rows, chunk_rows)]
+    workers = _default_workers() if workers is None else max(1, workers)
+
+    if workers > 1 and rows >= PARALLEL_MIN_ROWS and len(bounds) > 1:
+        # 読み込みはバックグラウンドのスレッドで動くため fork せず（他スレッドのロック・BLAS の状態を引き継がない）、
+        # 新しいインタプリタで子プロセスを起動する
+        with ProcessPoolExecutor(
+            max_workers=min(workers, len(bounds)), mp_context=multiprocessing.get_context("spawn")
+        ) as pool:
+            futures = [pool.submit(_parse_chunk, values[s:e], dim, s) for s, e in bounds]
+            results = [future.result() for future in futures]
+    else:
+        results = [_parse_chunk(values[s:e], dim, s) for s, e in bounds]
+
+    matrix = np.empty((rows, dim), dtype=np.float32)
+    invalid: list[int] = []
+    for (start, end), (block, bad) in zip(bounds, results):
+        matrix[start:end] = block
+        invalid.extend(bad)
+    return ParsedEmbeddings(matrix, invalid)
+
+
+__all__ = ["ParsedEmbeddings", "parse_embedding_column", "CHUNK_ROWS", "PARALLEL_MIN_ROWS"]
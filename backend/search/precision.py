@@ -0,0 +1,117 @@
+"""
+コーパス行列の低精度表現（float16 / 行ごとにスケールした int8）。
+
+格納は低精度のまま行い、スコアはブロックごとに float32 に戻してから計算する。
+行列の読み出し量（メモリ帯域）と常駐メモリは float32 の 1/2（float16）〜 1/4（int8）になる。
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+
+from backend.search import artifacts
+
+PRECISIONS = ("float32", "float16", "int8")
+
+# 変換時の1ブロックあたりの行数（一時配列を小さく保つ）
+BLOCK_ROWS = 4096
+# スコア計算で float32 に戻す1ブロックあたりの要素数（約 4 MB。CPU キャッシュに収まる大きさ）。
+# 行数ではなく要素数で決めるため、連結行列のように列数が多くても一時配列の大きさは変わらない
+DOT_BLOCK_ELEMENTS = 1 << 20
+
+
+@dataclass(frozen=True)
+class QuantizedMatrix:
+    """低精度で格納した行列。`scales` は int8 の場合の行ごとのスケール。"""
+
+    codes: np.ndarray
+    scales: np.ndarray | None = None
+
+    @property
+    def precision(self) -> str:
+        return "int8" if self.codes.dtype == np.int8 else "float16"
+
+    @property
+    def shape(self) -> tuple[int, int]:
+        return self.codes.shape
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.codes.nbytes) + (int(self.scales.nbytes) if self.scales is not None else 0)
+
+    def block(self, start: int, end: int) -> np.ndarray:
+        """行 [start, end) を float32 に戻す。"""
+        block = self.codes[start:end].astype(np.float32)
+        if self.scales is not None:
+            block *= self.scales[start:end, None]
+        return block
+
+    def to_float32(self) -> np.ndarray:
+        return self.block(0, self.shape[0])
+
+    def dot(self, Q: np.ndarray, block_rows: int | None = None) -> np.ndarray:
+        """`Q @ X.T` を float32 で計算する（Q: クエリ数 × 次元数）。"""
+        Q = np.asarray(Q, dtype=np.float32)
+        if Q.ndim == 1:
+            Q = Q[None, :]
+        rows, cols = self.shape
+        if block_rows is None:
+            block_rows = max(1, DOT_BLOCK_ELEMENTS // max(cols, 1))
+        out = np.empty((Q.shape[0], rows), dtype=np.float32)
+        for start in range(0, rows, block_rows):
+            end = min(start + block_rows, rows)
+            codes = self.codes[start:end].astype(np.float32)
+            scores = Q @ codes.T
+            if self.scales is not None:
+                scores *= self.scales[start:end]
+            out[:, start:end] = scores
+        return out
+
+
+def quantize(X: np.ndarray, precision: str, block_rows: int = BLOCK_ROWS) -> QuantizedMatrix:
+    """float32 行列を指定精度に変換する。int8 は行ごとの最大絶対値で 127 段階に量子化する。"""
+    if precision == "float16":
+        codes = np.empty(X.shape, dtype=np.float16)
+        for start in range(0, X.shape[0], block_rows):
+            codes[start : start + block_rows] = X[start : start + block_rows]
+        return QuantizedMatrix(codes)
+    if precision == "int8":
+        codes = np.empty(X.shape, dtype=np.int8)
+        scales = np.empty(X.shape[0], dtype=np.float32)
+        for start in range(0, X.shape[0], block_rows):
+            block = np.asarray(X[start : start + block_rows], dtype=np.float32)
+            scale = np.abs(block).max(axis=1) / 127.0
+            scale[scale == 0] = 1.0
+            codes[start : start + block_rows] = np.clip(np.rint(block / scale[:, None]), -127, 127)
+            scales[start : start + block_rows] = scale
+        return QuantizedMatrix(codes, scales)
+    raise ValueError(f"未対応の精度です: {precision}（{', '.join(PRECISIONS)} のいずれか）")
+
+
+def load_or_build(directory: Path | None, name: str, X: np.ndarray, precision: str, mmap: bool = True) -> QuantizedMatrix:
+    """
+    バンドル内の低精度行列を読み込む。無い・形状が合わない場合は float32 行列から作成してバンドルに保存する
+    （保存できない場合はメモリ上のみで保持する）。int8 のスケールは符号より先に置き換える。
+    """
+    paths = None
+    if directory is not None:
+        codes_path = directory / f"{name}.{precision}.npy"
+        paths = [directory / f"{name}.{precision}.scale.npy", codes_path] if precision == "int8" else [codes_path]
+
+    def _load(paths, mmap_mode):
+        codes = np.load(paths[-1], mmap_mode=mmap_mode)
+        scales = np.load(paths[0], mmap_mode=mmap_mode) if len(paths) > 1 else None
+        return QuantizedMatrix(codes, scales) if codes.shape == X.shape else None
+
+    def _save(quantized, paths):
+        if quantized.scales is not None:
+            artifacts.save_array(quantized.scales, paths[0])
+        artifacts.save_array(quantized.codes, paths[-1])
+
+    return artifacts.load_or_build(paths, lambda: quantize(X, precision), _load, _save, mmap=mmap)
+
+
+__all__ = ["PRECISIONS", "QuantizedMatrix", "quantize", "load_or_build"]
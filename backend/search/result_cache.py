@@ -0,0 +1,74 @@
+"""
+検索結果のキャッシュ。
+
+最近使った順（LRU）で最大件数を保ち、登録から `ttl` 秒を過ぎたものは返さない。
+キーは呼び出し側で、結果を決めるすべての入力（クエリ・参照データの版・パラメータ）から作る。
+"""
+
+from __future__ import annotations
+
+import copy
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable
+
+
+class ResultCache:
+    """TTL 付きの LRU キャッシュ。`max_items` が 0 以下の場合は何も保持しない。"""
+
+    def __init__(self, max_items: int, ttl: float, clock: Callable[[], float] = time.monotonic) -> None:
+        self.max_items = max_items
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "expired": 0, "evictions": 0, "invalidations": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_items > 0
+
+    def get(self, key: str) -> Any | None:
+        """キャッシュ済みの値のコピーを返す（無い・期限切れの場合は None）。"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._clock() - entry[0] > self.ttl:
+                del self._entries[key]
+                self._counters["expired"] += 1
+                entry = None
+            if entry is None:
+                self._counters["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._counters["hits"] += 1
+            value = entry[1]
+        return copy.deepcopy(value)
+
+    def put(self, key: str, value: Any) -> None:
+        if not self.enabled:
+            return
+        value = copy.deepcopy(value)
+        with self._lock:
+            self._entries[key] = (self._clock(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_items:
+                self._entries.popitem(last=False)
+                self._counters["evictions"] += 1
+
+    def clear(self) -> None:
+        """すべて破棄する（参照データの差し替え時）。"""
+        with self._lock:
+            if self._entries:
+                self._counters["invalidations"] += 1
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._counters, items=len(self._entries), max_items=self.max_items, ttl_seconds=self.ttl)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_ratio"] = stats["hits"] / lookups if lookups else None
+        return stats
+
+
+__all__ = ["ResultCache"]
@@ -0,0 +1,47 @@
+"""
+類似度検索のリクエスト横断のまとめ計算（動的バッチ）。
+
+同時に届いた複数の分析のクエリベクトルを最大 `max_wait` 秒・最大 `max_batch` 件まで集め、
+参照データとの類似度を1回の行列積（GEMM）で計算してから、各リクエストに自分の上位K件と推定予算を返す。
+1件ずつの行列ベクトル積（GEMV）はメモリ帯域で頭打ちになるが、まとめると同じ読み出しで複数のクエリを採点できる。
+集め方・同時実行数・待ち件数の上限・期限の制御は `MicroBatcher` に任せる。
+"""
+
+from __future__ import annotations
+
+from typing import Any, Awaitable, Callable
+
+from backend.search.micro_batcher import MicroBatcher
+
+DEFAULT_MAX_BATCH = 32
+DEFAULT_MAX_WAIT = 0.002
+DEFAULT_MAX_CONCURRENCY = 4
+DEFAULT_MAX_PENDING = 32
+
+
+class SearchBatcher(MicroBatcher):
+    """
+    `await search(queries, timeout)` でまとめて検索するディスパッチャ。`search` はクエリと同じ順で結果のリストを返し、
+    `timeout` はバッチ内で最も早い期限までの残り秒数。まとめ待ちのクエリが `max_pending` 件を超えた分は
+    `BatcherSaturatedError` で断る。
+    """
+
+    def __init__(
+        self,
+        search: Callable[[list[Any], float | None], Awaitable[list[Any]]],
+        max_batch: int = DEFAULT_MAX_BATCH,
+        max_wait: float = DEFAULT_MAX_WAIT,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        max_pending: int = DEFAULT_MAX_PENDING,
+    ) -> None:
+        super().__init__(
+            search,
+            max_batch=max_batch,
+            max_wait=max_wait,
+            max_concurrency=max_concurrency,
+            max_pending=max_pending,
+            unit="queries",
+        )
+
+
+__all__ = ["SearchBatcher"]
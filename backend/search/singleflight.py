@@ -0,0 +1,68 @@
+"""
+同じ内容の処理の相乗り（singleflight）。
+
+同じキーの処理が実行中であれば新たに始めず、実行中の処理の結果を待って受け取る。
+二重クリックや再送で同じ分析が同時に届いても、埋め込み・検索・履歴の保存は1回だけ行う。
+`linger` 秒を指定すると、完了直後に届いた再送にも同じ結果を返す（失敗した結果は残さない）。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from typing import Any, Awaitable, Callable
+
+
+class SingleFlight:
+    """`await do(key, fn)` で、同じ `key` の同時呼び出しに `fn()` 1回分の結果を共有する。"""
+
+    def __init__(self, linger: float = 0.0, clock: Callable[[], float] = time.monotonic) -> None:
+        self.linger = linger
+        self._clock = clock
+        self._inflight: dict[str, asyncio.Task] = {}
+        self._recent: dict[str, tuple[float, Any]] = {}
+        self._lock = threading.Lock()
+        self._counters = {"calls": 0, "executions": 0, "shared": 0, "recent_hits": 0}
+
+    def _recent_value(self, key: str) -> tuple[bool, Any]:
+        now = self._clock()
+        for stale in [k for k, (at, _) in self._recent.items() if now - at > self.linger]:
+            del self._recent[stale]
+        entry = self._recent.get(key)
+        return (True, entry[1]) if entry is not None else (False, None)
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> tuple[Any, bool]:
+        """結果と、他の呼び出しの結果を共有したかどうかを返す。"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            self._counters["calls"] += 1
+            found, value = self._recent_value(key)
+            if found:
+                self._counters["recent_hits"] += 1
+                return value, True
+            task = self._inflight.get(key)
+            shared = task is not None and not task.done() and task.get_loop() is loop
+            if shared:
+                self._counters["shared"] += 1
+            else:
+                # 呼び出し元が切断・取り消されても、相乗りしている他の呼び出しのために処理は最後まで続ける
+                task = loop.create_task(fn())
+                self._inflight[key] = task
+                self._counters["executions"] += 1
+                task.add_done_callback(lambda done, key=key: self._finish(key, done))
+        return await asyncio.shield(task), shared
+
+    def _finish(self, key: str, task: asyncio.Task) -> None:
+        with self._lock:
+            if self._inflight.get(key) is task:
+                del self._inflight[key]
+            if self.linger > 0 and not task.cancelled() and task.exception() is None:
+                self._recent[key] = (self._clock(), task.result())
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._counters, inflight=len(self._inflight), linger_seconds=self.linger)
+
+
+__all__ = ["SingleFlight"]
@@ -0,0 +1,74 @@
+"""
+次元を切り詰めた（Matryoshka）埋め込みによる粗い検索。
+
+text-embedding-3 系のベクトルは先頭の次元だけを取り出して正規化し直しても品質の低下が小さい。
+各フィールドの先頭 `dim` 次元を正規化し直した連結行列 [X1_t | X2_t] で候補を絞り、
+候補は呼び出し側で全次元のベクトルを使って正確に採点し直す。
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+import numpy as np
+
+from backend.search import artifacts
+
+# 切り詰め行列を作る1ブロックあたりの行数（一時配列を小さく保つ）
+BLOCK_ROWS = 4096
+
+
+def _truncate_rows(M: np.ndarray, dim: int) -> np.ndarray:
+    head = np.asarray(M[..., :dim], dtype=np.float32)
+    return head / (np.linalg.norm(head, axis=-1, keepdims=True) + 1e-12)
+
+
+def truncate(X_1: np.ndarray, X_2: np.ndarray, dim: int, block_rows: int = BLOCK_ROWS) -> np.ndarray:
+    """各フィールドの先頭 `dim` 次元を正規化し直して横に連結する（行数 × 2*dim の float32）。"""
+    rows = X_1.shape[0]
+    out = np.empty((rows, 2 * dim), dtype=np.float32)
+    for start in range(0, rows, block_rows):
+        end = min(start + block_rows, rows)
+        out[start:end, :dim] = _truncate_rows(X_1[start:end], dim)
+        out[start:end, dim:] = _truncate_rows(X_2[start:end], dim)
+    return out
+
+
+def truncated_query(Q1_n: np.ndarray, Q2_n: np.ndarray, dim: int, alpha: float, beta: float) -> np.ndarray:
+    """切り詰め行列に掛けるクエリ [alpha*Q1_t | beta*Q2_t] を作る。"""
+    return np.hstack([alpha * _truncate_rows(Q1_n, dim), beta * _truncate_rows(Q2_n, dim)]).astype(np.float32, copy=False)
+
+
+def candidates(X_t: np.ndarray, queries_t: np.ndarray, pool: int) -> np.ndarray:
+    """
+    全クエリの粗いスコアを1回の行列積で求め、クエリごとに上位 `pool` 行の行番号を
+    (クエリ数 × pool) の配列で返す（各行の中は順不同）。
+    """
+    scores = queries_t @ X_t.T
+    if pool >= scores.shape[1]:
+        return np.broadcast_to(np.arange(scores.shape[1]), scores.shape)
+    return np.argpartition(-scores, pool - 1, axis=1)[:, :pool]
+
+
+def load_or_build(
+    directory: Path | None, name: str, X_1: np.ndarray, X_2: np.ndarray, dim: int, mmap: bool = True
+) -> np.ndarray:
+    """
+    バンドル内の切り詰め行列を読み込む。無い・形状が合わない場合は作成してバンドルに保存する
+    （保存できない場合はメモリ上のみで保持する）。
+    """
+
+    def _load(paths, mmap_mode):
+        X_t = np.load(paths[0], mmap_mode=mmap_mode)
+        return X_t if X_t.shape == (X_1.shape[0], 2 * dim) else None
+
+    return artifacts.load_or_build(
+        None if directory is None else [directory / f"{name}.t{dim}.npy"],
+        lambda: truncate(X_1, X_2, dim),
+        _load,
+        lambda X_t, paths: artifacts.save_array(X_t, paths[0]),
+        mmap=mmap,
+    )
+
+
+__all__ = ["truncate", "truncated_query", "candidates", "load_or_build"]
@@ -1,14 +1,220 @@
-import ast  # Pythonの文字列をオブジェクトとして評価するライブラリ
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field, replace
+from functools import cached_property
+from datetime import datetime, timezone
 from pathlib import Path
 
 import numpy as np
 import pandas as pd
+import pyarrow.parquet as pq
 
-# グローバル変数としてデータをキャッシュ
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None  # type: ignore
+
+from backend.search import binary as binary_codes
+from backend.search import filters as search_filters
+from backend.search import ivf
+from backend.search import lexical as lexical_search
+from backend.search import precision as vector_precision
+from backend.search import truncation
+from backend.search.parsing import parse_embedding_column
+from backend.search.result_cache import ResultCache
+
+class CorpusNotReadyError(RuntimeError):
+    """参照データのロードが完了していない（ロード中またはロード失敗）。"""
+
+
+@dataclass(frozen=True)
+class Segment:
+    """ベクトルとメタデータの組。ベースセグメントと、追記用の小さな差分セグメントがある。"""
+
+    name: str
+    df: pd.DataFrame
+    X1_n: np.ndarray
+    X2_n: np.ndarray
+    # 2つのフィールドを横に連結した行列 [X1_n | X2_n]（X1_n / X2_n はこの列方向のビュー）
+    X12_n: np.ndarray | None = None
+    # 低精度で格納した連結行列（SEMANTIC_SEARCH_PRECISION が float32 以外の場合に検索で使う）
+    X12_q: vector_precision.QuantizedMatrix | None = None
+    # 近似最近傍インデックス（SEMANTIC_SEARCH_IVF_LISTS > 0 かつ行数が十分な場合のみ）
+    index: ivf.IVFIndex | None = None
+    # 符号ビットで圧縮した前段フィルタ用の行列（SEMANTIC_SEARCH_BINARY_POOL > 0 の場合のみ）
+    signs: binary_codes.SignCodes | None = None
+    # 先頭の次元だけを正規化し直した粗い検索用の連結行列（SEMANTIC_SEARCH_TRUNCATE_DIM > 0 の場合のみ）
+    X12_t: np.ndarray | None = None
+    # 事業名・事業の概要の文字 n-gram による BM25 インデックス（SEMANTIC_SEARCH_LEXICAL が有効な場合のみ）
+    lexical: lexical_search.LexicalIndex | None = None
+
+    @property
+    def rows(self) -> int:
+        return int(self.X1_n.shape[0])
+
+    @property
+    def precision(self) -> str:
+        return self.X12_q.precision if self.X12_q is not None else "float32"
+
+    @property
+    def vector_bytes(self) -> int:
+        """検索で読み出す行列のバイト数（低精度表現がある場合はそちら）。"""
+        if self.X12_q is not None:
+            return self.X12_q.nbytes
+        return self.float32_bytes
+
+    @property
+    def float32_bytes(self) -> int:
+        if self.X12_n is not None:
+            return int(self.X12_n.nbytes)
+        return int(self.X1_n.nbytes) + int(self.X2_n.nbytes)
+
+    @property
+    def resident_vector_bytes(self) -> int:
+        """
+        常駐する行列の合計バイト数。低精度の行列がある場合、float32 の行列（候補の採点し直し・差分の畳み込みに使う）は
+        メモリマップで開き読んだ行だけがページに載るため、メモリマップできなかった場合だけ数える。
+        """
+        if self.X12_q is None:
+            return self.float32_bytes
+        return self.X12_q.nbytes + (0 if isinstance(self.X12_n, np.memmap) else self.float32_bytes)
+
+    @cached_property
+    def partitions(self) -> search_filters.Partitions:
+        """府省庁別・年度別の行番号と、予算額順の行番号（絞り込み検索用）。"""
+        return search_filters.build_partitions(self.df)
+
+    @cached_property
+    def budgets(self) -> np.ndarray:
+        """当初予算の float64 配列（列が無い・数値でない場合は NaN）。"""
+        if "当初予算" not in self.df.columns:
+            return np.full(self.rows, np.nan)
+        return pd.to_numeric(self.df["当初予算"], errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+
+    @cached_property
+    def payload_columns(self) -> dict:
+        """
+        類似事業の応答に使う文字列の列（応答の項目名 → Arrow の文字列配列）。
+        読み込み時に一度だけ型を揃えておき、応答の組み立ては配列の取り出しだけで済ませる。
+        """
+        return {
+            field: self.df[column].astype(TEXT_DTYPE).array
+            for field, column, _ in PAYLOAD_TEXT_FIELDS
+            if column in self.df.columns
+        }
+
+    def project_payloads(self, rows: np.ndarray, similarities: np.ndarray) -> list[dict]:
+        """指定した行の類似事業情報（フロントエンドへ渡す形）をまとめて返す。"""
+        rows = np.asarray(rows, dtype=np.intp)
+        texts = {}
+        for field, _, default in PAYLOAD_TEXT_FIELDS:
+            array = self.payload_columns.get(field)
+            values = array.take(rows).tolist() if array is not None else [None] * len(rows)
+            # 欠損（pd.NA）は既定値にする
+            texts[field] = [value if isinstance(value, str) else default for value in values]
+        budgets = self.budgets[rows].tolist()
+        return [
+            {
+                "project_id": texts["project_id"][i],
+                "project_name": texts["project_name"][i],
+                "ministry_name": texts["ministry_name"][i],
+                "budget": budget if budget == budget else None,  # NaN（欠損）は None
+                "similarity": similarity,
+                "project_overview": texts["project_overview"][i],
+                "project_url": texts["project_url"][i],
+            }
+            for i, (budget, similarity) in enumerate(zip(budgets, np.asarray(similarities, dtype=float).tolist()))
+        ]
+
+
+@dataclass(frozen=True)
+class Corpus:
+    """
+    ある時点の参照データのスナップショット。
+    再読み込み時は新しいスナップショットを別に組み立ててから差し替えるため、
+    検索中の呼び出しは開始時に取得した版のまま最後まで処理できる。
+    """
+
+    version: str
+    base: Segment
+    source: str | None = None
+    deltas: tuple[Segment, ...] = ()
+    # ベースに畳み込み済みの差分セグメント ID
+    compacted_deltas: tuple[str, ...] = ()
+    base_version: str | None = None
+    loaded_at: str = field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
+
+    @property
+    def df(self) -> pd.DataFrame:
+        return self.base.df
+
+    @property
+    def X1_n(self) -> np.ndarray:
+        return self.base.X1_n
+
+    @property
+    def X2_n(self) -> np.ndarray:
+        return self.base.X2_n
+
+    @property
+    def segments(self) -> tuple[Segment, ...]:
+        return (self.base,) + self.deltas
+
+    @property
+    def delta_ids(self) -> tuple[str, ...]:
+        return self.compacted_deltas + tuple(segment.name for segment in self.deltas)
+
+    @property
+    def rows(self) -> int:
+        return sum(segment.rows for segment in self.segments)
+
+    @property
+    def dim(self) -> int:
+        return int(self.base.X1_n.shape[1])
+
+
+# 現在有効なスナップショット（差し替えは参照の代入1回で行う）
+_corpus: Corpus | None = None
+
+# 互換性のためのエイリアス（常に `_corpus` と同じ版を指す）
 df = None
 X1_n = None
 X2_n = None
 
+# バックグラウンドロードの進捗（/readyz で公開する）
+_status_lock = threading.Lock()
+_load_lock = threading.Lock()
+_reload_lock = threading.Lock()
+_load_thread: threading.Thread | None = None
+_watch_thread: threading.Thread | None = None
+_compact_thread: threading.Thread | None = None
+_load_status: dict = {
+    "status": "idle",
+    "stage": None,
+    "progress": 0.0,
+    "version": None,
+    "rows": None,
+    "dim": None,
+    "memory_bytes": None,
+    "vectors_mapped": None,
+    "precision": None,
+    "index": None,
+    "prefilter": None,
+    "lexical": None,
+    "segments": None,
+    "load_seconds": None,
+    "loaded_at": None,
+    "reloading": False,
+    "error": None,
+    "last_reload_error": None,
+}
+
 # 候補データファイルを上から順に探索（parquet優先）
 DATA_FILE_CANDIDATES = [
     Path(__file__).resolve().parent / "final.parquet",
@@ -19,6 +225,128 @@ DATA_FILE_CANDIDATES = [
     Path(__file__).resolve().parent.parent / "data" / "final_2024.csv",
 ]
 
+# 埋め込みベクトルを文字列で保持している列
+EMBEDDING_COLUMNS = ("embedding_sum", "embedding_ass")
+
+# 検索結果の整形に使う列だけを保持する（それ以外の列は読み込まない）
+METADATA_COLUMNS = ("予算事業ID", "事業名", "府省庁", "年度", "当初予算", "事業の概要", "事業概要URL")
+# 種類の少ない値はカテゴリ型（辞書エンコード）で、数値は float64 配列で保持する
+CATEGORICAL_COLUMNS = ("府省庁",)
+NUMERIC_COLUMNS = ("年度", "当初予算")
+# 長いテキストは Python の str オブジェクトではなく Arrow の文字列バッファで保持する
+TEXT_DTYPE = pd.StringDtype("pyarrow")
+# 類似事業の応答の文字列項目: (項目名, 元データの列, 欠損時の値)
+PAYLOAD_TEXT_FIELDS = (
+    ("project_id", "予算事業ID", ""),
+    ("project_name", "事業名", ""),
+    ("ministry_name", "府省庁", ""),
+    ("project_overview", "事業の概要", "情報なし"),
+    ("project_url", "事業概要URL", ""),
+)
+
+# 事前コンパイル済みバンドル（`python -m backend.semantic_search build` で生成）
+# v2: 2つの行列を連結した1つの行列 X12_n.npy（行数 × 2次元数）で保持する
+BUNDLE_FORMAT_VERSION = 2
+BUNDLE_SUFFIX = ".bundle"
+BUNDLE_MANIFEST = "manifest.json"
+BUNDLE_METADATA = "metadata.parquet"
+BUNDLE_VECTORS = {"X12_n": "X12_n.npy"}
+
+# 追記用の差分セグメント（`python -m backend.semantic_search append` で追加）
+DELTAS_SUFFIX = ".deltas"
+
+
+def _env_flag(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() not in {"0", "false", "no", "off"}
+
+
+# 正規化済み行列をメモリマップ（読み取り専用）で開き、全ワーカーで同じ物理ページを共有する
+MMAP_VECTORS = _env_flag("SEMANTIC_SEARCH_MMAP", True)
+# バンドルが無い・古い場合に起動時に自動でコンパイルする（最初のワーカーのみが生成する）
+AUTO_BUILD_BUNDLE = _env_flag("SEMANTIC_SEARCH_AUTO_BUNDLE", True)
+# 差分セグメントの合計行数・個数がこれを超えたら、バックグラウンドでベースに畳み込む
+COMPACT_DELTA_ROWS = int(os.getenv("SEMANTIC_SEARCH_COMPACT_ROWS", "5000"))
+COMPACT_MAX_DELTAS = int(os.getenv("SEMANTIC_SEARCH_COMPACT_SEGMENTS", "8"))
+# 検索に使う行列の精度（float32 / float16 / int8）。スコアは常に float32 で計算する
+VECTOR_PRECISION = os.getenv("SEMANTIC_SEARCH_PRECISION", "float32").strip().lower() or "float32"
+if VECTOR_PRECISION not in vector_precision.PRECISIONS:
+    raise ValueError(f"SEMANTIC_SEARCH_PRECISION が不正です: {VECTOR_PRECISION}")
+
+# 2つのフィールドの類似度を混ぜる重み。クエリ側 [ALPHA*Q1 | BETA*Q2] に掛けるため、
+# 変更しても連結行列を作り直す必要はない
+SCORE_ALPHA = float(os.getenv("SEMANTIC_SEARCH_ALPHA", "0.5"))
+SCORE_BETA = float(os.getenv("SEMANTIC_SEARCH_BETA", "0.5"))
+# IVF インデックスのリスト数（0 で無効）。行数が IVF_MIN_ROWS 未満のセグメントは常に全件を計算する
+IVF_LISTS = int(os.getenv("SEMANTIC_SEARCH_IVF_LISTS", "0") or 0)
+IVF_MIN_ROWS = int(os.getenv("SEMANTIC_SEARCH_IVF_MIN_ROWS", "10000"))
+# 検索時に調べるリスト数
+IVF_NPROBE = int(os.getenv("SEMANTIC_SEARCH_IVF_NPROBE", "8"))
+# 残差を直積量子化する部分空間の数（0 で無効）と、近似スコアで残して正確に並べ直す候補数
+IVF_PQ_SUBSPACES = int(os.getenv("SEMANTIC_SEARCH_IVF_PQ", "0") or 0)
+IVF_RERANK = int(os.getenv("SEMANTIC_SEARCH_IVF_RERANK", "200"))
+# 符号ビットのハミング距離で絞り込む候補数（0 で無効）。候補は float32 で正確に採点し直す
+BINARY_POOL = int(os.getenv("SEMANTIC_SEARCH_BINARY_POOL", "0") or 0)
+# 粗い検索に使う次元数（0 で無効）と、全次元で正確に採点し直す候補数
+TRUNCATE_DIM = int(os.getenv("SEMANTIC_SEARCH_TRUNCATE_DIM", "0") or 0)
+TRUNCATE_POOL = int(os.getenv("SEMANTIC_SEARCH_TRUNCATE_POOL", "200"))
+# 語彙検索（BM25）のインデックスを作り、クエリ文字列があれば埋め込みの順位と RRF で統合する
+LEXICAL_SEARCH = _env_flag("SEMANTIC_SEARCH_LEXICAL", True)
+LEXICAL_COLUMNS = ("事業名", "事業の概要")
+# RRF の定数 k と、各検索から統合に渡す上位件数
+RRF_K = int(os.getenv("SEMANTIC_SEARCH_RRF_K", "60"))
+RRF_POOL = int(os.getenv("SEMANTIC_SEARCH_RRF_POOL", "50"))
+
+# 推定に使う上位件数と、ソフトマックスの温度
+TOPK = 5
+TAU = 0.08
+
+# 検索結果のキャッシュ（件数 0 で無効）。参照データを差し替えると破棄する
+RESULT_CACHE_ITEMS = int(os.getenv("SEMANTIC_SEARCH_RESULT_CACHE", "1024") or 0)
+RESULT_CACHE_TTL = float(os.getenv("SEMANTIC_SEARCH_RESULT_TTL", "600"))
+_result_cache = ResultCache(RESULT_CACHE_ITEMS, RESULT_CACHE_TTL)
+# 参照データの更新を監視する間隔（秒）。0 以下で監視しない
+WATCH_INTERVAL_SECONDS = float(os.getenv("SEMANTIC_SEARCH_WATCH_INTERVAL", "0") or 0)
+
+
+def _update_status(**fields) -> None:
+    with _status_lock:
+        _load_status.update(fields)
+
+
+def _set_stage(stage: str, progress: float) -> None:
+    _update_status(stage=stage, progress=round(progress, 3))
+
+
+def get_load_status() -> dict:
+    """ロード状態（status / stage / progress / rows / dim / memory_bytes / load_seconds / error）を返す。"""
+    with _status_lock:
+        return dict(_load_status)
+
+
+def is_ready() -> bool:
+    return _corpus is not None
+
+
+def get_corpus() -> Corpus:
+    """現在有効なスナップショットを返す。検索1回の間はこの戻り値だけを参照すること。"""
+    corpus = _corpus
+    if corpus is None:
+        raise CorpusNotReadyError("データがロードされていません。'load_data_and_vectors'を先に実行してください。")
+    return corpus
+
+
+def _activate(corpus: Corpus | None) -> None:
+    global _corpus, df, X1_n, X2_n
+    _corpus = corpus
+    # 版が変わった（または同じ版を読み直した）ので、以前の検索結果は使わない
+    _result_cache.clear()
+    df = corpus.df if corpus is not None else None
+    X1_n = corpus.X1_n if corpus is not None else None
+    X2_n = corpus.X2_n if corpus is not None else None
+
 
 def _resolve_data_path():
     for candidate in DATA_FILE_CANDIDATES:
@@ -28,26 +356,6 @@ def _resolve_data_path():
         "類似事業データが見つかりません。'final.parquet' もしくは 'final_2024.csv' を配置してください。"
     )
 
-def to_vec(x):
-    """
-    文字列化されたPythonリスト（例: "[0.1, 0.2, ...]"）を
-    numpy配列に安全に変換する、これが最終版の関数です。
-    """
-    if not isinstance(x, str):
-        try:
-            return np.asarray(x, dtype="float32")
-        except:
-            return np.array([], dtype="float32")
-    try:
-        # ast.literal_eval を使って、カンマ区切りのリスト文字列を
-        # Pythonの数値リストとして安全に解釈します。
-        vec_list = ast.literal_eval(x)
-        return np.array(vec_list, dtype="float32")
-    except Exception as e:
-        print(f"ベクトル変換エラー: {e}, 元の文字列: '{x[:150]}...'")
-        return np.array([], dtype="float32")
-
-# --- これ以降の関数は変更ありません ---
 
 def normalize_rows(M):
     if M.ndim == 1:
@@ -84,146 +392,1504 @@ def weighted_log_mean(values, weights):
     return float(np.exp(log_mean))
 
 
+_sha256_cache: dict[tuple[str, int, int], str] = {}
+
+
+def _file_sha256(path: Path) -> str:
+    # 同じプロセス内で同じファイルを何度もハッシュしないよう、サイズと更新時刻で覚えておく
+    stat = path.stat()
+    key = (str(path.resolve()), stat.st_size, stat.st_mtime_ns)
+    cached = _sha256_cache.get(key)
+    if cached is not None:
+        return cached
+    digest = hashlib.sha256()
+    with path.open("rb") as fh:
+        for chunk in iter(lambda: fh.read(1 << 20), b""):
+            digest.update(chunk)
+    _sha256_cache[key] = digest.hexdigest()
+    return _sha256_cache[key]
+
+
+def compact_metadata(frame: pd.DataFrame) -> pd.DataFrame:
+    """
+    類似事業の応答・推定に使う列だけを、省メモリな型に変換して返す。
+    府省庁はカテゴリ型、年度・当初予算は float64、テキストは Arrow 文字列にする。
+    """
+    columns = {}
+    for column in METADATA_COLUMNS:
+        if column not in frame.columns:
+            continue
+        series = frame[column]
+        if column in NUMERIC_COLUMNS:
+            columns[column] = pd.to_numeric(series, errors="coerce").astype("float64")
+        elif column in CATEGORICAL_COLUMNS:
+            columns[column] = series.astype("category")
+        else:
+            columns[column] = series.astype(TEXT_DTYPE)
+    return pd.DataFrame(columns).reset_index(drop=True)
+
+
+def _read_source(data_path: Path) -> tuple[pd.DataFrame, dict]:
+    """
+    元データから必要な列だけを読み込み、コンパクトなメタデータと埋め込み列を返す。
+    parquet の場合、埋め込み列は pyarrow の列のまま渡し、リスト型ならバッファを直接使う。
+    """
+    wanted = METADATA_COLUMNS + EMBEDDING_COLUMNS
+    if data_path.suffix == ".parquet":
+        available = pq.read_schema(data_path).names
+        table = pq.read_table(data_path, columns=[column for column in wanted if column in available])
+        present = [column for column in EMBEDDING_COLUMNS if column in table.column_names]
+        columns = {column: table.column(column) for column in present}
+        frame = table.drop_columns(present).to_pandas()
+    else:
+        frame = pd.read_csv(data_path, usecols=lambda column: column in wanted)
+        present = [column for column in EMBEDDING_COLUMNS if column in frame.columns]
+        columns = {column: frame[column] for column in present}
+        frame = frame.drop(columns=present)
+
+    missing = [column for column in EMBEDDING_COLUMNS if column not in columns]
+    if missing:
+        raise ValueError(f"埋め込み列が見つかりません: {', '.join(missing)}")
+    return compact_metadata(frame), columns
+
+
+def _parse_source(data_path: Path) -> tuple[pd.DataFrame, np.ndarray, np.ndarray, list[int]]:
+    """
+    元データをパースし、行正規化済みの float32 行列を返す。
+    不正なベクトルを含む行はロードを止めずに除外し、元データの行番号を返す。
+    """
+    _set_stage("reading", 0.05)
+    frame, columns = _read_source(data_path)
+    _set_stage("parsing_embedding_sum", 0.2)
+    parsed_1 = parse_embedding_column(columns["embedding_sum"])
+    _set_stage("parsing_embedding_ass", 0.5)
+    parsed_2 = parse_embedding_column(columns["embedding_ass"])
+    _set_stage("normalizing", 0.8)
+
+    valid = parsed_1.valid_mask & parsed_2.valid_mask
+    invalid_rows = np.flatnonzero(~valid).tolist()
+    if not valid.any():
+        raise ValueError("有効なベクトルを持つ行がありません。")
+    if invalid_rows:
+        print(
+            f"⚠️ 不正なベクトルを含む {len(invalid_rows)} 行を除外しました。"
+            f" 行番号: {invalid_rows}"
+        )
+        frame = frame.loc[valid].reset_index(drop=True)
+
+    X_1 = normalize_rows(parsed_1.matrix[valid]).astype("float32", copy=False)
+    X_2 = normalize_rows(parsed_2.matrix[valid]).astype("float32", copy=False)
+    return frame, X_1, X_2, invalid_rows
+
+
+def bundle_dir_for(data_path: Path) -> Path:
+    """元データに対応するバンドルディレクトリ（例: final.parquet -> final.bundle/）。"""
+    return data_path.with_name(data_path.stem + BUNDLE_SUFFIX)
+
+
+def read_bundle_manifest(bundle_dir: Path) -> dict | None:
+    manifest_path = bundle_dir / BUNDLE_MANIFEST
+    if not manifest_path.exists():
+        return None
+    try:
+        return json.loads(manifest_path.read_text(encoding="utf-8"))
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
+def _write_bundle(target: Path, metadata: pd.DataFrame, X_1: np.ndarray, X_2: np.ndarray, **fields) -> Path:
+    """行列・メタデータ・マニフェストを書き出す。書き込み途中のものは読まれないよう最後に置き換える。"""
+    staging = target.with_name(f"{target.name}.tmp-{os.getpid()}")
+    if staging.exists():
+        shutil.rmtree(staging)
+    staging.mkdir(parents=True)
+
+    rows, dim = X_1.shape
+    fused = np.lib.format.open_memmap(
+        staging / BUNDLE_VECTORS["X12_n"], mode="w+", dtype=np.float32, shape=(rows, 2 * dim)
+    )
+    for start in range(0, rows, vector_precision.BLOCK_ROWS):
+        end = min(start + vector_precision.BLOCK_ROWS, rows)
+        fused[start:end, :dim] = X_1[start:end]
+        fused[start:end, dim:] = X_2[start:end]
+    fused.flush()
+    del fused
+    metadata.reset_index(drop=True).to_parquet(staging / BUNDLE_METADATA, index=False)
+
+    manifest = {
+        "format_version": BUNDLE_FORMAT_VERSION,
+        **fields,
+        "rows": int(X_1.shape[0]),
+        "dim": int(X_1.shape[1]),
+        "dtype": "float32",
+        "layout": "X12_n = [X1_n | X2_n]",
+        "vectors": dict(BUNDLE_VECTORS),
+        "metadata": BUNDLE_METADATA,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+    }
+    (staging / BUNDLE_MANIFEST).write_text(
+        json.dumps(manifest, ensure_ascii=False, indent=2), encoding="utf-8"
+    )
+
+    if target.exists():
+        shutil.rmtree(target)
+    staging.rename(target)
+    return target
+
+
+def _source_fields(data_path: Path) -> dict:
+    return {
+        "name": data_path.name,
+        "sha256": _file_sha256(data_path),
+        "size": data_path.stat().st_size,
+    }
+
+
+def build_bundle(source: Path | None = None, output_dir: Path | None = None) -> Path:
+    """
+    parquet/CSV を一度だけパースし、サービング用バンドルを書き出す。
+
+    バンドルの中身:
+      - X12_n.npy           : 行正規化済み float32 行列 [X1_n | X2_n]（行数 × 2次元数）
+      - metadata.parquet    : 埋め込み文字列を除いたメタデータ
+      - manifest.json       : 行数・次元数・元データのチェックサム・除外した行番号
+    """
+    data_path = Path(source) if source is not None else _resolve_data_path()
+    target = Path(output_dir) if output_dir is not None else bundle_dir_for(data_path)
+
+    source_fields = _source_fields(data_path)
+    metadata, X_1, X_2, invalid_rows = _parse_source(data_path)
+    return _write_bundle(
+        target,
+        metadata,
+        X_1,
+        X_2,
+        source=source_fields,
+        skipped_rows=invalid_rows,
+        compacted_deltas=[],
+    )
+
+
+def _bundle_matches(manifest: dict | None, data_path: Path) -> bool:
+    if not manifest or manifest.get("format_version") != BUNDLE_FORMAT_VERSION:
+        return False
+    source = manifest.get("source") or {}
+    if source.get("size") != data_path.stat().st_size:
+        return False
+    return source.get("sha256") == _file_sha256(data_path)
+
+
+@contextmanager
+def _bundle_build_lock(bundle_dir: Path):
+    """複数ワーカーが同時に起動しても、バンドルの生成は1プロセスだけが行う。"""
+    lock_path = bundle_dir.with_name(bundle_dir.name + ".lock")
+    with lock_path.open("a+") as fh:
+        if fcntl is not None:
+            fcntl.flock(fh.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+
+
+def _mmap_float32() -> bool:
+    """
+    float32 の行列をメモリマップで開くか。低精度で検索する場合は float32 の行列を候補の採点し直し・差分の畳み込みで
+    一部の行しか読まないため、SEMANTIC_SEARCH_MMAP に関わらずバンドルに置いてメモリマップする（全体を常駐させない）。
+    """
+    return MMAP_VECTORS or VECTOR_PRECISION != "float32"
+
+
+def load_bundle(bundle_dir: Path, mmap: bool | None = None) -> tuple[pd.DataFrame, np.ndarray, np.ndarray]:
+    """
+    バンドルからメタデータと正規化済み行列を読み込む。
+    mmap が有効な場合、行列は読み取り専用の np.memmap としてページキャッシュを共有する。
+    返す X1_n / X2_n は連結行列 X12_n の列方向のビュー（コピーしない）。
+    """
+    manifest = read_bundle_manifest(bundle_dir)
+    if manifest is None:
+        raise FileNotFoundError(f"バンドルのマニフェストが見つかりません: {bundle_dir}")
+
+    mmap_mode = "r" if (_mmap_float32() if mmap is None else mmap) else None
+    metadata = compact_metadata(pd.read_parquet(bundle_dir / manifest["metadata"]))
+    fused = np.load(bundle_dir / manifest["vectors"]["X12_n"], mmap_mode=mmap_mode)
+
+    rows, dim = manifest["rows"], manifest["dim"]
+    if fused.shape != (rows, 2 * dim) or len(metadata) != rows:
+        raise ValueError(f"バンドルの形状がマニフェストと一致しません: {bundle_dir}")
+    return metadata, fused[:, :dim], fused[:, dim:]
+
+
+def load_corpus(data_path: Path) -> tuple[pd.DataFrame, np.ndarray, np.ndarray]:
+    """
+    元データに一致するバンドルがあればそれを読み、なければ元データをパースする。
+    メモリマップが有効な場合は、バンドルを生成してからマップして全ワーカーで共有する。
+    """
+    bundle_dir = bundle_dir_for(data_path)
+    _set_stage("checking_bundle", 0.01)
+    if _bundle_matches(read_bundle_manifest(bundle_dir), data_path):
+        print(f"バンドル '{bundle_dir.name}' から読み込んでいます...")
+        _set_stage("loading_bundle", 0.5)
+        return load_bundle(bundle_dir)
+
+    if AUTO_BUILD_BUNDLE and _mmap_float32():
+        try:
+            with _bundle_build_lock(bundle_dir):
+                # ロック待ちの間に他のワーカーが生成済みであればそれを使う
+                if not _bundle_matches(read_bundle_manifest(bundle_dir), data_path):
+                    print(f"参照データ '{data_path.name}' をバンドルにコンパイルしています...")
+                    build_bundle(data_path, bundle_dir)
+            _set_stage("loading_bundle", 0.9)
+            return load_bundle(bundle_dir)
+        except OSError as exc:
+            print(f"⚠️ バンドルを生成できなかったため、メモリ上に読み込みます: {exc}")
+
+    print(f"参照データ '{data_path.name}' を読み込んでいます...")
+    frame, X_1, X_2, _ = _parse_source(data_path)
+    return frame, X_1, X_2
+
+
+def _memory_footprint(corpus: Corpus) -> int:
+    """メタデータと行列のおおよそのメモリ使用量（バイト）。メモリマップ分は共有ページを含む。"""
+    total = 0
+    for segment in corpus.segments:
+        total += int(segment.df.memory_usage(index=True, deep=True).sum())
+        total += segment.resident_vector_bytes
+        if segment.index is not None:
+            total += segment.index.nbytes
+        if segment.signs is not None:
+            total += segment.signs.nbytes
+        if segment.X12_t is not None:
+            total += int(segment.X12_t.nbytes)
+        if segment.lexical is not None:
+            total += segment.lexical.nbytes
+    return total
+
+
+def _fused_parent(X_1: np.ndarray, X_2: np.ndarray) -> np.ndarray | None:
+    """X_1 / X_2 が同じ連結行列 [X_1 | X_2] の列ビューであれば、その連結行列を返す。"""
+    parent = X_1.base
+    if parent is None or X_2.base is not parent or not isinstance(parent, np.ndarray):
+        return None
+    rows, dim = X_1.shape
+    if parent.shape != (rows, 2 * dim) or parent.dtype != np.float32 or not parent.flags.c_contiguous:
+        return None
+    start = parent.__array_interface__["data"][0]
+    if X_1.__array_interface__["data"][0] != start:
+        return None
+    if X_2.__array_interface__["data"][0] != start + dim * parent.itemsize:
+        return None
+    return parent
+
+
+def fuse_fields(X_1: np.ndarray, X_2: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    連結行列 [X_1 | X_2] と、その列ビューとしての X_1 / X_2 を返す。
+    既に連結行列のビューであればそのまま使い、そうでなければ1度だけ連結する（元の配列は参照しない）。
+    """
+    fused = _fused_parent(X_1, X_2)
+    if fused is None:
+        fused = np.hstack([np.asarray(X_1, dtype=np.float32), np.asarray(X_2, dtype=np.float32)])
+    dim = X_1.shape[1]
+    return fused, fused[:, :dim], fused[:, dim:]
+
+
+def _lexical_texts(frame: pd.DataFrame) -> list[str]:
+    """語彙検索の対象にする文字列（事業名と事業の概要を改行でつないだもの）。"""
+    columns = [frame[column].fillna("").astype(str) for column in LEXICAL_COLUMNS if column in frame.columns]
+    if not columns:
+        return [""] * len(frame)
+    return ["\n".join(parts) for parts in zip(*columns)]
+
+
+def _make_segment(
+    name: str,
+    frame: pd.DataFrame,
+    X_1: np.ndarray,
+    X_2: np.ndarray,
+    directory: Path | None = None,
+    precision: str | None = None,
+) -> Segment:
+    """
+    セグメントを組み立てる。低精度が指定されている場合は低精度の行列も、IVF が有効で行数が
+    十分な場合はインデックスも用意する（バンドルがあればそこに保存・メモリマップし、全ワーカーで共有する）。
+    """
+    precision = VECTOR_PRECISION if precision is None else precision
+    fused, X_1, X_2 = fuse_fields(X_1, X_2)
+    quantized = None
+    if precision != "float32":
+        quantized = vector_precision.load_or_build(directory, "X12_n", fused, precision, mmap=MMAP_VECTORS)
+    index = None
+    if IVF_LISTS > 0 and fused.shape[0] >= max(IVF_MIN_ROWS, IVF_LISTS):
+        _set_stage("building_index", 0.97)
+        index = ivf.load_or_build(
+            directory, "X12_n", fused, IVF_LISTS, pq_subspaces=IVF_PQ_SUBSPACES, mmap=MMAP_VECTORS
+        )
+    signs = None
+    if BINARY_POOL > 0 and fused.shape[0] > BINARY_POOL:
+        signs = binary_codes.load_or_build(directory, "X12_n", X_1, X_2, mmap=MMAP_VECTORS)
+    truncated = None
+    if 0 < TRUNCATE_DIM < X_1.shape[1] and fused.shape[0] > TRUNCATE_POOL:
+        truncated = truncation.load_or_build(directory, "X12_n", X_1, X_2, TRUNCATE_DIM, mmap=MMAP_VECTORS)
+    lexical_index = None
+    if LEXICAL_SEARCH:
+        _set_stage("building_lexical_index", 0.98)
+        lexical_index = lexical_search.build(_lexical_texts(frame))
+    segment = Segment(
+        name,
+        frame,
+        X_1,
+        X_2,
+        X12_n=fused,
+        X12_q=quantized,
+        index=index,
+        signs=signs,
+        X12_t=truncated,
+        lexical=lexical_index,
+    )
+    # 絞り込み検索用の分割と応答用の列はスナップショットの作成時に用意しておく
+    segment.partitions
+    segment.payload_columns
+    return segment
+
+
+def _corpus_version(base_version: str, delta_ids: tuple[str, ...]) -> str:
+    """元データのチェックサムと適用済み差分の組から版を決める（内容が同じなら同じ版）。"""
+    if not delta_ids:
+        return base_version
+    digest = hashlib.sha256("\n".join(sorted(delta_ids)).encode("utf-8")).hexdigest()
+    return f"{base_version}+{digest[:8]}"
+
+
+def deltas_dir_for(data_path: Path) -> Path:
+    """元データに対応する差分セグメントの置き場（例: final.parquet -> final.deltas/）。"""
+    return data_path.with_name(data_path.stem + DELTAS_SUFFIX)
+
+
+def _list_delta_dirs(data_path: Path) -> list[Path]:
+    root = deltas_dir_for(data_path)
+    if not root.is_dir():
+        return []
+    return sorted(
+        path
+        for path in root.iterdir()
+        if path.is_dir() and ".tmp-" not in path.name and (path / BUNDLE_MANIFEST).exists()
+    )
+
+
+def write_delta(source: Path, data_path: Path | None = None) -> Path:
+    """
+    追加分の parquet/CSV（元データと同じ列構成）を差分セグメントとして書き出す。
+    既存のベース・差分は変更しない（追記のみ）。
+    """
+    source = Path(source)
+    data_path = Path(data_path) if data_path is not None else _resolve_data_path()
+    source_fields = _source_fields(source)
+    metadata, X_1, X_2, invalid_rows = _parse_source(source)
+    delta_id = f"{datetime.now(timezone.utc):%Y%m%dT%H%M%S%f}-{source_fields['sha256'][:8]}"
+    target = deltas_dir_for(data_path) / delta_id
+    target.parent.mkdir(parents=True, exist_ok=True)
+    return _write_bundle(target, metadata, X_1, X_2, id=delta_id, source=source_fields, skipped_rows=invalid_rows)
+
+
+def _load_deltas(data_path: Path, skip: set[str], dim: int) -> tuple[Segment, ...]:
+    segments = []
+    for delta_dir in _list_delta_dirs(data_path):
+        if delta_dir.name in skip:
+            continue
+        try:
+            frame, X_1, X_2 = load_bundle(delta_dir)
+        except (OSError, ValueError, KeyError) as exc:
+            print(f"⚠️ 差分セグメント '{delta_dir.name}' を読み込めませんでした: {exc}")
+            continue
+        if X_1.shape[1] != dim:
+            print(f"⚠️ 差分セグメント '{delta_dir.name}' は次元数が異なるため無視します: {X_1.shape[1]} != {dim}")
+            continue
+        segments.append(_make_segment(delta_dir.name, frame, X_1, X_2, delta_dir))
+    return tuple(segments)
+
+
+def _load_snapshot(data_path: Path) -> Corpus:
+    frame, X_1, X_2 = load_corpus(data_path)
+    bundle_dir = bundle_dir_for(data_path)
+    manifest = read_bundle_manifest(bundle_dir)
+    compacted: tuple[str, ...] = ()
+    if manifest is not None and _bundle_matches(manifest, data_path):
+        compacted = tuple(manifest.get("compacted_deltas") or ())
+    else:
+        bundle_dir = None
+    _set_stage("loading_deltas", 0.95)
+    deltas = _load_deltas(data_path, set(compacted), int(X_1.shape[1]))
+    base_version = _file_sha256(data_path)[:16]
+    return Corpus(
+        version=_corpus_version(base_version, compacted + tuple(segment.name for segment in deltas)),
+        base=_make_segment("base", frame, X_1, X_2, bundle_dir),
+        source=str(data_path),
+        deltas=deltas,
+        compacted_deltas=compacted,
+        base_version=base_version,
+    )
+
+
+def _index_fields(index: ivf.IVFIndex | None) -> dict | None:
+    if index is None:
+        return None
+    return {"type": "ivf", "lists": index.n_lists, "pq_subspaces": index.pq_subspaces, "nprobe": IVF_NPROBE}
+
+
+def _prefilter_fields(segment: Segment) -> dict | None:
+    if segment.signs is not None:
+        return {"type": "binary", "pool": BINARY_POOL, "bytes": segment.signs.nbytes}
+    if segment.X12_t is not None:
+        dim = segment.X12_t.shape[1] // 2
+        return {"type": "truncated", "dim": dim, "pool": TRUNCATE_POOL, "bytes": int(segment.X12_t.nbytes)}
+    return None
+
+
+def _lexical_fields(index: lexical_search.LexicalIndex | None) -> dict | None:
+    if index is None:
+        return None
+    return {"type": "bm25", "terms": len(index.vocabulary), "postings": int(index.doc_ids.size), "rrf_k": RRF_K}
+
+
+def _ready_fields(corpus: Corpus) -> dict:
+    return {
+        "status": "ready",
+        "stage": "ready",
+        "progress": 1.0,
+        "version": corpus.version,
+        "rows": corpus.rows,
+        "dim": corpus.dim,
+        "memory_bytes": _memory_footprint(corpus),
+        "vectors_mapped": isinstance(corpus.X1_n, np.memmap),
+        "precision": corpus.base.precision,
+        "index": _index_fields(corpus.base.index),
+        "prefilter": _prefilter_fields(corpus.base),
+        "lexical": _lexical_fields(corpus.base.lexical),
+        "segments": len(corpus.segments),
+        "loaded_at": corpus.loaded_at,
+    }
+
+
+def _load_and_activate() -> Corpus | None:
+    """
+    新しいスナップショットを組み立て、完了してから差し替える。
+    既に有効な版がある場合（再読み込み）は、失敗しても既存の版で検索を続ける。
+    """
+    previous = _corpus
+    started = time.perf_counter()
+    if previous is None:
+        _update_status(status="loading", stage="resolving", progress=0.0, error=None, load_seconds=None)
+    else:
+        _update_status(reloading=True, last_reload_error=None)
+
+    try:
+        data_path = _resolve_data_path()
+        corpus = _load_snapshot(data_path)
+    except Exception as e:
+        print(f"❌ データ読み込み中にエラーが発生しました: {e}")
+        elapsed = round(time.perf_counter() - started, 3)
+        if previous is None:
+            _update_status(status="failed", error=str(e), load_seconds=elapsed)
+        else:
+            _update_status(status="ready", stage="ready", progress=1.0, reloading=False, last_reload_error=str(e))
+        return None
+
+    _activate(corpus)
+    _update_status(
+        **_ready_fields(corpus),
+        load_seconds=round(time.perf_counter() - started, 3),
+        reloading=False,
+        error=None,
+    )
+    if previous is not None and previous.version != corpus.version:
+        print(f"🔄 参照データを差し替えました: {previous.version} -> {corpus.version}")
+    print(f"✅ データのロードとベクトル準備が完了しました。ベクトル次元数: {corpus.dim}")
+    _maybe_schedule_compaction(corpus)
+    return corpus
+
+
 def load_data_and_vectors():
-    global df, X1_n, X2_n
-    if df is not None:
+    if _corpus is not None:
         print("データは既にロード済みです。")
         return
+    with _reload_lock:
+        if _corpus is None:
+            _load_and_activate()
 
-    try:
-        data_path = _resolve_data_path()
-    except FileNotFoundError as exc:
-        print(f"❌ データ読み込み中にエラーが発生しました: {exc}")
-        df = None
-        X1_n = None
-        X2_n = None
+
+def reload_corpus() -> Corpus | None:
+    """
+    参照データを読み直し、有効な版を原子的に差し替える。
+    再起動は不要で、読み込み中も既存の版で検索を受け付ける。失敗時は None を返す。
+    """
+    with _reload_lock:
+        return _load_and_activate()
+
+
+def refresh_deltas() -> Corpus | None:
+    """
+    新しく追加された差分セグメントだけを読み込み、全体を読み直さずに版を差し替える。
+    """
+    with _reload_lock:
+        current = _corpus
+        if current is None or current.source is None:
+            return current
+        data_path = Path(current.source)
+        new_deltas = _load_deltas(data_path, set(current.delta_ids), current.dim)
+        if not new_deltas:
+            return current
+        deltas = current.deltas + new_deltas
+        corpus = replace(
+            current,
+            deltas=deltas,
+            version=_corpus_version(current.base_version or current.version, current.compacted_deltas + tuple(d.name for d in deltas)),
+            loaded_at=datetime.now(timezone.utc).isoformat(),
+        )
+        _activate(corpus)
+        _update_status(**_ready_fields(corpus))
+        print(f"➕ 差分セグメントを {len(new_deltas)} 件追加しました（版: {corpus.version}）")
+    _maybe_schedule_compaction(corpus)
+    return corpus
+
+
+def append_delta(source: Path) -> Corpus | None:
+    """追加分のデータを差分セグメントとして書き出し、現在の版に追加する。"""
+    current = get_corpus()
+    write_delta(source, Path(current.source) if current.source else None)
+    return refresh_deltas()
+
+
+def compact_segments() -> Corpus | None:
+    """
+    差分セグメントをベースに畳み込み、1つの行列にまとめ直す。
+    内容は変わらないため版は維持する。バンドルが有効な場合はベースのバンドルを書き換え、
+    畳み込んだ差分 ID をマニフェストに記録する（差分ファイル自体は削除しない）。
+    """
+    with _reload_lock:
+        current = _corpus
+        if current is None or not current.deltas:
+            return current
+
+        segments = current.segments
+        frame = compact_metadata(pd.concat([segment.df for segment in segments], ignore_index=True))
+        X_1 = np.concatenate([np.asarray(segment.X1_n) for segment in segments])
+        X_2 = np.concatenate([np.asarray(segment.X2_n) for segment in segments])
+        # 新しいベースの連結行列は _make_segment で（バンドル経由ならマップで）作り直す
+        compacted = current.delta_ids
+
+        data_path = Path(current.source) if current.source else None
+        persisted_dir = None
+        if data_path is not None and _mmap_float32() and _file_sha256(data_path)[:16] == current.base_version:
+            bundle_dir = bundle_dir_for(data_path)
+            try:
+                with _bundle_build_lock(bundle_dir):
+                    manifest = read_bundle_manifest(bundle_dir) or {}
+                    # 他のワーカーが同じ内容を書き出し済みなら、それをマップするだけでよい
+                    if set(manifest.get("compacted_deltas") or ()) != set(compacted) or not _bundle_matches(manifest, data_path):
+                        _write_bundle(
+                            bundle_dir,
+                            frame,
+                            X_1,
+                            X_2,
+                            source=_source_fields(data_path),
+                            skipped_rows=manifest.get("skipped_rows", []),
+                            compacted_deltas=list(compacted),
+                        )
+                frame, X_1, X_2 = load_bundle(bundle_dir)
+                persisted_dir = bundle_dir
+            except OSError as exc:
+                print(f"⚠️ 畳み込んだベースを保存できませんでした（メモリ上のみで保持します）: {exc}")
+
+        corpus = replace(
+            current,
+            base=_make_segment("base", frame, X_1, X_2, persisted_dir),
+            deltas=(),
+            compacted_deltas=compacted,
+            loaded_at=datetime.now(timezone.utc).isoformat(),
+        )
+        _activate(corpus)
+        _update_status(**_ready_fields(corpus))
+        print(f"🗜️ 差分セグメント {len(segments) - 1} 件をベースに畳み込みました（{corpus.rows} 行）")
+        return corpus
+
+
+def _maybe_schedule_compaction(corpus: Corpus) -> None:
+    global _compact_thread
+    delta_rows = sum(segment.rows for segment in corpus.deltas)
+    if not corpus.deltas or (delta_rows <= COMPACT_DELTA_ROWS and len(corpus.deltas) <= COMPACT_MAX_DELTAS):
         return
+    if _compact_thread is not None and _compact_thread.is_alive():
+        return
+    _compact_thread = threading.Thread(target=compact_segments, name="semantic-search-compactor", daemon=True)
+    _compact_thread.start()
 
-    print(f"参照データ '{data_path.name}' を読み込んでいます...")
+
+def _run_background_load() -> None:
+    try:
+        load_data_and_vectors()
+    except Exception as exc:  # pragma: no cover - defensive
+        _update_status(status="failed", error=str(exc))
+    if not is_ready() and get_load_status()["status"] == "loading":
+        _update_status(status="failed", error="データがロードされていません。")
+
+
+def _start_loader(target) -> threading.Thread:
+    global _load_thread
+    with _load_lock:
+        if _load_thread is not None and _load_thread.is_alive():
+            return _load_thread
+        _load_thread = threading.Thread(target=target, name="semantic-search-loader", daemon=True)
+        _load_thread.start()
+        return _load_thread
+
+
+def start_background_load() -> threading.Thread:
+    """
+    参照データのロードをバックグラウンドスレッドで開始する。
+    ロード中でも他の API は応答でき、状態は `get_load_status` で確認できる。
+    """
+    if not is_ready():
+        _update_status(status="loading", stage="queued", progress=0.0, error=None)
+    return _start_loader(_run_background_load)
+
+
+def start_background_reload() -> threading.Thread:
+    """再読み込みをバックグラウンドで開始する（実行中のロードがあればそれを返す）。"""
+    return _start_loader(reload_corpus)
+
+
+def _source_signature() -> tuple[str, int, int] | None:
     try:
-        if data_path.suffix == ".parquet":
-            df = pd.read_parquet(data_path)
+        path = _resolve_data_path()
+        stat = path.stat()
+    except (FileNotFoundError, OSError):
+        return None
+    return (str(path), stat.st_size, stat.st_mtime_ns)
+
+
+def _delta_signature() -> tuple[str, ...]:
+    try:
+        return tuple(path.name for path in _list_delta_dirs(_resolve_data_path()))
+    except (FileNotFoundError, OSError):
+        return ()
+
+
+def _watch_source(interval: float) -> None:
+    last = _source_signature()
+    last_deltas = _delta_signature()
+    pending = None
+    while True:
+        time.sleep(interval)
+        deltas = _delta_signature()
+        if deltas != last_deltas:
+            # 差分セグメントは書き込み完了後に置かれるため、すぐに取り込んでよい
+            refresh_deltas()
+            last_deltas = deltas
+
+        current = _source_signature()
+        if current is None or current == last:
+            pending = None
+            continue
+        # 書き込み途中のファイルを読まないよう、2回続けて同じ状態になってから読み直す
+        if current != pending:
+            pending = current
+            continue
+        print(f"参照データの更新を検知しました: {current[0]}")
+        if reload_corpus() is not None:
+            last = current
+            last_deltas = _delta_signature()
+        pending = None
+
+
+def start_file_watcher(interval: float | None = None) -> threading.Thread | None:
+    """参照データファイルの更新を監視し、変更を検知したら再読み込みする（差分セグメントの追加も取り込む）。"""
+    global _watch_thread
+    interval = WATCH_INTERVAL_SECONDS if interval is None else interval
+    if interval <= 0:
+        return None
+    if _watch_thread is not None and _watch_thread.is_alive():
+        return _watch_thread
+    _watch_thread = threading.Thread(
+        target=_watch_source, args=(interval,), name="semantic-search-watcher", daemon=True
+    )
+    _watch_thread.start()
+    return _watch_thread
+
+
+def fused_query(Q1_n: np.ndarray, Q2_n: np.ndarray, alpha: float, beta: float) -> np.ndarray:
+    """連結行列に掛けるクエリ [alpha*Q1 | beta*Q2]（float32）を作る。"""
+    return np.hstack([alpha * Q1_n, beta * Q2_n]).astype(np.float32, copy=False)
+
+
+def two_pass_scores(segment: Segment, Q1_n: np.ndarray, Q2_n: np.ndarray, alpha: float, beta: float) -> np.ndarray:
+    """フィールドごとに類似度を求めてから混ぜる（連結行列が無いセグメント用、およびベンチマークの比較対象）。"""
+    return alpha * (Q1_n @ segment.X1_n.T) + beta * (Q2_n @ segment.X2_n.T)
+
+
+def blended_scores(segment: Segment, Q1_n: np.ndarray, Q2_n: np.ndarray, alpha: float, beta: float) -> np.ndarray:
+    """
+    alpha * cos(Q1, X1) + beta * cos(Q2, X2) を (クエリ数 × 行数) で返す。
+    連結行列があれば [alpha*Q1 | beta*Q2] @ [X1 | X2].T の1回の行列積で求める。
+    """
+    if segment.X12_q is not None:
+        return segment.X12_q.dot(fused_query(Q1_n, Q2_n, alpha, beta))
+    if segment.X12_n is not None:
+        return fused_query(Q1_n, Q2_n, alpha, beta) @ segment.X12_n.T
+    return two_pass_scores(segment, Q1_n, Q2_n, alpha, beta)
+
+
+def _rerank_top_k(segment: Segment, queries: np.ndarray, candidate_rows, k: int):
+    """
+    クエリごとに `candidate_rows(クエリ番号, 連結クエリ)` が返す候補行だけを
+    float32 の連結行列で正確に採点し、上位 k 件を返す。
+    """
+    k = int(min(k, segment.rows))
+    idx = np.empty((queries.shape[0], k), dtype=np.int64)
+    sims = np.empty((queries.shape[0], k), dtype=np.float32)
+    for qi, q in enumerate(queries):
+        rows = np.sort(candidate_rows(qi, q))
+        scores = np.asarray(segment.X12_n[rows]) @ q
+        top = np.argpartition(-scores, k - 1)[:k]
+        idx[qi], sims[qi] = rows[top], scores[top]
+    return idx, sims
+
+
+def _subset_top_k(
+    segment: Segment, Q1_n: np.ndarray, Q2_n: np.ndarray, rows: np.ndarray, k: int, alpha: float, beta: float
+):
+    """指定した行（昇順の行番号）だけを採点し、上位 k 件を返す。行はブロックごとに取り出す。"""
+    scores = np.empty((Q1_n.shape[0], rows.size), dtype=np.float32)
+    queries = fused_query(Q1_n, Q2_n, alpha, beta)
+    block_rows = vector_precision.BLOCK_ROWS
+    for start in range(0, rows.size, block_rows):
+        block = rows[start : start + block_rows]
+        if segment.X12_q is not None:
+            scales = segment.X12_q.scales
+            subset = vector_precision.QuantizedMatrix(
+                np.asarray(segment.X12_q.codes[block]), np.asarray(scales[block]) if scales is not None else None
+            )
+            scores[:, start : start + block.size] = subset.dot(queries)
+        elif segment.X12_n is not None:
+            scores[:, start : start + block.size] = queries @ np.asarray(segment.X12_n[block]).T
         else:
-            df = pd.read_csv(data_path)
+            scores[:, start : start + block.size] = alpha * (Q1_n @ segment.X1_n[block].T) + beta * (
+                Q2_n @ segment.X2_n[block].T
+            )
+    k = int(min(k, rows.size))
+    if k == 0:
+        return np.empty((scores.shape[0], 0), dtype=np.int64), np.empty((scores.shape[0], 0), dtype=np.float32)
+    local = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    return rows[local], np.take_along_axis(scores, local, axis=1)
 
-        X_1_list = df["embedding_sum"].apply(to_vec).tolist()
-        X_2_list = df["embedding_ass"].apply(to_vec).tolist()
 
-        if any(arr.size == 0 for arr in X_1_list) or any(arr.size == 0 for arr in X_2_list):
-            raise ValueError("一部のベクトルの読み込みに失敗しました。")
+def _segment_top_k(
+    segment: Segment,
+    Q1_n: np.ndarray,
+    Q2_n: np.ndarray,
+    k: int,
+    alpha: float,
+    beta: float,
+    nprobe: int = 0,
+    binary_pool: int = 0,
+    coarse_pool: int = 0,
+    rows: np.ndarray | None = None,
+):
+    """
+    各クエリについて、1セグメント内の上位 k 件の (行番号, 類似度) を (クエリ数 × k) の配列で返す。
+    rows を指定した場合は、その行だけを正確に採点する（絞り込み検索）。
+    nprobe > 0 でセグメントに IVF インデックスがある場合は調べるリストの行だけを、
+    binary_pool > 0 で符号ビットがある場合はハミング距離の近い行だけを、
+    coarse_pool > 0 で切り詰め行列がある場合は粗いスコアの上位の行だけを正確に採点する。
+    """
+    if rows is not None:
+        return _subset_top_k(segment, Q1_n, Q2_n, rows, k, alpha, beta)
+    if segment.X12_n is not None and segment.rows > 0:
+        if nprobe > 0 and segment.index is not None:
+            rerank = max(IVF_RERANK, k)
+            return _rerank_top_k(
+                segment,
+                fused_query(Q1_n, Q2_n, alpha, beta),
+                lambda qi, q: segment.index.candidates(q, nprobe, min_candidates=k, rerank=rerank),
+                k,
+            )
+        if binary_pool > 0 and segment.signs is not None:
+            pool = max(binary_pool, k)
+            return _rerank_top_k(
+                segment,
+                fused_query(Q1_n, Q2_n, alpha, beta),
+                lambda qi, q: segment.signs.candidates(Q1_n[qi], Q2_n[qi], alpha, beta, pool),
+                k,
+            )
+        if coarse_pool > 0 and segment.X12_t is not None:
+            # 粗いスコアは全クエリ分を1回の行列積で計算する
+            dim = segment.X12_t.shape[1] // 2
+            queries_t = truncation.truncated_query(Q1_n, Q2_n, dim, alpha, beta)
+            pools = truncation.candidates(segment.X12_t, queries_t, max(coarse_pool, k))
+            return _rerank_top_k(segment, fused_query(Q1_n, Q2_n, alpha, beta), lambda qi, q: pools[qi], k)
+    scores = blended_scores(segment, Q1_n, Q2_n, alpha, beta)
+    k = int(min(k, scores.shape[1]))
+    if k == 0:
+        return np.empty((scores.shape[0], 0), dtype=np.int64), np.empty((scores.shape[0], 0), dtype=np.float32)
+    idx = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    return idx, np.take_along_axis(scores, idx, axis=1)
 
-        X_1 = np.vstack(X_1_list)
-        X_2 = np.vstack(X_2_list)
 
-        X1_n = normalize_rows(X_1)
-        X2_n = normalize_rows(X_2)
-        print(f"✅ データのロードとベクトル準備が完了しました。ベクトル次元数: {X1_n.shape[1]}")
-    except Exception as e:
-        print(f"❌ データ読み込み中にエラーが発生しました: {e}")
-        df = None
-        X1_n = None
-        X2_n = None
+def predict_budgets(sims: np.ndarray, budgets: np.ndarray, tau: float = TAU) -> np.ndarray:
+    """
+    `softmax_1d` と `weighted_log_mean` をクエリごと（行ごと）にまとめて計算する。
+    予算が0以下・欠損の候補は除外し、有効な候補が無い行は NaN を返す。
+    """
+    sims = np.asarray(sims, dtype="float64")
+    valid = np.isfinite(budgets) & (budgets > 0)
+    z = np.where(valid, sims / tau, -np.inf)
+    z_max = z.max(axis=1, keepdims=True) if z.shape[1] else np.zeros((z.shape[0], 1))
+    z_max[~np.isfinite(z_max)] = 0.0
+    e = np.exp(z - z_max)
+    weights = e / (e.sum(axis=1, keepdims=True) + 1e-12)
+    log_budgets = np.log(np.where(valid, budgets, 1.0))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        predicted = np.exp((weights * log_budgets).sum(axis=1) / weights.sum(axis=1))
+    predicted[~valid.any(axis=1) | ~np.isfinite(predicted)] = np.nan
+    return predicted
 
 
-def analyze_similarity(query_vec_1: np.ndarray, query_vec_2: np.ndarray):
+def _dense_top_k(
+    segments: tuple[Segment, ...],
+    selections: list[np.ndarray | None],
+    Q1_n: np.ndarray,
+    Q2_n: np.ndarray,
+    k: int,
+    nprobe: int,
+    binary_pool: int,
+    coarse_pool: int,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    セグメントごとの上位 k 件を横に並べ、クエリごとに全体の上位 k 件の
+    (セグメント番号, 行番号, 類似度) を (クエリ数 × k) の配列で返す。
+    """
+    ALPHA, BETA = SCORE_ALPHA, SCORE_BETA
+    candidates = [
+        _segment_top_k(segment, Q1_n, Q2_n, k, ALPHA, BETA, nprobe, binary_pool, coarse_pool, rows=rows)
+        for segment, rows in zip(segments, selections)
+    ]
+    cand_rows = np.concatenate([idx for idx, _ in candidates], axis=1)
+    cand_sims = np.concatenate([sims for _, sims in candidates], axis=1)
+    cand_segments = np.concatenate(
+        [np.full(idx.shape, number, dtype=np.int64) for number, (idx, _) in enumerate(candidates)], axis=1
+    )
+    order = np.argsort(-cand_sims, axis=1, kind="stable")[:, : min(k, cand_sims.shape[1])]
+    return (
+        np.take_along_axis(cand_segments, order, axis=1),
+        np.take_along_axis(cand_rows, order, axis=1),
+        np.take_along_axis(cand_sims, order, axis=1),
+    )
+
+
+def _hybrid_top_k(
+    segments: tuple[Segment, ...],
+    selections: list[np.ndarray | None],
+    Q1_n: np.ndarray | None,
+    Q2_n: np.ndarray | None,
+    texts: list[str],
+    nprobe: int,
+    binary_pool: int,
+    coarse_pool: int,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, dict[str, np.ndarray]]:
+    """
+    BM25 の上位 RRF_POOL 件と埋め込みの上位 RRF_POOL 件を RRF で統合し、上位K件を返す。
+    クエリベクトルが無い場合（埋め込みを計算できない場合）は BM25 の順位だけで選ぶ。
+    戻り値は `_dense_top_k` と同じ形の配列（足りない位置はセグメント番号 -1）と、各スコアの配列。
+    類似度は埋め込みがあれば正確なコサイン類似度、無ければ BM25 スコアを最大値で割った値。
+    """
+    ALPHA, BETA = SCORE_ALPHA, SCORE_BETA
+    n_queries = len(texts)
+    pool = max(RRF_POOL, TOPK)
+    # セグメントをまたいだ通し番号（キー）で順位を扱う
+    offsets = np.concatenate([[0], np.cumsum([segment.rows for segment in segments])]).astype(np.int64)
+
+    dense_keys = None
+    if Q1_n is not None:
+        d_segments, d_rows, _ = _dense_top_k(segments, selections, Q1_n, Q2_n, pool, nprobe, binary_pool, coarse_pool)
+        dense_keys = offsets[d_segments] + d_rows
+
+    top_segments = np.full((n_queries, TOPK), -1, dtype=np.int64)
+    top_rows = np.zeros((n_queries, TOPK), dtype=np.int64)
+    top_sims = np.full((n_queries, TOPK), np.nan, dtype=np.float32)
+    scores = {name: np.full((n_queries, TOPK), np.nan) for name in ("score_bm25", "score_embed", "score_rrf")}
+    for q, text in enumerate(texts):
+        # 語彙検索: セグメントごとの BM25 スコアから上位 pool 件を選んでまとめる
+        bm25 = [
+            segment.lexical.scores(text) if segment.lexical is not None else np.zeros(segment.rows, np.float32)
+            for segment in segments
+        ]
+        found = [lexical_search.top_k(seg_scores, pool, rows) for seg_scores, rows in zip(bm25, selections)]
+        lex_keys = np.concatenate([offsets[number] + rows for number, (rows, _) in enumerate(found)])
+        lex_scores = np.concatenate([values for _, values in found])
+        order = np.lexsort((lex_keys, -lex_scores))[:pool]
+        rankings = [lex_keys[order]] + ([dense_keys[q]] if dense_keys is not None else [])
+
+        keys, fused = lexical_search.reciprocal_rank_fusion(rankings, RRF_K)
+        keys, fused = keys[:TOPK], fused[:TOPK]
+        n = keys.size
+        segs = np.searchsorted(offsets, keys, side="right") - 1
+        rows = keys - offsets[segs]
+        top_segments[q, :n], top_rows[q, :n] = segs, rows
+        scores["score_rrf"][q, :n] = fused
+        scores["score_bm25"][q, :n] = [bm25[seg][row] for seg, row in zip(segs, rows)]
+        if Q1_n is None and n:
+            top_sims[q, :n] = scores["score_bm25"][q, :n] / max(float(lex_scores[order[0]]), 1e-12)
+
+    if Q1_n is not None:
+        # 統合後の上位件の連結ベクトルをセグメントごとにまとめて取り出し、全クエリ分を1回の行列積で採点する
+        found = top_segments >= 0
+        hits = np.zeros((n_queries, TOPK, 2 * Q1_n.shape[1]), dtype=np.float32)
+        for number, segment in enumerate(segments):
+            q_idx, slots = np.nonzero(top_segments == number)
+            if q_idx.size:
+                hits[q_idx, slots] = _fused_rows(segment, top_rows[q_idx, slots])
+        embed = (hits @ fused_query(Q1_n, Q2_n, ALPHA, BETA)[:, :, None])[:, :, 0]
+        scores["score_embed"][found] = embed[found]
+        top_sims[found] = embed[found]
+    return top_segments, top_rows, top_sims, scores
+
+
+def _fused_rows(segment: Segment, rows: np.ndarray) -> np.ndarray:
+    """指定した行の連結ベクトル [X1 | X2] を返す。"""
+    if segment.X12_n is not None:
+        return np.asarray(segment.X12_n[rows])
+    return np.hstack([segment.X1_n[rows], segment.X2_n[rows]])
+
+
+def retrieval_mode(has_vectors: bool, has_text: bool) -> str:
+    """
+    検索の方式（結果の `retrieval_mode`）。クエリ文字列があれば語彙検索を使い、ベクトルもあれば埋め込みと統合する
+    （"hybrid"）。文字列が無ければ埋め込みだけ（"dense"）、ベクトルが無ければ語彙検索だけ（"lexical"）。
+    """
+    if not has_text:
+        return "dense"
+    return "hybrid" if has_vectors else "lexical"
+
+
+def _search_group(
+    corpus: Corpus,
+    Q1_n: np.ndarray | None,
+    Q2_n: np.ndarray | None,
+    filters: search_filters.SearchFilters | None,
+    nprobe: int,
+    binary_pool: int,
+    coarse_pool: int,
+    texts: list[str] | None = None,
+) -> list[dict]:
+    """同じ絞り込み条件のクエリをまとめて検索する。"""
+    n_queries = len(texts) if texts is not None else Q1_n.shape[0]
+    mode = retrieval_mode(Q1_n is not None, texts is not None)
+
+    # 絞り込み条件に合う行（None は全行）と、その府省庁ごとの件数
+    segments = corpus.segments
+    selections = [segment.partitions.select(filters) for segment in segments]
+    facets = search_filters.merge_counts(
+        [segment.partitions.ministry_counts(rows) for segment, rows in zip(segments, selections)]
+    )
+    matched = sum(segment.rows if rows is None else int(rows.size) for segment, rows in zip(segments, selections))
+    pool_fields = {"corpus_version": corpus.version, "retrieval_mode": mode, "matched_rows": matched, "ministry_facets": facets}
+
+    if "当初予算" not in corpus.df.columns:
+        return [{"predicted_budget": None, "similar_projects": [], **pool_fields} for _ in range(n_queries)]
+
+    # 上位K件の (セグメント番号, 行番号, 類似度) を取得
+    if texts is None:
+        top_segments, top_rows, top_sims = _dense_top_k(
+            segments, selections, Q1_n, Q2_n, TOPK, nprobe, binary_pool, coarse_pool
+        )
+        scores = {}
+    else:
+        top_segments, top_rows, top_sims, scores = _hybrid_top_k(
+            segments, selections, Q1_n, Q2_n, texts, nprobe, binary_pool, coarse_pool
+        )
+
+    # 予算データを取得し、0以下や欠損を除外して推定する
+    budgets = np.full(top_rows.shape, np.nan, dtype="float64")
+    for number, segment in enumerate(segments):
+        mask = top_segments == number
+        budgets[mask] = segment.budgets[top_rows[mask]]
+    predicted = predict_budgets(np.nan_to_num(top_sims, nan=-np.inf), budgets)
+
+    # 類似事業の情報はセグメントごとにまとめて取り出す（行ごとに DataFrame を参照しない）
+    payloads: list[dict | None] = [None] * top_rows.size
+    for number, segment in enumerate(segments):
+        positions = np.flatnonzero(top_segments == number)
+        if positions.size:
+            hits = segment.project_payloads(top_rows.flat[positions], top_sims.flat[positions])
+            for position, payload in zip(positions.tolist(), hits):
+                payloads[position] = payload
+
+    results = []
+    for q in range(n_queries):
+        similar_projects_info = []
+        for j in range(top_rows.shape[1]):
+            if top_segments[q, j] < 0:
+                break
+            payload = payloads[q * top_rows.shape[1] + j]
+            for name, values in scores.items():
+                payload[name] = float(values[q, j]) if np.isfinite(values[q, j]) else None
+            similar_projects_info.append(payload)
+        results.append(
+            {
+                "predicted_budget": float(predicted[q]) if np.isfinite(predicted[q]) else None,
+                "similar_projects": similar_projects_info,
+                **pool_fields,
+            }
+        )
+    return results
+
+
+def _result_key(
+    q1: np.ndarray | None,
+    q2: np.ndarray | None,
+    text: str | None,
+    filters: search_filters.SearchFilters | None,
+    params: tuple,
+) -> str:
+    """検索結果を決めるすべての入力（正規化済みクエリ・版・上位件数・温度・重みなど）からキーを作る。"""
+    digest = hashlib.sha256()
+    for vector in (q1, q2):
+        digest.update(b"-" if vector is None else np.ascontiguousarray(vector, dtype=np.float32).tobytes())
+    settings = (TOPK, TAU, SCORE_ALPHA, SCORE_BETA, RRF_K, RRF_POOL, text, filters, *params)
+    digest.update(repr(settings).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def get_result_cache_stats() -> dict:
+    return _result_cache.stats()
+
+
+def analyze_similarity_batch(
+    query_vecs_1: np.ndarray | None,
+    query_vecs_2: np.ndarray | None,
+    corpus: Corpus | None = None,
+    nprobe: int | None = None,
+    binary_pool: int | None = None,
+    coarse_pool: int | None = None,
+    filters: search_filters.SearchFilters | list[search_filters.SearchFilters | None] | None = None,
+    query_texts: list[str] | None = None,
+) -> list[dict]:
+    """
+    複数の案（クエリ数 × 次元数の行列2つ）をまとめて検索し、案ごとの結果を `analyze_similarity` と同じ形で返す。
+    類似度は各セグメントにつき1回の行列積、上位K件の選択と推定予算の計算は行ごとにまとめて行う。
+    IVF インデックスがあるセグメントは `nprobe`（既定 SEMANTIC_SEARCH_IVF_NPROBE）個のリストだけを、
+    符号ビットがあるセグメントはハミング距離の近い `binary_pool`（既定 SEMANTIC_SEARCH_BINARY_POOL）行だけを、
+    切り詰め行列があるセグメントは粗いスコアの上位 `coarse_pool`（既定 SEMANTIC_SEARCH_TRUNCATE_POOL）行だけを調べる。
+    いずれも 0 を指定すると全件を計算する。
+
+    `filters` は全クエリ共通の条件、またはクエリごとの条件のリスト。条件に合う行だけを採点し、
+    結果には条件に合った行数（`matched_rows`）と府省庁ごとの件数（`ministry_facets`）を含める。
+
+    `query_texts`（案ごとの文字列）を指定すると、BM25 による語彙検索の順位と埋め込みの順位を
+    RRF で統合する（`retrieval_mode` は "hybrid"）。クエリベクトルを None にすると語彙検索だけで
+    結果を返す（"lexical"。埋め込みを計算できない場合の縮退運転用）。
+    """
+    # 結果のキャッシュは有効なスナップショットに対する検索だけに使う（評価用の派生コーパスは版が同じでも内容が異なる）
+    use_cache = _result_cache.enabled and (corpus is None or corpus is _corpus)
+    corpus = corpus if corpus is not None else get_corpus()
+    nprobe = IVF_NPROBE if nprobe is None else nprobe
+    binary_pool = BINARY_POOL if binary_pool is None else binary_pool
+    coarse_pool = TRUNCATE_POOL if coarse_pool is None else coarse_pool
+
+    if query_vecs_1 is None or query_vecs_2 is None:
+        if query_texts is None:
+            raise ValueError("クエリベクトルが無い場合は query_texts が必要です")
+        if corpus.base.lexical is None:
+            raise ValueError("語彙検索のインデックスがありません（SEMANTIC_SEARCH_LEXICAL=0）")
+        Q1_n = Q2_n = None
+        n_queries = len(query_texts)
+    else:
+        # クエリベクトルの正規化
+        Q1_n = normalize_rows(np.asarray(query_vecs_1, dtype=np.float32))
+        Q2_n = normalize_rows(np.asarray(query_vecs_2, dtype=np.float32))
+
+        if Q1_n.shape != Q2_n.shape:
+            raise ValueError(f"2つのクエリ行列の形状が一致しません: {Q1_n.shape} != {Q2_n.shape}")
+        if Q1_n.shape[1] != corpus.dim:
+            raise ValueError(f"次元数が一致しません。クエリ:{Q1_n.shape[1]}, データ:{corpus.dim}")
+        n_queries = Q1_n.shape[0]
+    if query_texts is not None and len(query_texts) != n_queries:
+        raise ValueError(f"クエリ文字列の数がクエリ数と一致しません: {len(query_texts)} != {n_queries}")
+
+    if not isinstance(filters, list):
+        filters = [filters] * n_queries
+    if len(filters) != n_queries:
+        raise ValueError(f"絞り込み条件の数がクエリ数と一致しません: {len(filters)} != {n_queries}")
+
+    results: list[dict] = [{} for _ in range(n_queries)]
+    cache_keys: list[str] = []
+    if use_cache:
+        params = (corpus.version, nprobe, binary_pool, coarse_pool)
+        cache_keys = [
+            _result_key(
+                Q1_n[q] if Q1_n is not None else None,
+                Q2_n[q] if Q2_n is not None else None,
+                query_texts[q] if query_texts is not None else None,
+                filters[q],
+                params,
+            )
+            for q in range(n_queries)
+        ]
+        for q, key in enumerate(cache_keys):
+            results[q] = _result_cache.get(key) or {}
+
+    # 同じ条件のクエリごとにまとめて検索する（キャッシュにあったものは除く）
+    groups: dict[search_filters.SearchFilters | None, list[int]] = {}
+    for q, condition in enumerate(filters):
+        if results[q]:
+            continue
+        key = None if condition is None or condition.is_empty else condition
+        groups.setdefault(key, []).append(q)
+
+    for condition, members in groups.items():
+        group_results = _search_group(
+            corpus,
+            Q1_n[members] if Q1_n is not None else None,
+            Q2_n[members] if Q2_n is not None else None,
+            condition,
+            nprobe,
+            binary_pool,
+            coarse_pool,
+            texts=[query_texts[q] for q in members] if query_texts is not None else None,
+        )
+        for q, result in zip(members, group_results):
+            results[q] = result
+            if use_cache:
+                _result_cache.put(cache_keys[q], result)
+    return results
+
+
+def analyze_similarity(
+    query_vec_1: np.ndarray | None,
+    query_vec_2: np.ndarray | None,
+    corpus: Corpus | None = None,
+    nprobe: int | None = None,
+    binary_pool: int | None = None,
+    coarse_pool: int | None = None,
+    filters: search_filters.SearchFilters | None = None,
+    query_text: str | None = None,
+):
     """
     入力ベクトルを基に類似事業の検索と推定予算の算出を行う。
+    検索は開始時点のスナップショットに対して行い、結果に `corpus_version` を含める。
+    差分セグメントがある場合は各セグメントの上位K件をまとめて全体の上位K件を選ぶ。
+    `filters` を指定すると、府省庁・年度・予算額の条件に合う事業だけから上位K件を選ぶ。
+    `query_text` を指定すると語彙検索（BM25）の順位も RRF で統合し、ベクトルが None なら語彙検索だけを行う。
     """
-    if df is None or X1_n is None or X2_n is None:
-        raise Exception("データがロードされていません。'load_data_and_vectors'を先に実行してください。")
+    return analyze_similarity_batch(
+        query_vec_1,
+        query_vec_2,
+        corpus=corpus,
+        nprobe=nprobe,
+        binary_pool=binary_pool,
+        coarse_pool=coarse_pool,
+        filters=filters,
+        query_texts=[query_text] if query_text is not None else None,
+    )[0]
+
 
-    # ハイパーパラメータ
-    TOPK = 5
-    TAU = 0.08
-    ALPHA, BETA = 0.5, 0.5
+def with_precision(corpus: Corpus, precision: str) -> Corpus:
+    """同じデータを指定精度の行列で検索するスナップショットを返す（評価用。ディスクには書かない）。"""
 
-    # クエリベクトルの正規化
-    Q1_n = normalize_rows(query_vec_1)
-    Q2_n = normalize_rows(query_vec_2)
+    def convert(segment: Segment) -> Segment:
+        fused, X_1, X_2 = fuse_fields(segment.X1_n, segment.X2_n)
+        segment = replace(segment, X1_n=X_1, X2_n=X_2, X12_n=fused)
+        if precision == "float32":
+            return replace(segment, X12_q=None)
+        return replace(segment, X12_q=vector_precision.quantize(fused, precision))
 
-    if Q1_n.shape[1] != X1_n.shape[1]:
-        raise ValueError(f"次元数が一致しません。クエリ:{Q1_n.shape[1]}, データ:{X1_n.shape[1]}")
+    return replace(corpus, base=convert(corpus.base), deltas=tuple(convert(d) for d in corpus.deltas))
 
-    # コサイン類似度計算
-    S1 = Q1_n @ X1_n.T
-    S2 = Q2_n @ X2_n.T
-    S = ALPHA * S1 + BETA * S2
-    scores = S[0]
 
-    if scores.size == 0:
-        return {"predicted_budget": None, "similar_projects": []}
+def evaluate_precision(
+    corpus: Corpus,
+    precisions: tuple[str, ...] = ("float16", "int8"),
+    queries: int = 200,
+    seed: int = 0,
+    noise: float = 0.5,
+) -> list[dict]:
+    """
+    低精度の行列で検索した結果を float32 と比較する。
+    コーパス内の事業ベクトルにノイズを加えたものをクエリとして使い（自分自身が必ず1位になって一致率が
+    高く出ないようにする）、上位5件の一致率と推定予算の乖離を集計する。
+    """
+    baseline = with_precision(corpus, "float32")
+    rng = np.random.default_rng(seed)
+    picks = rng.choice(corpus.base.rows, size=min(queries, corpus.base.rows), replace=False)
+    scale = noise / np.sqrt(corpus.dim)
+    Q1 = np.asarray(corpus.base.X1_n[picks], dtype=np.float32) + rng.normal(scale=scale, size=(len(picks), corpus.dim))
+    Q2 = np.asarray(corpus.base.X2_n[picks], dtype=np.float32) + rng.normal(scale=scale, size=(len(picks), corpus.dim))
+    query_pairs = list(zip(Q1.astype(np.float32), Q2.astype(np.float32)))
 
-    # 上位K件のインデックスと類似度を取得
-    K = int(min(TOPK, len(scores)))
-    idx = np.argpartition(-scores, K - 1)[:K]
-    idx = idx[np.argsort(-scores[idx])]
-    sims = scores[idx]
+    def run(snapshot: Corpus) -> tuple[list[dict], float]:
+        started = time.perf_counter()
+        results = [analyze_similarity(q1, q2, corpus=snapshot) for q1, q2 in query_pairs]
+        return results, (time.perf_counter() - started) / max(len(query_pairs), 1)
 
-    # 予算データを取得し、0以下や欠損を除外
-    raw_budget = df.get("当初予算")
-    if raw_budget is None:
-        return {
-            "predicted_budget": None,
-            "similar_projects": [],
+    expected, baseline_latency = run(baseline)
+    reports = [
+        {
+            "precision": "float32",
+            "vector_bytes": sum(segment.vector_bytes for segment in baseline.segments),
+            "top5_overlap": 1.0,
+            "same_order_rate": 1.0,
+            "budget_rel_dev_median": 0.0,
+            "budget_rel_dev_p95": 0.0,
+            "budget_rel_dev_max": 0.0,
+            "latency_ms": round(baseline_latency * 1000, 3),
         }
+    ]
+    for precision in precisions:
+        snapshot = with_precision(corpus, precision)
+        actual, latency = run(snapshot)
+        overlaps, same_order, deviations = [], 0, []
+        for want, got in zip(expected, actual):
+            want_ids = [p["project_id"] for p in want["similar_projects"]]
+            got_ids = [p["project_id"] for p in got["similar_projects"]]
+            overlaps.append(len(set(want_ids) & set(got_ids)) / max(len(want_ids), 1))
+            same_order += int(want_ids == got_ids)
+            if want["predicted_budget"] and got["predicted_budget"]:
+                deviations.append(abs(got["predicted_budget"] - want["predicted_budget"]) / want["predicted_budget"])
+        deviations_arr = np.asarray(deviations or [0.0])
+        reports.append(
+            {
+                "precision": precision,
+                "vector_bytes": sum(segment.vector_bytes for segment in snapshot.segments),
+                "top5_overlap": round(float(np.mean(overlaps)), 4),
+                "same_order_rate": round(same_order / max(len(actual), 1), 4),
+                "budget_rel_dev_median": float(np.median(deviations_arr)),
+                "budget_rel_dev_p95": float(np.percentile(deviations_arr, 95)),
+                "budget_rel_dev_max": float(deviations_arr.max()),
+                "latency_ms": round(latency * 1000, 3),
+            }
+        )
+    return reports
 
-    init_budget = np.array(raw_budget.iloc[idx], dtype="float64")
-    valid_mask = np.isfinite(init_budget) & (init_budget > 0)
 
-    if valid_mask.sum() == 0:
-        similar_projects_info = [_compose_project_payload(df.iloc[db_index], float(sims[i])) for i, db_index in enumerate(idx)]
-        return {
-            "predicted_budget": None,
-            "similar_projects": similar_projects_info,
+def with_index(corpus: Corpus, n_lists: int, pq_subspaces: int = 0) -> Corpus:
+    """ベースに指定パラメータの IVF インデックスを付けたスナップショットを返す（評価用。ディスクには書かない）。"""
+    base = corpus.base
+    fused, X_1, X_2 = fuse_fields(base.X1_n, base.X2_n)
+    index = ivf.build(fused, n_lists, pq_subspaces=pq_subspaces)
+    return replace(corpus, base=replace(base, X1_n=X_1, X2_n=X_2, X12_n=fused, index=index))
+
+
+def with_binary(corpus: Corpus) -> Corpus:
+    """ベースに符号ビットを付けたスナップショットを返す（評価用。ディスクには書かない）。"""
+    base = corpus.base
+    return replace(corpus, base=replace(base, signs=binary_codes.encode(base.X1_n, base.X2_n)))
+
+
+def with_truncation(corpus: Corpus, dim: int) -> Corpus:
+    """ベースに先頭 `dim` 次元の切り詰め行列を付けたスナップショットを返す（評価用。ディスクには書かない）。"""
+    base = corpus.base
+    return replace(corpus, base=replace(base, X12_t=truncation.truncate(base.X1_n, base.X2_n, dim)))
+
+
+def _compare_with_exact(
+    corpus: Corpus,
+    variants: list[tuple[int, dict]],
+    queries: int,
+    seed: int,
+    noise: float,
+) -> list[tuple[int, float, float]]:
+    """
+    全件検索と各設定（analyze_similarity のキーワード引数）の検索結果を比べ、
+    (設定の値, recall@5, 1クエリあたりの秒数) を全件検索（値 0）から順に返す。
+    クエリはコーパス内の事業ベクトルにノイズを加えたもの（自分自身だけが一致しないようにする）。
+    """
+    rng = np.random.default_rng(seed)
+    picks = rng.choice(corpus.base.rows, size=min(queries, corpus.base.rows), replace=False)
+    scale = noise / np.sqrt(corpus.dim)
+    Q1 = np.asarray(corpus.base.X1_n[picks], dtype=np.float32) + rng.normal(scale=scale, size=(len(picks), corpus.dim))
+    Q2 = np.asarray(corpus.base.X2_n[picks], dtype=np.float32) + rng.normal(scale=scale, size=(len(picks), corpus.dim))
+
+    def run(options: dict) -> tuple[list[dict], float]:
+        started = time.perf_counter()
+        results = [analyze_similarity(q1, q2, corpus=corpus, **options) for q1, q2 in zip(Q1, Q2)]
+        return results, (time.perf_counter() - started) / max(len(picks), 1)
+
+    exact_options = {"nprobe": 0, "binary_pool": 0, "coarse_pool": 0}
+    expected, exact_latency = run(exact_options)
+    rows = [(0, 1.0, exact_latency)]
+    for value, options in variants:
+        actual, latency = run({**exact_options, **options})
+        recalls = []
+        for want, got in zip(expected, actual):
+            want_ids = {p["project_id"] for p in want["similar_projects"]}
+            got_ids = {p["project_id"] for p in got["similar_projects"]}
+            recalls.append(len(want_ids & got_ids) / max(len(want_ids), 1))
+        rows.append((value, float(np.mean(recalls)), latency))
+    return rows
+
+
+def _recall_reports(key: str, rows: list[tuple[int, float, float]]) -> list[dict]:
+    exact_latency = rows[0][2]
+    return [
+        {
+            key: value,
+            "recall_at_5": round(recall, 4),
+            "latency_ms": round(latency * 1000, 3),
+            "speedup": round(exact_latency / latency, 2) if latency > 0 else None,
         }
+        for value, recall, latency in rows
+    ]
 
-    filtered_indices = idx[valid_mask]
-    filtered_sims = sims[valid_mask]
-    filtered_budget = init_budget[valid_mask]
-    weights = softmax_1d(filtered_sims, tau=TAU)
-    predicted_budget = weighted_log_mean(filtered_budget, weights)
-    if not np.isfinite(predicted_budget):
-        predicted_budget = None
 
-    similar_projects_info = []
-    for i, db_index in enumerate(idx):
-        similar_projects_info.append(_compose_project_payload(df.iloc[db_index], float(sims[i])))
+def evaluate_index(
+    corpus: Corpus,
+    nprobes: tuple[int, ...] = (1, 2, 4, 8, 16),
+    queries: int = 200,
+    seed: int = 0,
+    noise: float = 0.5,
+) -> list[dict]:
+    """IVF インデックスでの検索結果を全件検索と比較する（recall@5 と1クエリあたりの処理時間）。"""
+    variants = [(nprobe, {"nprobe": nprobe}) for nprobe in nprobes]
+    return _recall_reports("nprobe", _compare_with_exact(corpus, variants, queries, seed, noise))
 
-    return {
-        "predicted_budget": predicted_budget,
-        "similar_projects": similar_projects_info,
-    }
 
+def evaluate_binary(
+    corpus: Corpus,
+    pools: tuple[int, ...] = (100, 200, 400, 800),
+    queries: int = 200,
+    seed: int = 0,
+    noise: float = 0.5,
+) -> list[dict]:
+    """符号ビットで候補を絞った検索結果を全件検索と比較する（recall@5 と1クエリあたりの処理時間）。"""
+    variants = [(pool, {"binary_pool": pool}) for pool in pools]
+    return _recall_reports("pool", _compare_with_exact(corpus, variants, queries, seed, noise))
 
-def _compose_project_payload(row: pd.Series, similarity: float) -> dict:
-    """フロントエンドへ渡す類似事業情報を整形する。"""
-    budget_value = row.get("当初予算", None)
-    if pd.isna(budget_value):
-        budget_value = None
-    else:
-        try:
-            budget_value = float(budget_value)
-        except (TypeError, ValueError):
-            budget_value = None
 
-    overview = row.get("事業の概要", "情報なし")
-    if pd.isna(overview):
-        overview = "情報なし"
-    else:
-        overview = str(overview)
+def evaluate_truncation(
+    corpus: Corpus,
+    dims: tuple[int, ...] = (128, 256, 512),
+    pools: tuple[int, ...] = (50, 100, 200, 400),
+    queries: int = 200,
+    seed: int = 0,
+    noise: float = 0.5,
+) -> list[dict]:
+    """
+    切り詰めた次元での粗い検索 + 全次元での採点し直しの結果を全件検索と比較する
+    （次元数・候補数ごとの上位5件の一致率と1クエリあたりの処理時間）。
+    """
+    reports: list[dict] = []
+    for dim in dims:
+        if dim >= corpus.dim:
+            continue
+        snapshot = with_truncation(corpus, dim)
+        variants = [(pool, {"coarse_pool": pool}) for pool in pools]
+        rows = _recall_reports("pool", _compare_with_exact(snapshot, variants, queries, seed, noise))
+        if not reports:
+            reports.append({"dim": corpus.dim, **rows[0]})
+        reports.extend({"dim": dim, **row} for row in rows[1:])
+    return reports
 
-    project_url = row.get("事業概要URL", "")
-    if pd.isna(project_url):
-        project_url = ""
-    else:
-        project_url = str(project_url)
 
-    return {
-        "project_id": str(row.get("予算事業ID", "")),
-        "project_name": row.get("事業名", "") or "",
-        "ministry_name": row.get("府省庁", "") or "",
-        "budget": budget_value,
-        "similarity": similarity,
-        "project_overview": overview,
-        "project_url": project_url,
-    }
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m backend.semantic_search",
+        description="類似事業検索用の参照データを操作します。",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = subparsers.add_parser("build", help="参照データをサービング用バンドルにコンパイルする")
+    build_parser.add_argument("--source", type=Path, default=None, help="元データ（parquet/CSV）のパス")
+    build_parser.add_argument("--output", type=Path, default=None, help="バンドルの出力先ディレクトリ")
+
+    append_parser = subparsers.add_parser("append", help="追加分のデータを差分セグメントとして書き出す")
+    append_parser.add_argument("delta", type=Path, help="追加分の parquet/CSV（元データと同じ列構成）")
+    append_parser.add_argument("--source", type=Path, default=None, help="元データ（parquet/CSV）のパス")
+
+    eval_parser = subparsers.add_parser("eval-precision", help="低精度の行列と float32 の検索結果を比較する")
+    eval_parser.add_argument("--queries", type=int, default=200, help="評価に使うクエリ数")
+    eval_parser.add_argument(
+        "--precision", nargs="+", default=["float16", "int8"], choices=vector_precision.PRECISIONS[1:]
+    )
+
+    index_parser = subparsers.add_parser("eval-index", help="IVF インデックスの recall@5 と処理時間を全件検索と比較する")
+    index_parser.add_argument("--lists", type=int, default=None, help="リスト数（省略時は読み込んだインデックス、無ければ 4√行数）")
+    index_parser.add_argument("--pq", type=int, default=IVF_PQ_SUBSPACES, help="残差 PQ の部分空間数（0 で無効）")
+    index_parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    index_parser.add_argument("--queries", type=int, default=200, help="評価に使うクエリ数")
+
+    binary_parser = subparsers.add_parser("eval-binary", help="符号ビットによる前段フィルタの recall@5 と処理時間を全件検索と比較する")
+    binary_parser.add_argument("--pool", type=int, nargs="+", default=[100, 200, 400, 800], help="正確に採点し直す候補数")
+    binary_parser.add_argument("--queries", type=int, default=200, help="評価に使うクエリ数")
+
+    truncation_parser = subparsers.add_parser(
+        "eval-truncation", help="切り詰めた次元での粗い検索の上位5件の一致率と処理時間を全件検索と比較する"
+    )
+    truncation_parser.add_argument("--dim", type=int, nargs="+", default=[128, 256, 512], help="粗い検索の次元数")
+    truncation_parser.add_argument("--pool", type=int, nargs="+", default=[50, 100, 200, 400], help="正確に採点し直す候補数")
+    truncation_parser.add_argument("--queries", type=int, default=200, help="評価に使うクエリ数")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        target = build_bundle(args.source, args.output)
+        manifest = read_bundle_manifest(target) or {}
+        print(f"✅ バンドルを書き出しました: {target} (行数: {manifest.get('rows')}, 次元数: {manifest.get('dim')})")
+    elif args.command == "append":
+        target = write_delta(args.delta, args.source)
+        manifest = read_bundle_manifest(target) or {}
+        print(f"✅ 差分セグメントを書き出しました: {target} (行数: {manifest.get('rows')})")
+    elif args.command == "eval-precision":
+        corpus = _load_snapshot(_resolve_data_path())
+        print(f"行数: {corpus.rows}, 次元数: {corpus.dim}, クエリ数: {min(args.queries, corpus.base.rows)}")
+        print(f"{'precision':<10} {'vectors':>12} {'top5 overlap':>13} {'same order':>11} {'budget dev p50':>15} {'p95':>9} {'max':>9} {'latency':>10}")
+        for report in evaluate_precision(corpus, tuple(args.precision), args.queries):
+            print(
+                f"{report['precision']:<10} {report['vector_bytes'] / (1 << 20):>9.1f} MB "
+                f"{report['top5_overlap']:>13.4f} {report['same_order_rate']:>11.4f} "
+                f"{report['budget_rel_dev_median']:>15.2e} {report['budget_rel_dev_p95']:>9.2e} "
+                f"{report['budget_rel_dev_max']:>9.2e} {report['latency_ms']:>7.2f} ms"
+            )
+    elif args.command == "eval-index":
+        corpus = _load_snapshot(_resolve_data_path())
+        if args.lists is not None or corpus.base.index is None:
+            lists = args.lists or max(1, int(4 * np.sqrt(corpus.base.rows)))
+            print(f"IVF インデックスを作成しています（リスト数: {lists}, PQ: {args.pq}）...")
+            corpus = with_index(corpus, lists, args.pq)
+        index = corpus.base.index
+        print(f"行数: {corpus.rows}, リスト数: {index.n_lists}, PQ: {index.pq_subspaces}, クエリ数: {min(args.queries, corpus.base.rows)}")
+        print(f"{'nprobe':>6} {'recall@5':>9} {'latency':>10} {'speedup':>8}")
+        for report in evaluate_index(corpus, tuple(args.nprobe), args.queries):
+            print(
+                f"{report['nprobe']:>6} {report['recall_at_5']:>9.4f} "
+                f"{report['latency_ms']:>7.2f} ms {report['speedup']:>7.2f}x"
+            )
+    elif args.command == "eval-binary":
+        corpus = _load_snapshot(_resolve_data_path())
+        if corpus.base.signs is None:
+            corpus = with_binary(corpus)
+        signs = corpus.base.signs
+        print(
+            f"行数: {corpus.rows}, 符号ビット: {signs.nbytes / (1 << 20):.1f} MB "
+            f"(float32: {corpus.base.X12_n.nbytes / (1 << 20):.1f} MB), クエリ数: {min(args.queries, corpus.base.rows)}"
+        )
+        print(f"{'pool':>6} {'recall@5':>9} {'latency':>10} {'speedup':>8}")
+        for report in evaluate_binary(corpus, tuple(args.pool), args.queries):
+            print(
+                f"{report['pool']:>6} {report['recall_at_5']:>9.4f} "
+                f"{report['latency_ms']:>7.2f} ms {report['speedup']:>7.2f}x"
+            )
+    elif args.command == "eval-truncation":
+        corpus = _load_snapshot(_resolve_data_path())
+        print(f"行数: {corpus.rows}, 次元数: {corpus.dim}, クエリ数: {min(args.queries, corpus.base.rows)}")
+        print(f"{'dim':>5} {'pool':>6} {'top5 agree':>11} {'latency':>10} {'speedup':>8}")
+        for report in evaluate_truncation(corpus, tuple(args.dim), tuple(args.pool), args.queries):
+            print(
+                f"{report['dim']:>5} {report['pool']:>6} {report['recall_at_5']:>11.4f} "
+                f"{report['latency_ms']:>7.2f} ms {report['speedup']:>7.2f}x"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,8 +1,10 @@
 from __future__ import annotations
 
+import asyncio
 import json
 from typing import Generator
 
+import httpx
 import numpy as np
 import pytest
 from fastapi.testclient import TestClient
@@ -11,8 +13,11 @@ from sqlalchemy.orm import Session, sessionmaker
 
 from backend.app.main import app
 from backend.app.db.base import Base
-from backend.app.db.deps import get_db
-from backend.app.db.models import AnalysisHistory
+from backend.app.db.deps import get_db, get_session_factory
+from backend.app.db.models import AnalysisHistory, User
+from backend.app.utils.deps_auth import get_current_user
+from backend.search.embedding_providers import LocalHashProvider
+from backend.search.micro_batcher import BatchDeadlineError, BatcherSaturatedError
 
 
 @pytest.fixture()
@@ -47,24 +52,46 @@ def override_dependency(session_factory):
             db.close()
 
     app.dependency_overrides[get_db] = _get_db
+    app.dependency_overrides[get_session_factory] = lambda: session_factory
     yield
     app.dependency_overrides.clear()
 
 
+@pytest.fixture(autouse=True)
+def fresh_analysis_flights():
+    from backend.app.api.routers import analyses as analyses_router
+
+    # Recently completed analyses are reused for retries; keep tests independent
+    analyses_router.get_analysis_flights.cache_clear()
+    yield
+    analyses_router.get_analysis_flights.cache_clear()
+
+
 @pytest.fixture()
-def client(monkeypatch) -> TestClient:
+def ready_analyst_client(monkeypatch) -> TestClient:
+    """
+    A loaded corpus, a signed-in analyst and the deterministic local embedding provider.
+    Embeddings go through the real cache and batcher, but the cache stays in memory.
+    """
+    from backend.app.api.routers import analyses as analyses_router
+    from backend.search.embedding_cache import EmbeddingCache
+
+    cache = EmbeddingCache(None)
+    monkeypatch.setattr(analyses_router.semantic_search, "is_ready", lambda: True)
+    monkeypatch.setattr(analyses_router, "_get_embedding_provider", lambda: LocalHashProvider(3))
+    monkeypatch.setattr(analyses_router, "get_embedding_cache", lambda: cache)
+    app.dependency_overrides[get_current_user] = lambda: User(id=1, org_id=1, email="a@example.com", role="analyst")
+    return TestClient(app)
+
+
+@pytest.fixture()
+def client(monkeypatch, ready_analyst_client: TestClient) -> TestClient:
     from backend.app.api.routers import analyses as analyses_router
 
-    monkeypatch.setattr(analyses_router, "_get_openai_client", lambda: object())
-    monkeypatch.setattr(
-        analyses_router,
-        "_compute_embedding",
-        lambda client, text: np.array([0.1, 0.2, 0.3], dtype="float32"),
-    )
     monkeypatch.setattr(
         analyses_router.semantic_search,
         "analyze_similarity",
-        lambda vec1, vec2: {
+        lambda vec1, vec2, **options: {
             "similar_projects": [
                 {
                     "project_name": "Sample Project",
@@ -76,7 +103,7 @@ def client(monkeypatch) -> TestClient:
             "predicted_budget": 54321.0,
         },
     )
-    return TestClient(app)
+    return ready_analyst_client
 
 
 def test_create_analysis_success(client: TestClient, session_factory) -> None:
@@ -136,3 +163,560 @@ def test_save_analysis_and_history_listing(client: TestClient) -> None:
     empty_history = client.get("/api/v1/history").json()
     assert empty_history == []
 
+
+
+def test_create_analysis_returns_503_while_corpus_loading(monkeypatch) -> None:
+    from backend.app.api.routers import analyses as analyses_router
+
+    monkeypatch.setattr(analyses_router.semantic_search, "is_ready", lambda: False)
+    monkeypatch.setattr(
+        analyses_router.semantic_search,
+        "get_load_status",
+        lambda: {"status": "loading", "stage": "parsing_embedding_sum", "progress": 0.2},
+    )
+
+    def _fail_client():
+        raise AssertionError("embeddings must not be requested while the corpus is loading")
+
+    monkeypatch.setattr(analyses_router, "_get_embedding_provider", _fail_client)
+    app.dependency_overrides[get_current_user] = lambda: User(id=1, org_id=1, email="a@example.com", role="analyst")
+
+    response = TestClient(app).post(
+        "/api/v1/analyses",
+        json={"projectName": "X", "projectOverview": "Y", "currentSituation": "Z"},
+    )
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == str(analyses_router.CORPUS_RETRY_AFTER_SECONDS)
+
+
+def test_create_analyses_batch_embeds_once_and_scores_together(
+    monkeypatch, ready_analyst_client: TestClient, session_factory
+) -> None:
+    from backend.app.api.routers import analyses as analyses_router
+
+    embed_calls: list[list[str]] = []
+    search_calls: list[tuple[tuple, tuple]] = []
+    texts_seen: list = []
+
+    async def _embed(client, texts):
+        embed_calls.append(list(texts))
+        return np.arange(len(texts) * 3, dtype="float32").reshape(len(texts), 3)
+
+    def _search(Q1, Q2, filters=None, query_texts=None):
+        search_calls.append((Q1.shape, Q2.shape))
+        texts_seen.append(query_texts)
+        return [
+            {"similar_projects": [{"project_name": f"Case {i}"}], "predicted_budget": 100.0 * (i + 1), "corpus_version": "v1"}
+            for i in range(Q1.shape[0])
+        ]
+
+    monkeypatch.setattr(analyses_router, "_compute_embeddings", _embed)
+    monkeypatch.setattr(analyses_router.semantic_search, "analyze_similarity_batch", _search)
+
+    items = [
+        {"projectName": f"Draft {i}", "projectOverview": f"overview {i}", "currentSituation": f"situation {i}"}
+        for i in range(3)
+    ]
+    response = ready_analyst_client.post("/api/v1/analyses:batch", json={"items": items, "saveHistory": True})
+
+    assert response.status_code == 200, response.text
+    data = response.json()
+    assert data["corpus_version"] == "v1"
+    assert [r["estimated_budget"] for r in data["results"]] == [100.0, 200.0, 300.0]
+    assert [r["request_data"]["projectName"] for r in data["results"]] == ["Draft 0", "Draft 1", "Draft 2"]
+    assert embed_calls == [[f"overview {i}" for i in range(3)] + [f"situation {i}" for i in range(3)]]
+    assert search_calls == [((3, 3), (3, 3))]
+    # Lexical scoring is skipped unless hybrid retrieval is requested
+    assert texts_seen == [None]
+
+    session = session_factory()
+    try:
+        records = session.query(AnalysisHistory).order_by(AnalysisHistory.id).all()
+        assert [r.project_name for r in records] == ["Draft 0", "Draft 1", "Draft 2"]
+        assert [r["history_id"] for r in data["results"]] == [r.id for r in records]
+    finally:
+        session.close()
+
+    hybrid = ready_analyst_client.post("/api/v1/analyses:batch", json={"items": items[:1], "hybrid": True})
+    assert hybrid.status_code == 200, hybrid.text
+    assert texts_seen[-1] == ["Draft 0\noverview 0"]
+
+
+def test_create_analyses_batch_rejects_empty_and_oversized_batches(
+    monkeypatch, ready_analyst_client: TestClient
+) -> None:
+    from backend.app.api.routers import analyses as analyses_router
+    from backend.app.schemas.analyses import ANALYSIS_BATCH_MAX_ITEMS
+
+    item = {"projectName": "X", "projectOverview": "Y", "currentSituation": "Z"}
+    client = ready_analyst_client
+
+    assert client.post("/api/v1/analyses:batch", json={"items": []}).status_code == 422
+    oversized = {"items": [item] * (ANALYSIS_BATCH_MAX_ITEMS + 1)}
+    assert client.post("/api/v1/analyses:batch", json=oversized).status_code == 422
+
+
+def test_create_analyses_batch_passes_filters_and_returns_facets(monkeypatch, ready_analyst_client: TestClient) -> None:
+    from backend.app.api.routers import analyses as analyses_router
+    from backend.search.filters import SearchFilters
+
+    seen: list = []
+
+    def _search(Q1, Q2, filters=None, query_texts=None):
+        seen.extend(filters)
+        return [
+            {
+                "similar_projects": [],
+                "predicted_budget": None,
+                "corpus_version": "v1",
+                "matched_rows": 3,
+                "ministry_facets": {"総務省": 2, "内閣府": 1},
+            }
+            for _ in range(Q1.shape[0])
+        ]
+
+    monkeypatch.setattr(analyses_router.semantic_search, "analyze_similarity_batch", _search)
+
+    item = {"projectName": "X", "projectOverview": "Y", "currentSituation": "Z"}
+    filtered = {
+        **item,
+        # Repeated values are collapsed before searching
+        "filters": {
+            "ministries": ["総務省", "内閣府", "総務省"],
+            "fiscalYears": [2024, 2024],
+            "budgetMin": 1000,
+            "budgetMax": 5000,
+        },
+    }
+    response = ready_analyst_client.post("/api/v1/analyses:batch", json={"items": [filtered, item]})
+
+    assert response.status_code == 200, response.text
+    assert seen == [
+        SearchFilters(ministries=("総務省", "内閣府"), fiscal_years=(2024,), budget_min=1000.0, budget_max=5000.0),
+        None,
+    ]
+    result = response.json()["results"][0]
+    assert result["matched_count"] == 3
+    assert result["ministry_facets"] == {"総務省": 2, "内閣府": 1}
+
+
+def test_create_analyses_batch_falls_back_to_lexical_search(monkeypatch, ready_analyst_client: TestClient) -> None:
+    from backend.app.api.routers import analyses as analyses_router
+
+    calls: list[tuple] = []
+
+    async def _fail(client, texts):
+        raise httpx.ConnectError("embedding provider unavailable")
+
+    def _search(Q1, Q2, filters=None, query_texts=None):
+        calls.append((Q1, Q2, query_texts))
+        return [
+            {"similar_projects": [], "predicted_budget": None, "corpus_version": "v1", "retrieval_mode": "lexical"}
+            for _ in query_texts
+        ]
+
+    monkeypatch.setattr(analyses_router, "_compute_embeddings", _fail)
+    monkeypatch.setattr(analyses_router.semantic_search, "analyze_similarity_batch", _search)
+
+    item = {"projectName": "防災基盤", "projectOverview": "データ連携", "currentSituation": "課題"}
+    response = ready_analyst_client.post("/api/v1/analyses:batch", json={"items": [item]})
+
+    assert response.status_code == 200, response.text
+    assert response.json()["results"][0]["retrieval_mode"] == "lexical"
+    assert calls == [(None, None, ["防災基盤\nデータ連携"])]
+
+
+def test_create_analyses_batch_does_not_mask_unexpected_embedding_errors(
+    monkeypatch, ready_analyst_client: TestClient
+) -> None:
+    from backend.app.api.routers import analyses as analyses_router
+
+    async def _broken(client, texts):
+        raise KeyError("bug in the embedding pipeline")
+
+    def _search(*_args, **_kwargs):
+        raise AssertionError("a programming error must not fall back to lexical search")
+
+    monkeypatch.setattr(analyses_router, "_compute_embeddings", _broken)
+    monkeypatch.setattr(analyses_router.semantic_search, "analyze_similarity_batch", _search)
+
+    item = {"projectName": "防災基盤", "projectOverview": "データ連携", "currentSituation": "課題"}
+    response = TestClient(app, raise_server_exceptions=False).post("/api/v1/analyses:batch", json={"items": [item]})
+
+    assert response.status_code == 500
+
+
+def test_create_analyses_batch_maps_search_errors_like_single_analyses(
+    monkeypatch, ready_analyst_client: TestClient
+) -> None:
+    from backend.app.api.routers import analyses as analyses_router
+
+    def _swapped_out(*_args, **_kwargs):
+        raise analyses_router.semantic_search.CorpusNotReadyError("corpus is being swapped")
+
+    monkeypatch.setattr(analyses_router.semantic_search, "analyze_similarity_batch", _swapped_out)
+
+    item = {"projectName": "X", "projectOverview": "Y", "currentSituation": "Z"}
+    response = ready_analyst_client.post("/api/v1/analyses:batch", json={"items": [item]})
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == str(analyses_router.CORPUS_RETRY_AFTER_SECONDS)
+
+
+def test_repeated_analyses_reuse_cached_embeddings(monkeypatch, ready_analyst_client: TestClient, tmp_path) -> None:
+    from backend.app.api.routers import analyses as analyses_router
+    from backend.search.embedding_cache import EmbeddingCache
+
+    requested: list[list[str]] = []
+
+    async def _request(client, texts):
+        requested.append(list(texts))
+        return np.ones((len(texts), 3), dtype="float32")
+
+    def _search(Q1, Q2, filters=None, query_texts=None):
+        return [{"similar_projects": [], "predicted_budget": None, "corpus_version": "v1"} for _ in range(Q1.shape[0])]
+
+    cache = EmbeddingCache(tmp_path / "cache.sqlite3")
+    monkeypatch.setattr(analyses_router, "get_embedding_cache", lambda: cache)
+    monkeypatch.setattr(analyses_router, "_request_embeddings", _request)
+    monkeypatch.setattr(analyses_router.semantic_search, "analyze_similarity_batch", _search)
+    client = ready_analyst_client
+
+    first = {"projectName": "A", "projectOverview": "概要", "currentSituation": "現状", "initialBudget": 100}
+    # Only the name and budget change between the two submissions
+    second = {"projectName": "B", "projectOverview": "概要", "currentSituation": "現状", "initialBudget": 200}
+    assert client.post("/api/v1/analyses:batch", json={"items": [first]}).status_code == 200
+    assert client.post("/api/v1/analyses:batch", json={"items": [second]}).status_code == 200
+
+    assert requested == [["概要", "現状"]]
+    stats = cache.stats()
+    assert (stats["memory_hits"], stats["misses"]) == (2, 2)
+
+
+def test_create_analysis_embeds_both_fields_in_one_call(monkeypatch, ready_analyst_client: TestClient) -> None:
+    from backend.app.api.routers import analyses as analyses_router
+
+    requested: list[list[str]] = []
+    searched: list[tuple] = []
+
+    async def _request(client, texts):
+        requested.append(list(texts))
+        return np.arange(len(texts) * 3, dtype="float32").reshape(len(texts), 3)
+
+    def _search(vec1, vec2, **options):
+        searched.append((vec1.tolist(), vec2.tolist()))
+        return {"similar_projects": [], "predicted_budget": None, "corpus_version": "v1"}
+
+    monkeypatch.setattr(analyses_router, "_request_embeddings", _request)
+    monkeypatch.setattr(analyses_router.semantic_search, "analyze_similarity", _search)
+
+    response = ready_analyst_client.post(
+        "/api/v1/analyses",
+        json={"projectName": "X", "projectOverview": "概要", "currentSituation": "現状"},
+    )
+
+    assert response.status_code == 200, response.text
+    assert requested == [["概要", "現状"]]
+    assert searched == [([0.0, 1.0, 2.0], [3.0, 4.0, 5.0])]
+
+
+def test_create_analysis_uses_provider_selected_in_settings(monkeypatch) -> None:
+    from backend.app.api.routers import analyses as analyses_router
+    from backend.app.core.config import Settings
+    from backend.search.embedding_cache import EmbeddingCache
+
+    searched: list[tuple] = []
+
+    def _search(vec1, vec2, **options):
+        searched.append((vec1, vec2))
+        return {"similar_projects": [], "predicted_budget": None, "corpus_version": "v1"}
+
+    settings = Settings(embedding_provider="local", embedding_dim=32)
+    monkeypatch.setattr(analyses_router, "get_settings", lambda: settings)
+    monkeypatch.setattr(analyses_router, "_embedding_provider", None)
+    monkeypatch.setattr(analyses_router, "get_embedding_cache", lambda: EmbeddingCache(None))
+    monkeypatch.setattr(analyses_router.semantic_search, "is_ready", lambda: True)
+    monkeypatch.setattr(analyses_router.semantic_search, "analyze_similarity", _search)
+    app.dependency_overrides[get_current_user] = lambda: User(id=1, org_id=1, email="a@example.com", role="analyst")
+
+    response = TestClient(app).post(
+        "/api/v1/analyses",
+        json={"projectName": "X", "projectOverview": "概要", "currentSituation": "現状"},
+    )
+
+    assert response.status_code == 200, response.text
+    expected = LocalHashProvider(32).embed_sync(["概要", "現状"])
+    assert np.array_equal(searched[0][0], expected[0]) and np.array_equal(searched[0][1], expected[1])
+    assert analyses_router._get_embedding_provider().model == "local-hash-32"
+
+
+def test_embedding_provider_is_replaced_and_closed_when_the_key_changes(monkeypatch) -> None:
+    from backend.app.api.routers import analyses as analyses_router
+
+    closed: list[str] = []
+
+    class _Provider:
+        def __init__(self, api_key):
+            self.model = f"model-{api_key}"
+
+        async def aclose(self):
+            closed.append(self.model)
+
+    monkeypatch.setattr(analyses_router, "_embedding_provider", None)
+    monkeypatch.setattr(analyses_router, "create_provider", lambda name, *, api_key, **options: _Provider(api_key))
+
+    async def _swap():
+        monkeypatch.setenv("OPENAI_API_KEY", "old")
+        first = analyses_router._get_embedding_provider()
+        assert analyses_router._get_embedding_provider() is first
+        monkeypatch.setenv("OPENAI_API_KEY", "new")
+        second = analyses_router._get_embedding_provider()
+        await analyses_router.close_embedding_provider()
+        return first, second
+
+    first, second = asyncio.run(_swap())
+
+    assert (first.model, second.model) == ("model-old", "model-new")
+    assert sorted(closed) == ["model-new", "model-old"]
+
+
+def test_create_analysis_returns_503_when_search_is_saturated(monkeypatch, ready_analyst_client: TestClient) -> None:
+    from backend.app.api.routers import analyses as analyses_router
+    from backend.search.executor import ExecutorSaturatedError
+
+    class _SaturatedExecutor:
+        async def run(self, fn, *args, timeout=None, **kwargs):
+            raise ExecutorSaturatedError("search executor saturated")
+
+    monkeypatch.setattr(analyses_router, "get_search_executor", lambda: _SaturatedExecutor())
+
+    response = ready_analyst_client.post(
+        "/api/v1/analyses",
+        json={"projectName": "X", "projectOverview": "Y", "currentSituation": "Z"},
+    )
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == str(analyses_router.SEARCH_RETRY_AFTER_SECONDS)
+
+
+@pytest.mark.parametrize(
+    ("error", "expected_status"),
+    [(BatcherSaturatedError("too many queries waiting"), 503), (BatchDeadlineError("expired while batching"), 504)],
+)
+def test_create_analysis_maps_search_batcher_errors(
+    monkeypatch, ready_analyst_client: TestClient, error: Exception, expected_status: int
+) -> None:
+    from backend.app.api.routers import analyses as analyses_router
+
+    submitted: list[float | None] = []
+
+    class _Batcher:
+        async def submit(self, query, timeout=None):
+            submitted.append(timeout)
+            raise error
+
+    monkeypatch.setattr(analyses_router, "get_search_batcher", lambda: _Batcher())
+
+    response = ready_analyst_client.post(
+        "/api/v1/analyses",
+        json={"projectName": "X", "projectOverview": "Y", "currentSituation": "Z"},
+    )
+
+    assert response.status_code == expected_status
+    # The deadline is handed to the batcher at submit time
+    assert submitted == [analyses_router.get_settings().search_timeout_seconds]
+    if expected_status == 503:
+        assert response.headers["Retry-After"] == str(analyses_router.SEARCH_RETRY_AFTER_SECONDS)
+
+
+def test_concurrent_analyses_are_searched_in_one_batch(monkeypatch, ready_analyst_client: TestClient) -> None:
+    import asyncio
+
+    import httpx
+
+    from backend.app.api.routers import analyses as analyses_router
+    from backend.search.search_batcher import SearchBatcher
+
+    batches: list[tuple] = []
+
+    async def _embed(provider, texts):
+        base = float(len(texts[0]))
+        return np.array([[base, 0.0, 1.0], [0.0, base, 1.0]], dtype="float32")
+
+    def _search_batch(Q1, Q2, filters=None, query_texts=None):
+        batches.append((Q1.shape, list(query_texts)))
+        return [
+            {"similar_projects": [{"project_name": text}], "predicted_budget": float(i), "corpus_version": "v1"}
+            for i, text in enumerate(query_texts)
+        ]
+
+    batcher = SearchBatcher(lambda queries, timeout: analyses_router._search_queries(queries, timeout), max_wait=0.2)
+    monkeypatch.setattr(analyses_router, "get_search_batcher", lambda: batcher)
+    monkeypatch.setattr(analyses_router, "_compute_embeddings", _embed)
+    monkeypatch.setattr(analyses_router.semantic_search, "analyze_similarity_batch", _search_batch)
+
+    async def _post_all():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await asyncio.gather(
+                *(
+                    client.post(
+                        "/api/v1/analyses",
+                        json={"projectName": f"案{i}", "projectOverview": "概" * (i + 1), "currentSituation": "現状"},
+                    )
+                    for i in range(3)
+                )
+            )
+
+    responses = asyncio.run(_post_all())
+
+    assert [response.status_code for response in responses] == [200, 200, 200]
+    assert len(batches) == 1 and batches[0][0] == (3, 3)
+    # Each caller gets the result for its own query back
+    for i, response in enumerate(responses):
+        assert response.json()["references"][0]["project_name"] == f"案{i}\n{'概' * (i + 1)}"
+
+
+def test_identical_concurrent_analyses_share_one_computation(
+    monkeypatch, ready_analyst_client: TestClient, session_factory
+) -> None:
+    import asyncio
+
+    import httpx
+
+    from backend.app.api.routers import analyses as analyses_router
+
+    embedded: list[list[str]] = []
+    searched: list[str] = []
+
+    async def _embed(provider, texts):
+        embedded.append(list(texts))
+        await asyncio.sleep(0.05)
+        return np.ones((len(texts), 3), dtype="float32")
+
+    def _search_batch(Q1, Q2, filters=None, query_texts=None):
+        searched.extend(query_texts)
+        return [
+            {"similar_projects": [{"project_name": "Case"}], "predicted_budget": 10.0, "corpus_version": "v1"}
+            for _ in query_texts
+        ]
+
+    monkeypatch.setattr(analyses_router, "_compute_embeddings", _embed)
+    monkeypatch.setattr(
+        analyses_router.semantic_search,
+        "analyze_similarity",
+        lambda vec1, vec2, filters=None, query_text=None: _search_batch(None, None, [filters], [query_text])[0],
+    )
+    monkeypatch.setattr(analyses_router.semantic_search, "analyze_similarity_batch", _search_batch)
+
+    def _request_session():
+        raise AssertionError("the shared analysis must open its own session, not borrow the request's")
+        yield
+
+    app.dependency_overrides[get_db] = _request_session
+
+    payload = {"projectName": "防災", "projectOverview": "概要", "currentSituation": "現状", "initialBudget": 100}
+    # A double click with stray whitespace / full-width characters is the same analysis
+    resubmitted = {**payload, "projectName": " 防災 ", "projectOverview": "概要　"}
+    different = {**payload, "initialBudget": 200}
+
+    async def _post_all():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await asyncio.gather(
+                *(client.post("/api/v1/analyses", json=body) for body in (payload, resubmitted, different))
+            )
+
+    first, second, third = asyncio.run(_post_all())
+
+    assert [r.status_code for r in (first, second, third)] == [200, 200, 200]
+    assert len(embedded) == 2 and len(searched) == 2
+    assert first.json()["history_id"] == second.json()["history_id"] != third.json()["history_id"]
+    # Each caller still gets its own request echoed back
+    assert second.json()["request_data"]["projectName"] == " 防災 "
+
+    session = session_factory()
+    try:
+        assert session.query(AnalysisHistory).count() == 2
+    finally:
+        session.close()
+
+
+def test_stream_analysis_emits_progress_then_results(
+    monkeypatch, ready_analyst_client: TestClient, session_factory
+) -> None:
+    from backend.app.api.routers import analyses as analyses_router
+
+    def _search(vec1, vec2, **options):
+        return {
+            "similar_projects": [{"project_name": "Case"}],
+            "predicted_budget": 10.0,
+            "corpus_version": "v1",
+            "retrieval_mode": "hybrid",
+        }
+
+    monkeypatch.setattr(analyses_router.semantic_search, "analyze_similarity", _search)
+    body = {"projectName": "X", "projectOverview": "概要", "currentSituation": "現状", "initialBudget": 5}
+
+    response = ready_analyst_client.post("/api/v1/analyses:stream", json=body)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    events = [json.loads(line) for line in response.text.splitlines()]
+    assert [event["event"] for event in events] == ["embedding", "searching", "references", "budget", "history", "done"]
+    assert events[1]["retrieval"] == "hybrid"
+    assert events[2]["references"] == [{"project_name": "Case"}] and events[2]["retrieval_mode"] == "hybrid"
+    assert (events[3]["estimated_budget"], events[3]["initial_budget"]) == (10.0, 5)
+    assert events[5]["history_id"] == events[4]["history_id"] is not None
+
+    session = session_factory()
+    try:
+        assert session.query(AnalysisHistory).count() == 1
+    finally:
+        session.close()
+
+
+def test_stream_analysis_supports_sse_and_reports_errors(monkeypatch, ready_analyst_client: TestClient) -> None:
+    from backend.app.api.routers import analyses as analyses_router
+    from backend.search.executor import ExecutorSaturatedError
+
+    class _SaturatedExecutor:
+        async def run(self, fn, *args, timeout=None, **kwargs):
+            raise ExecutorSaturatedError("search executor saturated")
+
+    monkeypatch.setattr(analyses_router, "get_search_executor", lambda: _SaturatedExecutor())
+
+    response = ready_analyst_client.post(
+        "/api/v1/analyses:stream",
+        json={"projectName": "X", "projectOverview": "Y", "currentSituation": "Z"},
+        headers={"Accept": "text/event-stream"},
+    )
+
+    assert response.headers["content-type"].startswith("text/event-stream")
+    frames = [frame for frame in response.text.split("\n\n") if frame]
+    assert [frame.splitlines()[0] for frame in frames] == ["event: embedding", "event: searching", "event: error"]
+    error = json.loads(frames[-1].splitlines()[1].removeprefix("data: "))
+    assert error["status"] == 503
+
+
+def test_stream_analysis_reports_unexpected_failures_as_error_events(
+    monkeypatch, ready_analyst_client: TestClient, caplog
+) -> None:
+    from backend.app.api.routers import analyses as analyses_router
+
+    async def _broken_search(*_args, **_kwargs):
+        raise KeyError("bug in the search pipeline")
+
+    monkeypatch.setattr(analyses_router, "_search_payload", _broken_search)
+
+    with caplog.at_level("ERROR", logger=analyses_router.logger.name):
+        response = ready_analyst_client.post(
+            "/api/v1/analyses:stream",
+            json={"projectName": "X", "projectOverview": "Y", "currentSituation": "Z"},
+        )
+
+    events = [json.loads(line) for line in response.text.splitlines()]
+    assert [event["event"] for event in events] == ["embedding", "searching", "error"]
+    assert events[-1]["status"] == 500
+    assert "analysis stream failed" in caplog.text
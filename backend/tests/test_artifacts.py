@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import numpy as np
+
+from backend.search import artifacts
+
+
+def _load_shape(shape: tuple[int, ...]):
+    def _load(paths, mmap_mode):
+        array = np.load(paths[0], mmap_mode=mmap_mode)
+        return array if array.shape == shape else None
+
+    return _load
+
+
+def _save(array, paths) -> None:
+    artifacts.save_array(array, paths[0])
+
+
+def test_load_or_build_reuses_matching_file_and_rebuilds_on_shape_change(tmp_path: Path) -> None:
+    path = tmp_path / "X.npy"
+    builds: list[int] = []
+
+    def _build(rows: int):
+        builds.append(rows)
+        return np.arange(rows * 2, dtype=np.float32).reshape(rows, 2)
+
+    first = artifacts.load_or_build([path], lambda: _build(3), _load_shape((3, 2)), _save)
+    again = artifacts.load_or_build([path], lambda: _build(3), _load_shape((3, 2)), _save)
+    grown = artifacts.load_or_build([path], lambda: _build(5), _load_shape((5, 2)), _save, mmap=False)
+
+    assert builds == [3, 5]
+    assert isinstance(first, np.memmap) and isinstance(again, np.memmap)
+    assert grown.shape == (5, 2) and not isinstance(grown, np.memmap)
+    assert np.load(path).shape == (5, 2)
+    # No staging files are left next to the bundle
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["X.npy"]
+
+
+def test_load_or_build_keeps_value_in_memory_when_saving_fails(tmp_path: Path) -> None:
+    missing = tmp_path / "missing" / "X.npy"
+
+    value = artifacts.load_or_build([missing], lambda: np.ones(4, dtype=np.float32), _load_shape((4,)), _save)
+
+    assert not missing.exists()
+    assert np.array_equal(value, np.ones(4))
+
+
+def test_write_atomic_replaces_directories(tmp_path: Path) -> None:
+    target = tmp_path / "index"
+
+    def _write(value, paths) -> None:
+        paths[0].mkdir()
+        (paths[0] / "value.txt").write_text(value, encoding="utf-8")
+
+    artifacts.write_atomic("old", [target], _write)
+    artifacts.write_atomic("new", [target], _write)
+
+    assert (target / "value.txt").read_text(encoding="utf-8") == "new"
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["index"]
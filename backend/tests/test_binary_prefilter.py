@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import numpy as np
+
+from backend.search import binary
+
+
+def _unit(rows: int, dim: int, seed: int) -> np.ndarray:
+    X = np.random.default_rng(seed).normal(size=(rows, dim))
+    return (X / np.linalg.norm(X, axis=1, keepdims=True)).astype("float32")
+
+
+def test_pack_signs_is_32x_smaller_and_pads_to_whole_words() -> None:
+    X = _unit(10, 100, 0)
+    packed = binary.pack_signs(X)
+
+    assert packed.dtype == np.uint64
+    assert packed.shape == (10, 2)
+    unpacked = np.unpackbits(packed.view(np.uint8), axis=1)[:, :100]
+    assert np.array_equal(unpacked.astype(bool), X > 0)
+    assert not np.unpackbits(packed.view(np.uint8), axis=1)[:, 100:].any()
+
+
+def test_distances_match_weighted_bit_mismatches() -> None:
+    X1, X2 = _unit(50, 128, 1), _unit(50, 128, 2)
+    q1, q2 = _unit(1, 128, 3)[0], _unit(1, 128, 4)[0]
+    signs = binary.encode(X1, X2)
+
+    distances = signs.distances(q1, q2, 0.7, 0.3)
+
+    expected = 0.7 * ((X1 > 0) != (q1 > 0)).sum(axis=1) + 0.3 * ((X2 > 0) != (q2 > 0)).sum(axis=1)
+    assert np.allclose(distances, expected)
+    assert signs.nbytes * 32 == X1.nbytes + X2.nbytes
+
+
+def test_candidates_include_the_query_row_itself() -> None:
+    X1, X2 = _unit(200, 64, 5), _unit(200, 64, 6)
+    signs = binary.encode(X1, X2)
+
+    rows = signs.candidates(X1[17], X2[17], 0.5, 0.5, pool=10)
+
+    assert rows.size == 10
+    assert 17 in rows
+    assert signs.candidates(X1[17], X2[17], 0.5, 0.5, pool=500).size == 200
+
+
+def test_load_or_build_persists_codes_next_to_the_bundle(tmp_path: Path) -> None:
+    X1, X2 = _unit(20, 64, 7), _unit(20, 64, 8)
+
+    built = binary.load_or_build(tmp_path, "X12_n", X1, X2)
+    loaded = binary.load_or_build(tmp_path, "X12_n", X1, X2)
+
+    assert (tmp_path / "X12_n.sign.npy").exists()
+    assert isinstance(loaded.codes, np.memmap)
+    assert np.array_equal(loaded.codes, built.codes)
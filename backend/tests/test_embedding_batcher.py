@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import asyncio
+
+import numpy as np
+import pytest
+
+from backend.search.embedding_batcher import EmbeddingBatcher
+
+
+def _fake_embed(calls: list[list[str]], delay: float = 0.0):
+    async def embed(client, texts):
+        calls.append(list(texts))
+        await asyncio.sleep(delay)
+        return np.array([[len(text), ord(text[0])] for text in texts], dtype="float32")
+
+    return embed
+
+
+def test_concurrent_requests_share_one_call() -> None:
+    calls: list[list[str]] = []
+    batcher = EmbeddingBatcher(_fake_embed(calls), max_wait=0.05)
+
+    async def main():
+        return await asyncio.gather(
+            *(batcher.embed(None, [f"overview {i}", f"situation {i}", "shared"]) for i in range(4))
+        )
+
+    results = asyncio.run(main())
+
+    assert len(calls) == 1
+    # Duplicate texts across requests are sent once
+    assert len(calls[0]) == 9 and calls[0].count("shared") == 1
+    for result in results:
+        assert result.tolist() == [[10, ord("o")], [11, ord("s")], [6, ord("s")]]
+    stats = batcher.stats()
+    assert (stats["requests"], stats["batches"], stats["texts"]) == (4, 1, 9)
+
+
+def test_batches_are_capped_but_requests_are_never_split() -> None:
+    calls: list[list[str]] = []
+    batcher = EmbeddingBatcher(_fake_embed(calls), max_batch=3, max_wait=0.05)
+
+    async def main():
+        return await asyncio.gather(*(batcher.embed(None, [f"a{i}", f"b{i}"]) for i in range(3)))
+
+    results = asyncio.run(main())
+
+    assert [r.shape for r in results] == [(2, 2)] * 3
+    assert len(calls) == 2
+    for call in calls:
+        for i in range(3):
+            assert (f"a{i}" in call) == (f"b{i}" in call)
+
+
+def test_collection_continues_while_a_call_is_in_flight() -> None:
+    calls: list[list[str]] = []
+    batcher = EmbeddingBatcher(_fake_embed(calls, delay=0.1), max_wait=0.01)
+
+    async def main():
+        first = asyncio.ensure_future(batcher.embed(None, ["first"]))
+        await asyncio.sleep(0.03)
+        # The first call is still sleeping; the second batch is dispatched without waiting for it
+        second = await batcher.embed(None, ["second"])
+        return second, await first
+
+    second, first = asyncio.run(main())
+
+    assert calls == [["first"], ["second"]]
+    assert second.tolist() == [[6, ord("s")]] and first.tolist() == [[5, ord("f")]]
+
+
+def test_failures_are_raised_in_every_waiting_request() -> None:
+    async def embed(client, texts):
+        raise RuntimeError("rate limited")
+
+    batcher = EmbeddingBatcher(embed, max_wait=0.05)
+
+    async def main():
+        return await asyncio.gather(batcher.embed(None, ["x"]), batcher.embed(None, ["y"]), return_exceptions=True)
+
+    results = asyncio.run(main())
+
+    assert all(isinstance(r, RuntimeError) and "rate limited" in str(r) for r in results)
+    assert batcher.stats()["failures"] == 1
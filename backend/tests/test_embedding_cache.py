@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import numpy as np
+
+from backend.search.embedding_cache import EmbeddingCache, cache_key
+
+MODEL = "text-embedding-3-small"
+
+
+def test_keys_use_model_and_nfkc_normalized_text() -> None:
+    assert cache_key(MODEL, "ＡＢＣ　１２３") == cache_key(MODEL, "ABC 123")
+    assert cache_key(MODEL, "abc") != cache_key("text-embedding-3-large", "abc")
+
+
+def test_memory_tier_is_lru_and_counts_hits(tmp_path: Path) -> None:
+    cache = EmbeddingCache(None, memory_items=2)
+    cache.put_many(MODEL, ["a", "b", "c"], np.eye(3, dtype="float32"))
+
+    found = cache.get_many(MODEL, ["a", "b", "c"])
+
+    assert found[0] is None  # evicted as least recently used
+    assert np.array_equal(found[2], [0, 0, 1])
+    stats = cache.stats()
+    assert (stats["memory_hits"], stats["misses"], stats["memory_items"]) == (2, 1, 2)
+    assert stats["hit_ratio"] == 2 / 3
+    assert stats["disk_items"] is None
+
+
+def test_disk_tier_is_shared_between_instances(tmp_path: Path) -> None:
+    path = tmp_path / "cache.sqlite3"
+    writer = EmbeddingCache(path)
+    vectors = np.arange(6, dtype="float32").reshape(2, 3)
+    writer.put_many(MODEL, ["概要", "現状"], vectors)
+
+    # A fresh process-local cache (another worker) reads the float32 blobs back
+    reader = EmbeddingCache(path)
+    found = reader.get_many(MODEL, ["現状", "概要", "現状", "未登録"])
+
+    assert np.array_equal(found[0], vectors[1]) and np.array_equal(found[1], vectors[0])
+    assert np.array_equal(found[2], vectors[1]) and found[3] is None
+    assert found[0].dtype == np.float32
+    stats = reader.stats()
+    assert (stats["disk_hits"], stats["misses"], stats["disk_items"]) == (3, 1, 2)
+    # Disk hits are promoted to the memory tier
+    reader.get_many(MODEL, ["概要"])
+    assert reader.stats()["memory_hits"] == 1
+
+
+def test_disk_tier_evicts_least_recently_used_beyond_size_limit(tmp_path: Path) -> None:
+    vector_bytes = 4 * 4
+    cache = EmbeddingCache(tmp_path / "cache.sqlite3", memory_items=0, disk_max_bytes=2 * vector_bytes)
+    cache.put_many(MODEL, ["a"], np.ones((1, 4), dtype="float32"))
+    cache.put_many(MODEL, ["b"], np.ones((1, 4), dtype="float32"))
+    cache.get_many(MODEL, ["a"])  # refresh "a"
+    cache.put_many(MODEL, ["c"], np.ones((1, 4), dtype="float32"))
+
+    found = cache.get_many(MODEL, ["a", "b", "c"])
+
+    assert [vector is not None for vector in found] == [True, False, True]
+    stats = cache.stats()
+    assert stats["evictions"] == 1
+    assert stats["disk_bytes"] <= 2 * vector_bytes
+
+
+def test_disk_usage_is_tracked_incrementally_across_replacements(tmp_path: Path) -> None:
+    import sqlite3
+
+    path = tmp_path / "cache.sqlite3"
+    cache = EmbeddingCache(path, memory_items=0, disk_max_bytes=10 * 4 * 4)
+    cache.put_many(MODEL, ["a", "b"], np.ones((2, 4), dtype="float32"))
+    # Re-storing a key with another dimension replaces its bytes instead of adding them
+    cache.put_many(MODEL, ["a"], np.ones((1, 8), dtype="float32"))
+    # One oversized batch evicts the oldest entries in a single pass
+    cache.put_many(MODEL, [f"t{i}" for i in range(9)], np.ones((9, 4), dtype="float32"))
+
+    with sqlite3.connect(path) as conn:
+        actual = conn.execute("SELECT COUNT(*), SUM(LENGTH(vector)) FROM embeddings").fetchone()
+    stats = cache.stats()
+    assert (stats["disk_items"], stats["disk_bytes"]) == actual
+    assert stats["disk_bytes"] <= 10 * 4 * 4
+    assert cache.get_many(MODEL, ["a", "t8"])[0] is None
+    # Another worker opening the same file sees the same running totals
+    assert EmbeddingCache(path).stats()["disk_bytes"] == actual[1]
@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import ast
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from backend.search import parsing
+from backend.search.parsing import parse_embedding_column
+
+
+def _as_strings(matrix: np.ndarray) -> list[str]:
+    return ["[" + ", ".join(repr(float(v)) for v in row) + "]" for row in matrix]
+
+
+def _literal_eval_rows(column: pd.Series) -> np.ndarray:
+    # Row-by-row reference: the loader's original ast.literal_eval conversion
+    return np.vstack([np.array(ast.literal_eval(value), dtype="float32") for value in column])
+
+
+def test_parse_string_column_matches_row_by_row_literal_eval() -> None:
+    rng = np.random.default_rng(1)
+    matrix = rng.normal(size=(50, 16)).astype("float32")
+    column = pd.Series(_as_strings(matrix))
+
+    parsed = parse_embedding_column(column, workers=1, chunk_rows=7)
+
+    expected = _literal_eval_rows(column)
+    assert parsed.matrix.dtype == np.float32
+    assert parsed.matrix.flags["C_CONTIGUOUS"]
+    assert parsed.invalid_rows == []
+    assert np.array_equal(parsed.matrix, expected)
+
+
+def test_parse_reports_every_malformed_row() -> None:
+    rows = _as_strings(np.ones((6, 4), dtype="float32"))
+    rows[1] = "[1.0, 2.0, x, 4.0]"
+    rows[3] = "[1.0, 2.0]"
+    rows[4] = None
+    rows[5] = "[1.0, nan, 3.0, 4.0]"
+
+    parsed = parse_embedding_column(pd.Series(rows), workers=1, chunk_rows=4)
+
+    assert parsed.invalid_rows == [1, 3, 4, 5]
+    assert parsed.valid_mask.tolist() == [True, False, True, False, False, False]
+    assert np.array_equal(parsed.matrix[0], np.ones(4, dtype="float32"))
+    assert np.isnan(parsed.matrix[1]).all()
+
+
+
+def test_parse_rejects_rows_whose_lengths_only_cancel_out_in_total() -> None:
+    rows = _as_strings(np.arange(12, dtype="float32").reshape(3, 4))
+    rows[0] = "[0.0, 1.0, 2.0, 3.0, 99.0]"  # one element too many
+    rows[1] = "[4.0, 5.0, 6.0]"  # one element too few
+
+    parsed = parse_embedding_column(pd.Series(rows), dim=4, workers=1)
+
+    assert parsed.invalid_rows == [0, 1]
+    assert np.array_equal(parsed.matrix[2], [8.0, 9.0, 10.0, 11.0])
+
+def test_parse_process_pool_matches_serial(monkeypatch) -> None:
+    rng = np.random.default_rng(2)
+    matrix = rng.normal(size=(300, 8)).astype("float32")
+    strings = _as_strings(matrix)
+    strings[123] = "broken"
+
+    serial = parse_embedding_column(strings, workers=1, chunk_rows=64)
+    monkeypatch.setattr(parsing, "PARALLEL_MIN_ROWS", 0)
+    parallel = parse_embedding_column(strings, workers=2, chunk_rows=64)
+
+    assert parallel.invalid_rows == serial.invalid_rows == [123]
+    assert np.array_equal(parallel.matrix[parallel.valid_mask], serial.matrix[serial.valid_mask])
+
+
+def test_parse_native_arrow_list_column() -> None:
+    array = pa.chunked_array(
+        [
+            pa.array([[1.0, 2.0, 3.0], [4.0, 5.0, 6.0]], type=pa.list_(pa.float64())),
+            pa.array([None, [7.0, 8.0], [9.0, 10.0, 11.0]], type=pa.list_(pa.float64())),
+        ]
+    )
+
+    parsed = parse_embedding_column(array)
+
+    assert parsed.matrix.shape == (5, 3)
+    assert parsed.invalid_rows == [2, 3]
+    assert parsed.matrix[4].tolist() == [9.0, 10.0, 11.0]
@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+
+import httpx
+import numpy as np
+import pytest
+
+from backend.app.embedding_stub import create_embedding_stub_app
+from backend.search.embedding_providers import (
+    EmbeddingProviderError,
+    LocalHashProvider,
+    OpenAIProvider,
+    create_provider,
+)
+
+
+def test_local_provider_is_deterministic_and_normalized() -> None:
+    provider = LocalHashProvider(dim=64)
+    first = asyncio.run(provider.embed(["道路の老朽化対策", "デジタル化の推進", ""]))
+    second = LocalHashProvider(dim=64).embed_sync(["道路の老朽化対策", "デジタル化の推進", ""])
+
+    assert first.shape == (3, 64) and first.dtype == np.float32
+    assert np.array_equal(first, second)
+    assert np.allclose(np.linalg.norm(first[:2], axis=1), 1.0)
+    assert not first[2].any()
+    assert provider.model == "local-hash-64"
+
+
+def test_local_provider_hashes_off_the_event_loop(monkeypatch) -> None:
+    provider = LocalHashProvider(dim=8)
+    threads: list[int] = []
+    original = provider.embed_sync
+
+    def _record(texts):
+        threads.append(threading.get_ident())
+        return original(texts)
+
+    monkeypatch.setattr(provider, "embed_sync", _record)
+    vectors = asyncio.run(provider.embed(["概要"]))
+
+    assert vectors.shape == (1, 8)
+    assert threads and threads[0] != threading.get_ident()
+
+
+def test_local_provider_scores_overlapping_text_higher() -> None:
+    provider = LocalHashProvider(dim=256)
+    query, near, far = provider.embed_sync(["橋りょうの長寿命化", "橋りょうの長寿命化計画", "観光客の誘致"])
+
+    assert float(query @ near) > float(query @ far)
+
+
+def test_create_provider_selects_by_name() -> None:
+    assert isinstance(create_provider("local", model="unused", dim=8), LocalHashProvider)
+    with pytest.raises(EmbeddingProviderError):
+        create_provider("openai", model="text-embedding-3-small")
+    with pytest.raises(EmbeddingProviderError):
+        create_provider("http", model="text-embedding-3-small")
+    with pytest.raises(EmbeddingProviderError):
+        create_provider("unknown", model="x")
+
+
+def _stub_provider(**options) -> OpenAIProvider:
+    transport = httpx.ASGITransport(app=create_embedding_stub_app(dim=16, **options))
+    return OpenAIProvider("unused", "stub-model", base_url="http://stub/v1", transport=transport, max_inputs=2)
+
+
+def test_stand_in_server_mimics_embeddings_api() -> None:
+    provider = _stub_provider()
+    texts = ["概要", "現状", "概要"]
+
+    async def _run():
+        try:
+            return await provider.embed(texts)
+        finally:
+            await provider.aclose()
+
+    vectors = asyncio.run(_run())
+
+    # Split into calls of two inputs, returned in input order and identical to the local provider
+    assert np.allclose(vectors, LocalHashProvider(dim=16).embed_sync(texts))
+
+
+def test_stand_in_server_injects_failures() -> None:
+    app = create_embedding_stub_app(dim=4, failure_rate=1.0, failure_status=429)
+    transport = httpx.ASGITransport(app=app)
+
+    async def _run():
+        async with httpx.AsyncClient(transport=transport, base_url="http://stub") as client:
+            failed = await client.post("/v1/embeddings", json={"model": "m", "input": "x"})
+            stats = await client.get("/stats")
+        return failed, stats.json()
+
+    failed, stats = asyncio.run(_run())
+
+    assert failed.status_code == 429
+    assert stats == {"requests": 1, "inputs": 0, "failures": 1}
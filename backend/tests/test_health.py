@@ -1,7 +1,10 @@
 from __future__ import annotations
 
+import numpy as np
+import pandas as pd
 from fastapi.testclient import TestClient
 
+from backend import semantic_search
 from backend.app.main import app
 
 
@@ -10,3 +13,38 @@ def test_health_check_returns_ok() -> None:
     response = client.get("/healthz")
     assert response.status_code == 200
     assert response.json() == {"status": "ok"}
+
+
+def test_readiness_reports_not_ready_before_corpus_load(monkeypatch) -> None:
+    monkeypatch.setattr(semantic_search, "_corpus", None)
+    client = TestClient(app)
+    response = client.get("/readyz")
+    assert response.status_code == 503
+    body = response.json()
+    assert body["status"] == "not_ready"
+    assert "progress" in body["corpus"]
+
+
+def test_readiness_reports_corpus_details_when_ready(monkeypatch) -> None:
+    corpus = semantic_search.Corpus(
+        version="v1",
+        base=semantic_search.Segment(
+            "base",
+            pd.DataFrame({"事業名": ["A", "B"]}),
+            np.zeros((2, 4), dtype="float32"),
+            np.zeros((2, 4), dtype="float32"),
+        ),
+    )
+    monkeypatch.setattr(semantic_search, "_corpus", corpus)
+    monkeypatch.setattr(
+        semantic_search,
+        "_load_status",
+        {**semantic_search.get_load_status(), "status": "ready", "rows": 2, "dim": 4, "load_seconds": 0.1},
+    )
+    client = TestClient(app)
+    response = client.get("/readyz")
+    assert response.status_code == 200
+    body = response.json()
+    assert body["status"] == "ready"
+    assert body["corpus"]["rows"] == 2
+    assert body["corpus"]["dim"] == 4
@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from backend.search import ivf
+
+
+def _clustered(rows: int = 400, dim: int = 16, topics: int = 8, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(topics, dim))
+    X = centers[rng.integers(0, topics, size=rows)] + rng.normal(scale=0.3, size=(rows, dim))
+    return (X / np.linalg.norm(X, axis=1, keepdims=True)).astype("float32")
+
+
+def test_build_partitions_every_row_exactly_once() -> None:
+    X = _clustered()
+    index = ivf.build(X, 8)
+
+    assert index.n_lists == 8
+    assert index.offsets[0] == 0 and index.offsets[-1] == X.shape[0]
+    assert np.array_equal(np.sort(index.rows), np.arange(X.shape[0]))
+    assert np.allclose(np.linalg.norm(index.centroids, axis=1), 1.0, atol=1e-5)
+
+
+def test_probing_all_lists_returns_every_row() -> None:
+    X = _clustered()
+    index = ivf.build(X, 8)
+
+    assert np.array_equal(np.sort(index.candidates(X[0], nprobe=8)), np.arange(X.shape[0]))
+    # The nearest list of a stored row contains that row
+    assert 0 in index.candidates(X[0], nprobe=1)
+
+
+def test_probe_extends_until_enough_candidates() -> None:
+    X = _clustered()
+    index = ivf.build(X, 8)
+
+    rows = index.candidates(X[0], nprobe=1, min_candidates=X.shape[0] - 1)
+    assert rows.size >= X.shape[0] - 1
+
+
+def test_pq_candidates_keep_the_exact_top_hits() -> None:
+    X = _clustered(rows=600)
+    index = ivf.build(X, 4, pq_subspaces=4)
+    q = X[10]
+
+    assert index.pq_subspaces == 4 and index.codes.dtype == np.uint8
+    rows = index.candidates(q, nprobe=4, rerank=60)
+    assert rows.size == 60
+    exact_top = np.argsort(-(X @ q))[:5]
+    assert set(exact_top) <= set(rows.tolist())
+
+
+def test_load_or_build_persists_and_reuses_index(tmp_path: Path, monkeypatch) -> None:
+    X = _clustered()
+    built = ivf.load_or_build(tmp_path, "X12_n", X, 8)
+    assert (tmp_path / "X12_n.ivf8" / "meta.json").exists()
+
+    def _fail(*_args, **_kwargs):
+        raise AssertionError("a matching index must be loaded, not rebuilt")
+
+    monkeypatch.setattr(ivf, "build", _fail)
+    loaded = ivf.load_or_build(tmp_path, "X12_n", X, 8)
+
+    assert isinstance(loaded.rows, np.memmap)
+    assert np.array_equal(loaded.rows, built.rows)
+
+
+def test_pq_rejects_subspaces_that_do_not_divide_dim() -> None:
+    with pytest.raises(ValueError):
+        ivf.build(_clustered(dim=10), 4, pq_subspaces=3)
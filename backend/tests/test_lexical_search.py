@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import math
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from backend.search import lexical
+
+DOCS = [
+    "地域防災データ基盤の整備\n自治体の防災情報を共有するデータ基盤を整備する",
+    "観光振興事業\nインバウンド観光の振興",
+    "防災訓練の実施\n地域での防災訓練と観光資源の活用",
+    "",
+    "ＡＩ人材育成\nAI 人材を育成する",
+]
+
+
+def _reference_bm25(docs: list[str], query: str, k1: float = lexical.BM25_K1, b: float = lexical.BM25_B) -> np.ndarray:
+    tokenized = [Counter(lexical.tokenize(doc)) for doc in docs]
+    lengths = np.array([sum(t.values()) for t in tokenized], dtype=float)
+    average = lengths.mean()
+    out = np.zeros(len(docs))
+    for term, qtf in Counter(lexical.tokenize(query)).items():
+        df = sum(1 for t in tokenized if term in t)
+        if df == 0:
+            continue
+        idf = math.log1p((len(docs) - df + 0.5) / (df + 0.5))
+        for i, t in enumerate(tokenized):
+            tf = t.get(term, 0)
+            out[i] += qtf * idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * lengths[i] / average))
+    return out
+
+
+def test_tokenize_uses_normalized_character_bigrams() -> None:
+    assert lexical.tokenize("防災データ") == ["防災", "災デ", "デー", "ータ"]
+    # NFKC folds full-width letters; separators split the text; short parts are kept whole
+    assert lexical.tokenize("ＡＩ、人材") == ["ai", "人材"]
+    assert lexical.tokenize("") == []
+
+
+def test_postings_are_csr_sorted_by_document() -> None:
+    index = lexical.build(DOCS)
+
+    assert index.indptr[0] == 0 and index.indptr[-1] == index.doc_ids.size
+    for term in range(len(index.vocabulary)):
+        docs = index.doc_ids[index.indptr[term] : index.indptr[term + 1]]
+        assert np.all(np.diff(docs) > 0)
+    term = index.vocabulary["防災"]
+    assert index.doc_ids[index.indptr[term] : index.indptr[term + 1]].tolist() == [0, 2]
+
+
+@pytest.mark.parametrize("query", ["防災データ基盤", "観光の振興と防災", "AI人材", "該当なし"])
+def test_vectorized_scores_match_reference_bm25(query: str) -> None:
+    index = lexical.build(DOCS)
+
+    assert np.allclose(index.scores(query), _reference_bm25(DOCS, query), atol=1e-5)
+
+
+def test_top_k_orders_by_score_and_respects_row_subset() -> None:
+    index = lexical.build(DOCS)
+
+    rows, scores = index.top_k("防災", 5)
+    assert rows.tolist() == [2, 0] and np.all(np.diff(scores) <= 0)
+    assert index.top_k("防災", 5, rows=np.array([1, 2]))[0].tolist() == [2]
+    assert index.top_k("該当なし", 5)[0].size == 0
+
+
+def test_reciprocal_rank_fusion_sums_reciprocal_ranks() -> None:
+    keys, scores = lexical.reciprocal_rank_fusion([np.array([3, 1, 2]), np.array([1, 5])], k=60)
+
+    assert keys.tolist() == [1, 3, 5, 2]
+    assert scores[0] == pytest.approx(1 / 62 + 1 / 61)
+    assert scores[1] == pytest.approx(1 / 61)
@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+from backend.search.result_cache import ResultCache
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_entries_expire_after_ttl() -> None:
+    clock = _Clock()
+    cache = ResultCache(4, ttl=10, clock=clock)
+    cache.put("a", {"predicted_budget": 1.0})
+
+    clock.now = 9
+    assert cache.get("a") == {"predicted_budget": 1.0}
+    clock.now = 11
+    assert cache.get("a") is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["expired"]) == (1, 1, 1)
+    assert stats["hit_ratio"] == 0.5
+
+
+def test_least_recently_used_entry_is_evicted() -> None:
+    cache = ResultCache(2, ttl=60)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+    assert cache.stats()["evictions"] == 1
+
+
+def test_returned_values_are_copies_and_clear_invalidates() -> None:
+    cache = ResultCache(2, ttl=60)
+    cache.put("a", {"similar_projects": [{"project_id": "ID-001"}]})
+    cache.get("a")["similar_projects"].clear()
+
+    assert cache.get("a") == {"similar_projects": [{"project_id": "ID-001"}]}
+    cache.clear()
+    assert cache.get("a") is None
+    assert cache.stats()["invalidations"] == 1
+
+
+def test_zero_size_disables_the_cache() -> None:
+    cache = ResultCache(0, ttl=60)
+    cache.put("a", 1)
+
+    assert not cache.enabled and cache.get("a") is None
@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from backend.search.micro_batcher import BatchDeadlineError, BatcherSaturatedError
+from backend.search.search_batcher import SearchBatcher
+
+
+def _fake_search(calls: list[list[int]], delay: float = 0.0):
+    async def search(queries, timeout=None):
+        calls.append(list(queries))
+        await asyncio.sleep(delay)
+        return [{"query": query, "top": query * 10} for query in queries]
+
+    return search
+
+
+def test_concurrent_queries_are_scored_together() -> None:
+    calls: list[list[int]] = []
+    batcher = SearchBatcher(_fake_search(calls), max_wait=0.05)
+
+    async def main():
+        return await asyncio.gather(*(batcher.submit(i) for i in range(5)))
+
+    results = asyncio.run(main())
+
+    assert calls == [[0, 1, 2, 3, 4]]
+    assert [result["top"] for result in results] == [0, 10, 20, 30, 40]
+    stats = batcher.stats()
+    assert (stats["requests"], stats["batches"], stats["queries_per_batch"]) == (5, 1, 5.0)
+
+
+def test_batches_are_capped_and_keep_collecting_while_busy() -> None:
+    calls: list[list[int]] = []
+    batcher = SearchBatcher(_fake_search(calls, delay=0.05), max_batch=2, max_wait=0.01, max_concurrency=1)
+
+    async def main():
+        first = asyncio.ensure_future(batcher.submit(0))
+        await asyncio.sleep(0.02)
+        # Submitted while the first batch is being scored: collected into the next batches
+        rest = await asyncio.gather(*(batcher.submit(i) for i in range(1, 5)))
+        return [await first, *rest]
+
+    results = asyncio.run(main())
+
+    assert calls == [[0], [1, 2], [3, 4]]
+    assert [result["query"] for result in results] == [0, 1, 2, 3, 4]
+
+
+def test_failures_reach_every_caller_in_the_batch() -> None:
+    async def search(queries, timeout=None):
+        raise RuntimeError("executor saturated")
+
+    batcher = SearchBatcher(search, max_wait=0.05)
+
+    async def main():
+        return await asyncio.gather(batcher.submit(1), batcher.submit(2), return_exceptions=True)
+
+    results = asyncio.run(main())
+
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert batcher.stats()["failures"] == 1
+
+
+def test_disabled_batcher_searches_immediately() -> None:
+    calls: list[list[int]] = []
+    batcher = SearchBatcher(_fake_search(calls), max_wait=0)
+
+    async def main():
+        return await asyncio.gather(batcher.submit(1), batcher.submit(2))
+
+    asyncio.run(main())
+
+    assert not batcher.enabled
+    assert calls == [[1], [2]]
+
+
+def test_waiting_queries_are_bounded_and_rejected_without_waiting() -> None:
+    calls: list[list[int]] = []
+    batcher = SearchBatcher(_fake_search(calls, delay=0.05), max_batch=2, max_wait=0.001, max_concurrency=1, max_pending=2)
+
+    async def main():
+        first = asyncio.ensure_future(batcher.submit(0))
+        await asyncio.sleep(0.01)
+        # The only slot is busy: two queries may wait, the third is turned away at once
+        waiting = [asyncio.ensure_future(batcher.submit(i)) for i in (1, 2)]
+        await asyncio.sleep(0)
+        with pytest.raises(BatcherSaturatedError):
+            await batcher.submit(3)
+        return await asyncio.gather(first, *waiting)
+
+    results = asyncio.run(main())
+
+    assert [result["query"] for result in results] == [0, 1, 2]
+    assert calls == [[0], [1, 2]]
+    assert batcher.stats()["rejected"] == 1 and batcher.stats()["pending"] == 0
+
+
+def test_deadline_counts_from_submit_and_expired_queries_are_not_searched() -> None:
+    calls: list[list[int]] = []
+    timeouts: list[float | None] = []
+    search = _fake_search(calls, delay=0.1)
+
+    async def _search(queries, timeout=None):
+        timeouts.append(timeout)
+        return await search(queries)
+
+    batcher = SearchBatcher(_search, max_batch=2, max_wait=0.001, max_concurrency=1)
+
+    async def main():
+        first = asyncio.ensure_future(batcher.submit(0, timeout=1.0))
+        await asyncio.sleep(0.01)
+        # Waits behind the first search and expires before a slot frees up
+        with pytest.raises(BatchDeadlineError):
+            await batcher.submit(1, timeout=0.03)
+        return await first
+
+    assert asyncio.run(main())["query"] == 0
+    assert calls == [[0]]
+    # The search receives what is left of the earliest deadline in the batch
+    assert timeouts[0] is not None and 0.9 < timeouts[0] <= 1.0
+    assert batcher.stats()["expired"] == 1
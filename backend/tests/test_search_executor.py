@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import threading
+
+import pytest
+
+from backend.search.executor import (
+    DeadlineExceededError,
+    ExecutorSaturatedError,
+    SearchExecutor,
+    limit_blas_threads,
+)
+
+
+def test_runs_work_on_dedicated_threads() -> None:
+    executor = SearchExecutor(max_workers=2, max_queue=2)
+
+    names = asyncio.run(executor.run(lambda: threading.current_thread().name))
+
+    assert names.startswith("search")
+    stats = executor.stats()
+    assert (stats["completed"], stats["running"], stats["queued"]) == (1, 0, 0)
+    executor.shutdown()
+
+
+def test_rejects_work_beyond_workers_plus_queue() -> None:
+    executor = SearchExecutor(max_workers=1, max_queue=1)
+    release = threading.Event()
+
+    async def _run():
+        first = asyncio.ensure_future(executor.run(release.wait))
+        second = asyncio.ensure_future(executor.run(lambda: "queued"))
+        await asyncio.sleep(0.01)
+        with pytest.raises(ExecutorSaturatedError):
+            await executor.run(lambda: "rejected")
+        release.set()
+        return await first, await second
+
+    assert asyncio.run(_run()) == (True, "queued")
+    stats = executor.stats()
+    assert (stats["completed"], stats["rejected"]) == (2, 1)
+    executor.shutdown()
+
+
+def test_deadline_drops_queued_work() -> None:
+    executor = SearchExecutor(max_workers=1, max_queue=4)
+    release = threading.Event()
+    ran: list[str] = []
+
+    async def _run():
+        blocker = asyncio.ensure_future(executor.run(release.wait))
+        await asyncio.sleep(0.01)
+        with pytest.raises(DeadlineExceededError):
+            await executor.run(ran.append, "late", timeout=0.05)
+        release.set()
+        await blocker
+
+    asyncio.run(_run())
+
+    # The queued call timed out before a worker picked it up, so it never ran
+    assert ran == []
+    stats = executor.stats()
+    assert (stats["timeouts"], stats["queued"], stats["running"]) == (1, 0, 0)
+    executor.shutdown()
+
+
+def test_limit_blas_threads_sets_environment(monkeypatch) -> None:
+    for name in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS", "BLIS_NUM_THREADS"):
+        monkeypatch.delenv(name, raising=False)
+
+    assert limit_blas_threads(0) == {"threads": None, "applied": False}
+    assert "OMP_NUM_THREADS" not in os.environ
+    assert limit_blas_threads(1)["threads"] == 1
+    assert os.environ["OPENBLAS_NUM_THREADS"] == "1"
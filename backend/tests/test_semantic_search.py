@@ -0,0 +1,630 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend import semantic_search
+from backend.search.filters import SearchFilters
+
+
+def _vector_string(values: np.ndarray) -> str:
+    return "[" + ", ".join(f"{v:.6f}" for v in values) + "]"
+
+
+def _text_or(value, default: str) -> str:
+    if value is None or pd.isna(value):
+        return default
+    return str(value)
+
+
+def _row_payload(row: pd.Series, similarity: float) -> dict:
+    """Reference row-by-row payload that the columnar Segment.project_payloads must reproduce."""
+    budget = row.get("当初予算", None)
+    return {
+        "project_id": _text_or(row.get("予算事業ID", ""), ""),
+        "project_name": _text_or(row.get("事業名", ""), ""),
+        "ministry_name": _text_or(row.get("府省庁", ""), ""),
+        "budget": None if budget is None or pd.isna(budget) else float(budget),
+        "similarity": similarity,
+        "project_overview": _text_or(row.get("事業の概要", "情報なし"), "情報なし"),
+        "project_url": _text_or(row.get("事業概要URL", ""), ""),
+    }
+
+
+def _write_source(path: Path, X1: np.ndarray, X2: np.ndarray, prefix: str = "ID") -> Path:
+    rows = X1.shape[0]
+    frame = pd.DataFrame(
+        {
+            "予算事業ID": [f"{prefix}-{i:03d}" for i in range(rows)],
+            "事業名": [f"事業{i}" for i in range(rows)],
+            "府省庁": ["総務省" if i % 2 == 0 else "内閣府" for i in range(rows)],
+            "年度": [2023 + i % 3 for i in range(rows)],
+            "当初予算": [float(1000 * (i + 1)) for i in range(rows)],
+            "事業の概要": [f"概要{i}" for i in range(rows)],
+            "事業概要URL": [f"https://example.com/{i}" for i in range(rows)],
+            "embedding_sum": [_vector_string(v) for v in X1],
+            "embedding_ass": [_vector_string(v) for v in X2],
+        }
+    )
+    frame.to_parquet(path, index=False)
+    return path
+
+
+@pytest.fixture()
+def source_parquet(tmp_path: Path) -> Path:
+    rng = np.random.default_rng(0)
+    X1 = rng.normal(size=(12, 8)).astype("float32")
+    X2 = rng.normal(size=(12, 8)).astype("float32")
+    return _write_source(tmp_path / "final.parquet", X1, X2)
+
+
+@pytest.fixture()
+def fresh_corpus_state(source_parquet: Path, monkeypatch) -> Path:
+    monkeypatch.setattr(semantic_search, "DATA_FILE_CANDIDATES", [source_parquet])
+    monkeypatch.setattr(semantic_search, "_corpus", None)
+    monkeypatch.setattr(semantic_search, "_load_status", dict(semantic_search._load_status))
+    return source_parquet
+
+
+def test_build_bundle_writes_normalized_vectors_and_manifest(source_parquet: Path) -> None:
+    bundle_dir = semantic_search.build_bundle(source_parquet)
+
+    assert bundle_dir == source_parquet.with_name("final.bundle")
+    manifest = json.loads((bundle_dir / "manifest.json").read_text(encoding="utf-8"))
+    assert manifest["rows"] == 12
+    assert manifest["dim"] == 8
+    assert manifest["source"]["sha256"] == semantic_search._file_sha256(source_parquet)
+
+    metadata, X1, X2 = semantic_search.load_bundle(bundle_dir)
+    assert X1.dtype == np.float32 and X2.dtype == np.float32
+    assert np.allclose(np.linalg.norm(X1, axis=1), 1.0, atol=1e-5)
+    assert "embedding_sum" not in metadata.columns
+    assert list(metadata["予算事業ID"]) == [f"ID-{i:03d}" for i in range(12)]
+
+
+def test_load_corpus_prefers_matching_bundle(source_parquet: Path, monkeypatch) -> None:
+    raw_frame, raw_X1, raw_X2 = semantic_search.load_corpus(source_parquet)
+    semantic_search.build_bundle(source_parquet)
+
+    def _fail(_path):
+        raise AssertionError("source should not be parsed when the bundle matches")
+
+    monkeypatch.setattr(semantic_search, "_read_source", _fail)
+    frame, X1, X2 = semantic_search.load_corpus(source_parquet)
+
+    assert np.allclose(X1, raw_X1)
+    assert np.allclose(X2, raw_X2)
+    assert len(frame) == len(raw_frame)
+
+
+def test_load_corpus_ignores_stale_bundle(source_parquet: Path, monkeypatch) -> None:
+    bundle_dir = semantic_search.build_bundle(source_parquet)
+    manifest_path = bundle_dir / "manifest.json"
+    manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+    manifest["source"]["sha256"] = "0" * 64
+    manifest_path.write_text(json.dumps(manifest), encoding="utf-8")
+
+    calls = []
+    original = semantic_search._read_source
+
+    def _tracking(path):
+        calls.append(path)
+        return original(path)
+
+    monkeypatch.setattr(semantic_search, "_read_source", _tracking)
+    frame, X1, _ = semantic_search.load_corpus(source_parquet)
+
+    assert calls == [source_parquet]
+    assert X1.shape == (12, 8)
+    assert len(frame) == 12
+
+
+def test_load_corpus_skips_malformed_rows(tmp_path: Path, source_parquet: Path) -> None:
+    frame = pd.read_parquet(source_parquet)
+    frame.loc[3, "embedding_sum"] = "[0.1, 0.2, oops]"
+    frame.loc[7, "embedding_ass"] = "[]"
+    broken = tmp_path / "broken.parquet"
+    frame.to_parquet(broken, index=False)
+
+    metadata, X1, X2 = semantic_search.load_corpus(broken)
+
+    assert X1.shape == (10, 8) and X2.shape == (10, 8)
+    assert "ID-003" not in set(metadata["予算事業ID"])
+    assert "ID-007" not in set(metadata["予算事業ID"])
+
+
+def test_load_corpus_maps_bundle_read_only(source_parquet: Path) -> None:
+    frame, X1, X2 = semantic_search.load_corpus(source_parquet)
+
+    assert (source_parquet.parent / "final.bundle" / "manifest.json").exists()
+    assert isinstance(X1, np.memmap) and isinstance(X2, np.memmap)
+    assert not X1.flags.writeable
+    assert len(frame) == X1.shape[0] == 12
+
+
+def test_load_bundle_without_mmap_returns_private_arrays(source_parquet: Path) -> None:
+    bundle_dir = semantic_search.build_bundle(source_parquet)
+
+    _, X1, _ = semantic_search.load_bundle(bundle_dir, mmap=False)
+
+    assert not isinstance(X1, np.memmap)
+    assert X1.flags.writeable
+
+
+def test_background_load_reports_progress_and_footprint(fresh_corpus_state: Path, real_corpus_loader) -> None:
+
+    semantic_search.start_background_load().join(timeout=30)
+
+    status = semantic_search.get_load_status()
+    assert semantic_search.is_ready()
+    assert status["status"] == "ready"
+    assert status["progress"] == 1.0
+    assert status["rows"] == 12 and status["dim"] == 8
+    assert status["memory_bytes"] > 0
+    assert status["load_seconds"] is not None
+
+
+def test_reload_swaps_snapshot_without_disturbing_holders(fresh_corpus_state: Path) -> None:
+    source_parquet = fresh_corpus_state
+
+    first = semantic_search.reload_corpus()
+    held = semantic_search.get_corpus()
+    query = np.asarray(held.X1_n[0], dtype="float32")
+    before = semantic_search.analyze_similarity(query, query, corpus=held)
+
+    frame = pd.read_parquet(source_parquet).iloc[:6]
+    frame.to_parquet(source_parquet, index=False)
+    second = semantic_search.reload_corpus()
+
+    assert first is not None and second is not None
+    assert second.version != first.version
+    assert semantic_search.get_corpus() is second
+    assert semantic_search.get_load_status()["version"] == second.version
+    assert held.rows == 12
+    after_on_old = semantic_search.analyze_similarity(query, query, corpus=held)
+    assert after_on_old == before
+    assert before["corpus_version"] == first.version
+    assert semantic_search.analyze_similarity(query, query)["corpus_version"] == second.version
+
+
+def test_failed_reload_keeps_active_snapshot(fresh_corpus_state: Path, monkeypatch) -> None:
+    active = semantic_search.reload_corpus()
+
+    def _broken(_path):
+        raise ValueError("boom")
+
+    monkeypatch.setattr(semantic_search, "load_corpus", _broken)
+    assert semantic_search.reload_corpus() is None
+
+    status = semantic_search.get_load_status()
+    assert semantic_search.get_corpus() is active
+    assert status["status"] == "ready"
+    assert status["last_reload_error"] == "boom"
+
+
+def test_delta_segments_are_searched_and_compacted(fresh_corpus_state: Path, tmp_path: Path, monkeypatch) -> None:
+    monkeypatch.setattr(semantic_search, "COMPACT_DELTA_ROWS", 10_000)
+    base = semantic_search.reload_corpus()
+    rng = np.random.default_rng(5)
+    X1 = rng.normal(size=(3, 8)).astype("float32")
+    X2 = rng.normal(size=(3, 8)).astype("float32")
+    delta_source = _write_source(tmp_path / "delta.parquet", X1, X2, prefix="NEW")
+
+    with_delta = semantic_search.append_delta(delta_source)
+
+    assert with_delta is not None and len(with_delta.deltas) == 1
+    assert with_delta.rows == base.rows + 3
+    assert with_delta.version != base.version
+    result = semantic_search.analyze_similarity(X1[1], X2[1])
+    assert result["similar_projects"][0]["project_id"] == "NEW-001"
+    assert result["corpus_version"] == with_delta.version
+
+    compacted = semantic_search.compact_segments()
+
+    assert compacted.deltas == () and compacted.rows == with_delta.rows
+    assert compacted.version == with_delta.version
+    assert semantic_search.analyze_similarity(X1[1], X2[1]) == result
+
+    # A restart maps the compacted base and does not apply the folded delta twice
+    restarted = semantic_search.reload_corpus()
+    assert restarted.rows == with_delta.rows
+    assert restarted.deltas == ()
+    assert restarted.version == with_delta.version
+
+
+def test_refresh_deltas_picks_up_segments_written_elsewhere(fresh_corpus_state: Path, tmp_path: Path) -> None:
+    semantic_search.reload_corpus()
+    rng = np.random.default_rng(6)
+    delta_source = _write_source(
+        tmp_path / "delta.parquet",
+        rng.normal(size=(2, 8)).astype("float32"),
+        rng.normal(size=(2, 8)).astype("float32"),
+        prefix="NEW",
+    )
+
+    assert semantic_search.main(["append", str(delta_source), "--source", str(fresh_corpus_state)]) == 0
+    refreshed = semantic_search.refresh_deltas()
+
+    assert len(refreshed.deltas) == 1
+    assert refreshed.rows == 14
+
+
+def test_loaded_metadata_is_compact_and_typed(tmp_path: Path, source_parquet: Path) -> None:
+    frame = pd.read_parquet(source_parquet)
+    frame["備考"] = "payload には使わない列"
+    frame.loc[2, "事業の概要"] = None
+    wide = tmp_path / "wide.parquet"
+    frame.to_parquet(wide, index=False)
+
+    metadata, X1, X2 = semantic_search.load_corpus(wide)
+
+    assert list(metadata.columns) == list(semantic_search.METADATA_COLUMNS)
+    assert isinstance(metadata["府省庁"].dtype, pd.CategoricalDtype)
+    assert metadata["当初予算"].dtype == np.float64
+    assert metadata["事業の概要"].dtype == semantic_search.TEXT_DTYPE
+    segment = semantic_search.Segment("base", metadata, X1, X2)
+    (payload,) = segment.project_payloads(np.array([2]), np.array([0.5]))
+    assert payload["project_overview"] == "情報なし"
+    assert payload["ministry_name"] == "総務省"
+    assert payload["budget"] == 3000.0
+
+
+
+def test_precomputed_payload_columns_match_row_payloads(tmp_path: Path, source_parquet: Path) -> None:
+    frame = pd.read_parquet(source_parquet)
+    frame.loc[1, "事業名"] = None
+    frame.loc[2, "事業の概要"] = None
+    frame.loc[3, "当初予算"] = None
+    frame.loc[4, "府省庁"] = None
+    wide = tmp_path / "gaps.parquet"
+    frame.to_parquet(wide, index=False)
+    metadata, X1, X2 = semantic_search.load_corpus(wide)
+    segment = semantic_search.Segment("base", metadata, X1, X2)
+    rows = np.array([4, 0, 3, 2, 1, 2])
+    sims = np.linspace(0.9, 0.4, len(rows))
+
+    payloads = segment.project_payloads(rows, sims)
+
+    expected = [_row_payload(metadata.iloc[r], float(s)) for r, s in zip(rows, sims)]
+    assert payloads == expected
+    assert [list(payload) for payload in payloads] == [list(payload) for payload in expected]
+    assert payloads[2]["budget"] is None and payloads[0]["ministry_name"] == ""
+
+
+@pytest.mark.parametrize("precision", ["float16", "int8"])
+def test_reduced_precision_search_matches_float32(fresh_corpus_state: Path, monkeypatch, precision: str) -> None:
+    monkeypatch.setattr(semantic_search, "VECTOR_PRECISION", precision)
+    # Even with memory mapping turned off, the float32 matrix used for rescoring stays mapped, not resident
+    monkeypatch.setattr(semantic_search, "MMAP_VECTORS", False)
+    corpus = semantic_search.reload_corpus()
+
+    assert corpus.base.precision == precision
+    assert corpus.base.vector_bytes < corpus.base.X1_n.nbytes + corpus.base.X2_n.nbytes
+    assert isinstance(corpus.base.X12_n, np.memmap)
+    assert corpus.base.resident_vector_bytes == corpus.base.vector_bytes
+    # Quantized copies are written next to the bundle and mapped like the float32 ones
+    assert (fresh_corpus_state.with_name("final.bundle") / f"X12_n.{precision}.npy").exists()
+
+    reports = semantic_search.evaluate_precision(corpus, (precision,), queries=12)
+
+    assert reports[0]["precision"] == "float32"
+    assert reports[1]["precision"] == precision
+    assert reports[1]["top5_overlap"] >= 0.9
+    assert reports[1]["budget_rel_dev_max"] < 0.05
+
+
+def test_bundle_stores_fields_as_one_fused_matrix(source_parquet: Path) -> None:
+    bundle_dir = semantic_search.build_bundle(source_parquet)
+    manifest = json.loads((bundle_dir / "manifest.json").read_text(encoding="utf-8"))
+    assert manifest["vectors"] == {"X12_n": "X12_n.npy"}
+
+    frame, X1, X2 = semantic_search.load_bundle(bundle_dir)
+    segment = semantic_search._make_segment("base", frame, X1, X2, bundle_dir, precision="float32")
+
+    assert segment.X12_n.shape == (12, 16)
+    # The per-field matrices are column views of the mapped fused matrix, not copies
+    assert np.shares_memory(segment.X1_n, segment.X12_n)
+    assert np.shares_memory(segment.X2_n, segment.X12_n)
+    assert isinstance(segment.X12_n, np.memmap)
+
+
+@pytest.mark.parametrize("alpha, beta", [(0.5, 0.5), (0.8, 0.2)])
+def test_fused_scores_match_two_pass_blend(alpha: float, beta: float) -> None:
+    rng = np.random.default_rng(3)
+    X1 = semantic_search.normalize_rows(rng.normal(size=(20, 8)).astype("float32"))
+    X2 = semantic_search.normalize_rows(rng.normal(size=(20, 8)).astype("float32"))
+    Q1 = semantic_search.normalize_rows(rng.normal(size=(3, 8)).astype("float32"))
+    Q2 = semantic_search.normalize_rows(rng.normal(size=(3, 8)).astype("float32"))
+
+    fused = semantic_search._make_segment("base", pd.DataFrame(index=range(20)), X1, X2, precision="float32")
+    unfused = semantic_search.Segment("base", fused.df, X1, X2)
+
+    expected = semantic_search.blended_scores(unfused, Q1, Q2, alpha, beta)
+    actual = semantic_search.blended_scores(fused, Q1, Q2, alpha, beta)
+
+    assert actual.shape == (3, 20)
+    assert np.allclose(actual, expected, atol=1e-5)
+
+
+def test_score_weights_are_read_from_settings(fresh_corpus_state: Path, monkeypatch) -> None:
+    corpus = semantic_search.reload_corpus()
+    query_1 = np.asarray(corpus.X1_n[4], dtype="float32")
+    query_2 = -np.asarray(corpus.X2_n[4], dtype="float32")
+
+    monkeypatch.setattr(semantic_search, "SCORE_ALPHA", 1.0)
+    monkeypatch.setattr(semantic_search, "SCORE_BETA", 0.0)
+    result = semantic_search.analyze_similarity(query_1, query_2, corpus=corpus)
+
+    assert result["similar_projects"][0]["project_id"] == "ID-004"
+    assert result["similar_projects"][0]["similarity"] == pytest.approx(1.0, abs=1e-5)
+
+
+def test_batch_analysis_matches_single_query_results(fresh_corpus_state: Path, tmp_path: Path) -> None:
+    semantic_search.reload_corpus()
+    rng = np.random.default_rng(5)
+    delta_X1 = rng.normal(size=(4, 8)).astype("float32")
+    delta_X2 = rng.normal(size=(4, 8)).astype("float32")
+    _write_source(tmp_path / "delta.parquet", delta_X1, delta_X2, prefix="NEW")
+    corpus = semantic_search.append_delta(tmp_path / "delta.parquet")
+    Q1 = rng.normal(size=(6, 8)).astype("float32")
+    Q2 = rng.normal(size=(6, 8)).astype("float32")
+
+    batch = semantic_search.analyze_similarity_batch(Q1, Q2, corpus=corpus)
+
+    assert len(batch) == 6
+    for q, result in enumerate(batch):
+        single = semantic_search.analyze_similarity(Q1[q], Q2[q], corpus=corpus)
+        assert [p["project_id"] for p in result["similar_projects"]] == [p["project_id"] for p in single["similar_projects"]]
+        assert result["predicted_budget"] == pytest.approx(single["predicted_budget"])
+        assert result["corpus_version"] == corpus.version
+
+
+def test_predict_budgets_matches_scalar_helpers() -> None:
+    sims = np.array([[0.9, 0.8, 0.7, 0.1], [0.5, 0.4, 0.3, 0.2], [0.9, 0.2, 0.1, 0.0]])
+    budgets = np.array([[100.0, 200.0, np.nan, 50.0], [0.0, -1.0, np.nan, np.nan], [10.0, 0.0, 30.0, 40.0]])
+
+    predicted = semantic_search.predict_budgets(sims, budgets)
+
+    for row in (0, 2):
+        valid = np.isfinite(budgets[row]) & (budgets[row] > 0)
+        weights = semantic_search.softmax_1d(sims[row][valid], tau=semantic_search.TAU)
+        expected = semantic_search.weighted_log_mean(budgets[row][valid], weights)
+        assert predicted[row] == pytest.approx(expected)
+    assert np.isnan(predicted[1])
+
+
+def test_ivf_index_is_built_with_the_corpus_and_used_for_search(fresh_corpus_state: Path, monkeypatch) -> None:
+    monkeypatch.setattr(semantic_search, "IVF_LISTS", 3)
+    monkeypatch.setattr(semantic_search, "IVF_MIN_ROWS", 0)
+    monkeypatch.setattr(semantic_search, "IVF_NPROBE", 1)
+    corpus = semantic_search.reload_corpus()
+
+    assert corpus.base.index is not None and corpus.base.index.n_lists == 3
+    assert (fresh_corpus_state.with_name("final.bundle") / "X12_n.ivf3").is_dir()
+    assert semantic_search.get_load_status()["index"]["lists"] == 3
+
+    calls = []
+    original = semantic_search._rerank_top_k
+    monkeypatch.setattr(semantic_search, "_rerank_top_k", lambda *args: calls.append(args) or original(*args))
+    query_1 = np.asarray(corpus.X1_n[7], dtype="float32")
+    query_2 = np.asarray(corpus.X2_n[7], dtype="float32")
+
+    approx = semantic_search.analyze_similarity(query_1, query_2, corpus=corpus)
+    assert calls
+    assert approx["similar_projects"][0]["project_id"] == "ID-007"
+
+    # Probing every list re-ranks the whole segment, so it matches exact search
+    full = semantic_search.analyze_similarity(query_1, query_2, corpus=corpus, nprobe=3)
+    exact = semantic_search.analyze_similarity(query_1, query_2, corpus=corpus, nprobe=0)
+    assert [p["project_id"] for p in full["similar_projects"]] == [p["project_id"] for p in exact["similar_projects"]]
+    assert full["predicted_budget"] == pytest.approx(exact["predicted_budget"])
+
+
+def test_evaluate_index_reports_recall_against_exact(fresh_corpus_state: Path) -> None:
+    corpus = semantic_search.with_index(semantic_search.reload_corpus(), 3)
+
+    reports = semantic_search.evaluate_index(corpus, (1, 3), queries=12)
+
+    assert [r["nprobe"] for r in reports] == [0, 1, 3]
+    assert reports[-1]["recall_at_5"] == 1.0
+    assert 0.0 <= reports[1]["recall_at_5"] <= 1.0
+
+
+def test_binary_prefilter_reranks_candidates_exactly(fresh_corpus_state: Path, monkeypatch) -> None:
+    monkeypatch.setattr(semantic_search, "BINARY_POOL", 6)
+    corpus = semantic_search.reload_corpus()
+
+    assert corpus.base.signs is not None
+    assert (fresh_corpus_state.with_name("final.bundle") / "X12_n.sign.npy").exists()
+    assert semantic_search.get_load_status()["prefilter"]["type"] == "binary"
+
+    query_1 = np.asarray(corpus.X1_n[3], dtype="float32")
+    query_2 = np.asarray(corpus.X2_n[3], dtype="float32")
+    filtered = semantic_search.analyze_similarity(query_1, query_2, corpus=corpus)
+    exact = semantic_search.analyze_similarity(query_1, query_2, corpus=corpus, binary_pool=0)
+
+    assert filtered["similar_projects"][0]["project_id"] == "ID-003"
+    # Re-ranked similarities are exact cosine blends, not Hamming estimates
+    assert filtered["similar_projects"][0]["similarity"] == pytest.approx(exact["similar_projects"][0]["similarity"])
+
+    reports = semantic_search.evaluate_binary(corpus, (6, 12), queries=12)
+    assert [r["pool"] for r in reports] == [0, 6, 12]
+    assert reports[-1]["recall_at_5"] == 1.0
+
+
+def test_truncated_coarse_pass_reranks_on_full_dimensions(fresh_corpus_state: Path, monkeypatch) -> None:
+    monkeypatch.setattr(semantic_search, "TRUNCATE_DIM", 4)
+    monkeypatch.setattr(semantic_search, "TRUNCATE_POOL", 6)
+    corpus = semantic_search.reload_corpus()
+
+    assert corpus.base.X12_t is not None and corpus.base.X12_t.shape == (12, 8)
+    assert (fresh_corpus_state.with_name("final.bundle") / "X12_n.t4.npy").exists()
+    assert semantic_search.get_load_status()["prefilter"] == {
+        "type": "truncated",
+        "dim": 4,
+        "pool": 6,
+        "bytes": corpus.base.X12_t.nbytes,
+    }
+
+    Q1 = np.asarray(corpus.X1_n[[2, 5]], dtype="float32")
+    Q2 = np.asarray(corpus.X2_n[[2, 5]], dtype="float32")
+    coarse = semantic_search.analyze_similarity_batch(Q1, Q2, corpus=corpus)
+    exact = semantic_search.analyze_similarity_batch(Q1, Q2, corpus=corpus, coarse_pool=0)
+
+    assert [r["similar_projects"][0]["project_id"] for r in coarse] == ["ID-002", "ID-005"]
+    for got, want in zip(coarse, exact):
+        assert got["similar_projects"][0]["similarity"] == pytest.approx(want["similar_projects"][0]["similarity"])
+
+    reports = semantic_search.evaluate_truncation(corpus, dims=(4,), pools=(6, 12), queries=12)
+    assert [(r["dim"], r["pool"]) for r in reports] == [(8, 0), (4, 6), (4, 12)]
+    assert reports[-1]["recall_at_5"] == 1.0
+
+
+@pytest.mark.parametrize("precision", ["float32", "int8"])
+def test_filtered_search_scores_only_matching_rows(fresh_corpus_state: Path, monkeypatch, precision: str) -> None:
+    monkeypatch.setattr(semantic_search, "VECTOR_PRECISION", precision)
+    corpus = semantic_search.reload_corpus()
+    filters = SearchFilters(ministries=("総務省",), fiscal_years=(2023, 2024), budget_min=2000, budget_max=9000)
+    # 総務省 = even rows, 2023/2024 = i % 3 != 2, budget 2000..9000 = rows 1..8
+    expected = {f"ID-{i:03d}" for i in (4, 6)}
+
+    query_1 = np.asarray(corpus.X1_n[4], dtype="float32")
+    query_2 = np.asarray(corpus.X2_n[4], dtype="float32")
+    result = semantic_search.analyze_similarity(query_1, query_2, corpus=corpus, filters=filters)
+
+    assert {p["project_id"] for p in result["similar_projects"]} == expected
+    assert result["similar_projects"][0]["project_id"] == "ID-004"
+    assert result["matched_rows"] == 2
+    assert result["ministry_facets"] == {"総務省": 2}
+
+    unfiltered = semantic_search.analyze_similarity(query_1, query_2, corpus=corpus)
+    assert unfiltered["matched_rows"] == 12
+    assert unfiltered["ministry_facets"] == {"内閣府": 6, "総務省": 6}
+    assert result["similar_projects"][0]["similarity"] == pytest.approx(unfiltered["similar_projects"][0]["similarity"])
+
+    # Repeating a ministry or year must not repeat its rows
+    repeated = SearchFilters(
+        ministries=("総務省", "総務省"), fiscal_years=(2023, 2024, 2023), budget_min=2000, budget_max=9000
+    )
+    twice = semantic_search.analyze_similarity(query_1, query_2, corpus=corpus, filters=repeated)
+    assert [p["project_id"] for p in twice["similar_projects"]] == [p["project_id"] for p in result["similar_projects"]]
+    assert twice["matched_rows"] == 2 and twice["ministry_facets"] == {"総務省": 2}
+    rows = corpus.base.partitions.select(SearchFilters(ministries=("総務省", "総務省")))
+    assert rows.tolist() == sorted(set(rows.tolist())) and rows.size == 6
+
+    nothing = semantic_search.analyze_similarity(
+        query_1, query_2, corpus=corpus, filters=SearchFilters(ministries=("存在しない省",))
+    )
+    assert nothing["similar_projects"] == [] and nothing["predicted_budget"] is None
+    assert nothing["matched_rows"] == 0 and nothing["ministry_facets"] == {}
+
+
+def test_batch_filters_are_applied_per_query(fresh_corpus_state: Path, tmp_path: Path) -> None:
+    semantic_search.reload_corpus()
+    rng = np.random.default_rng(9)
+    _write_source(
+        tmp_path / "delta.parquet",
+        rng.normal(size=(4, 8)).astype("float32"),
+        rng.normal(size=(4, 8)).astype("float32"),
+        prefix="NEW",
+    )
+    corpus = semantic_search.append_delta(tmp_path / "delta.parquet")
+    Q1 = rng.normal(size=(3, 8)).astype("float32")
+    Q2 = rng.normal(size=(3, 8)).astype("float32")
+    cabinet = SearchFilters(ministries=("内閣府",))
+
+    batch = semantic_search.analyze_similarity_batch(Q1, Q2, corpus=corpus, filters=[cabinet, None, cabinet])
+
+    # Facets cover the base snapshot and the delta segment
+    assert batch[0]["ministry_facets"] == {"内閣府": 8}
+    assert batch[1]["ministry_facets"] == {"内閣府": 8, "総務省": 8}
+    for q in (0, 2):
+        assert {p["ministry_name"] for p in batch[q]["similar_projects"]} == {"内閣府"}
+        single = semantic_search.analyze_similarity(Q1[q], Q2[q], corpus=corpus, filters=cabinet)
+        assert [p["project_id"] for p in batch[q]["similar_projects"]] == [p["project_id"] for p in single["similar_projects"]]
+
+
+def test_hybrid_search_fuses_lexical_and_dense_rankings(fresh_corpus_state: Path) -> None:
+    corpus = semantic_search.reload_corpus()
+    assert corpus.base.lexical is not None
+    assert semantic_search.get_load_status()["lexical"]["type"] == "bm25"
+
+    query_1 = np.asarray(corpus.X1_n[4], dtype="float32")
+    query_2 = np.asarray(corpus.X2_n[4], dtype="float32")
+    hybrid = semantic_search.analyze_similarity(query_1, query_2, corpus=corpus, query_text="要7")
+    dense = semantic_search.analyze_similarity(query_1, query_2, corpus=corpus)
+
+    assert hybrid["retrieval_mode"] == "hybrid" and dense["retrieval_mode"] == "dense"
+    ids = [p["project_id"] for p in hybrid["similar_projects"]]
+    # Top of each leg ranks first in both fused lists: dense hit and lexical hit
+    assert set(ids[:2]) == {"ID-004", "ID-007"}
+    top = hybrid["similar_projects"][ids.index("ID-004")]
+    assert top["similarity"] == pytest.approx(dense["similar_projects"][0]["similarity"], abs=1e-5)
+    assert top["score_embed"] == pytest.approx(top["similarity"])
+    # Every fused hit carries its exact blended cosine, whichever leg found it
+    for project in hybrid["similar_projects"]:
+        row = int(project["project_id"].split("-")[1])
+        expected = semantic_search.SCORE_ALPHA * float(np.asarray(corpus.X1_n[row]) @ query_1) + (
+            semantic_search.SCORE_BETA * float(np.asarray(corpus.X2_n[row]) @ query_2)
+        )
+        assert project["score_embed"] == pytest.approx(expected, abs=1e-5)
+    assert hybrid["similar_projects"][ids.index("ID-007")]["score_bm25"] > 0
+    assert all(p["score_rrf"] > 0 for p in hybrid["similar_projects"])
+    assert "score_rrf" not in dense["similar_projects"][0]
+
+
+def test_lexical_only_mode_works_without_query_vectors(fresh_corpus_state: Path) -> None:
+    corpus = semantic_search.reload_corpus()
+
+    result = semantic_search.analyze_similarity(None, None, corpus=corpus, query_text="事業3の概要3")
+
+    assert result["retrieval_mode"] == "lexical"
+    assert result["similar_projects"][0]["project_id"] == "ID-003"
+    assert result["similar_projects"][0]["similarity"] == pytest.approx(1.0)
+    assert result["similar_projects"][0]["score_embed"] is None
+    assert result["predicted_budget"] is not None
+
+    filtered = semantic_search.analyze_similarity(
+        None, None, corpus=corpus, query_text="事業3の概要3", filters=SearchFilters(ministries=("総務省",))
+    )
+    assert {p["ministry_name"] for p in filtered["similar_projects"]} == {"総務省"}
+
+    with pytest.raises(ValueError):
+        semantic_search.analyze_similarity(None, None, corpus=corpus)
+
+
+def test_repeated_analyses_are_served_from_the_result_cache(fresh_corpus_state: Path, monkeypatch) -> None:
+    monkeypatch.setattr(semantic_search, "_result_cache", semantic_search.ResultCache(16, ttl=60))
+    corpus = semantic_search.reload_corpus()
+    calls = []
+    search_group = semantic_search._search_group
+    monkeypatch.setattr(
+        semantic_search, "_search_group", lambda *args, **kwargs: calls.append(1) or search_group(*args, **kwargs)
+    )
+    query_1 = np.asarray(corpus.X1_n[3], dtype="float32")
+    query_2 = np.asarray(corpus.X2_n[3], dtype="float32")
+
+    first = semantic_search.analyze_similarity(query_1, query_2)
+    second = semantic_search.analyze_similarity(query_1 * 2, query_2)  # same direction after normalization
+    assert second == first and len(calls) == 1
+    assert semantic_search.get_result_cache_stats()["hit_ratio"] == 0.5
+
+    # Any input that changes the result is part of the key
+    monkeypatch.setattr(semantic_search, "SCORE_ALPHA", 0.7)
+    semantic_search.analyze_similarity(query_1, query_2)
+    semantic_search.analyze_similarity(query_1, query_2, filters=SearchFilters(ministries=("総務省",)))
+    assert len(calls) == 3
+
+    # Derived corpora (evaluation variants) share the version but are never cached
+    semantic_search.analyze_similarity(query_1, query_2, corpus=semantic_search.with_precision(corpus, "int8"))
+    assert len(calls) == 4
+
+    # Reloading swaps the snapshot and drops cached results
+    semantic_search.reload_corpus()
+    assert semantic_search.get_result_cache_stats()["items"] == 0
+    semantic_search.analyze_similarity(query_1, query_2)
+    assert len(calls) == 5
@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from backend.search.singleflight import SingleFlight
+
+
+def test_concurrent_calls_share_one_execution() -> None:
+    flights = SingleFlight()
+    calls: list[str] = []
+
+    async def work(name: str):
+        calls.append(name)
+        await asyncio.sleep(0.02)
+        return {"history_id": len(calls)}
+
+    async def main():
+        return await asyncio.gather(
+            flights.do("same", lambda: work("a")),
+            flights.do("same", lambda: work("b")),
+            flights.do("other", lambda: work("c")),
+        )
+
+    (first, first_shared), (second, second_shared), (other, _) = asyncio.run(main())
+
+    assert calls == ["a", "c"]
+    assert first is second and (first_shared, second_shared) == (False, True)
+    assert other["history_id"] == 2
+    stats = flights.stats()
+    assert (stats["calls"], stats["executions"], stats["shared"], stats["inflight"]) == (3, 2, 1, 0)
+
+
+def test_failures_reach_every_caller_and_are_not_kept() -> None:
+    now = [0.0]
+    flights = SingleFlight(linger=10.0, clock=lambda: now[0])
+    attempts: list[int] = []
+
+    async def fail():
+        attempts.append(1)
+        await asyncio.sleep(0.01)
+        raise RuntimeError("search failed")
+
+    async def main():
+        results = await asyncio.gather(flights.do("k", fail), flights.do("k", fail), return_exceptions=True)
+        with pytest.raises(RuntimeError):
+            await flights.do("k", fail)
+        return results
+
+    results = asyncio.run(main())
+
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert len(attempts) == 2  # the retry after the failure runs again
+
+
+def test_recent_results_are_reused_within_linger_window() -> None:
+    now = [0.0]
+    flights = SingleFlight(linger=2.0, clock=lambda: now[0])
+    calls: list[int] = []
+
+    async def work():
+        calls.append(1)
+        return len(calls)
+
+    async def run():
+        return await flights.do("k", work)
+
+    assert asyncio.run(run()) == (1, False)
+    now[0] = 1.5
+    assert asyncio.run(run()) == (1, True)
+    now[0] = 4.0
+    assert asyncio.run(run()) == (2, False)
@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import numpy as np
+
+from backend.search import truncation
+
+
+def _unit(rows: int, dim: int, seed: int) -> np.ndarray:
+    X = np.random.default_rng(seed).normal(size=(rows, dim))
+    return (X / np.linalg.norm(X, axis=1, keepdims=True)).astype("float32")
+
+
+def test_truncate_renormalizes_each_field_prefix() -> None:
+    X1, X2 = _unit(30, 64, 0), _unit(30, 64, 1)
+
+    X_t = truncation.truncate(X1, X2, 16, block_rows=7)
+
+    assert X_t.shape == (30, 32) and X_t.dtype == np.float32
+    assert np.allclose(np.linalg.norm(X_t[:, :16], axis=1), 1.0, atol=1e-5)
+    assert np.allclose(np.linalg.norm(X_t[:, 16:], axis=1), 1.0, atol=1e-5)
+    # Direction of the kept prefix is unchanged
+    assert np.allclose(X_t[:, :16] * np.linalg.norm(X1[:, :16], axis=1, keepdims=True), X1[:, :16], atol=1e-5)
+
+
+def test_candidates_rank_all_queries_in_one_pass() -> None:
+    X1, X2 = _unit(100, 64, 2), _unit(100, 64, 3)
+    X_t = truncation.truncate(X1, X2, 32)
+    queries = truncation.truncated_query(X1[[4, 9]], X2[[4, 9]], 32, 0.5, 0.5)
+
+    pools = truncation.candidates(X_t, queries, pool=5)
+
+    assert pools.shape == (2, 5)
+    assert 4 in pools[0] and 9 in pools[1]
+    assert truncation.candidates(X_t, queries, pool=500).shape == (2, 100)
+
+
+def test_load_or_build_persists_the_truncated_matrix(tmp_path: Path) -> None:
+    X1, X2 = _unit(20, 64, 4), _unit(20, 64, 5)
+
+    built = truncation.load_or_build(tmp_path, "X12_n", X1, X2, 16)
+    loaded = truncation.load_or_build(tmp_path, "X12_n", X1, X2, 16)
+
+    assert (tmp_path / "X12_n.t16.npy").exists()
+    assert isinstance(loaded, np.memmap)
+    assert np.array_equal(loaded, built)
@@ -0,0 +1,29 @@
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from backend.search.precision import quantize
+
+
+@pytest.mark.parametrize("precision, tolerance", [("float16", 1e-3), ("int8", 1e-2)])
+def test_quantized_dot_matches_float32(precision: str, tolerance: float) -> None:
+    rng = np.random.default_rng(3)
+    X = rng.normal(size=(50, 32)).astype("float32")
+    X /= np.linalg.norm(X, axis=1, keepdims=True)
+    Q = rng.normal(size=(3, 32)).astype("float32")
+    Q /= np.linalg.norm(Q, axis=1, keepdims=True)
+
+    quantized = quantize(X, precision)
+
+    assert quantized.precision == precision
+    assert quantized.nbytes < X.nbytes
+    scores = quantized.dot(Q, block_rows=16)
+    assert scores.dtype == np.float32
+    assert np.allclose(scores, Q @ X.T, atol=tolerance)
+
+
+def test_int8_handles_zero_rows() -> None:
+    X = np.zeros((2, 4), dtype="float32")
+    quantized = quantize(X, "int8")
+    assert np.array_equal(quantized.to_float32(), X)
@@ -28,6 +28,8 @@ class PolicyBudgetSimulator {
         this.budgetInsights = null;
         this.serverEstimatedBudget = null;
         this.proposedBudget = null;
+        // 分析の二重送信（Enter の連打・ボタンの再押下）を防ぐ
+        this.analysisInFlight = false;
         this.currentOptionDetail = null;
         this.currentOptionId = null;
         this.currentOptionVersionId = null;
@@ -875,6 +877,9 @@ class PolicyBudgetSimulator {
     }
 
     async handleFormSubmit() {
+        if (this.analysisInFlight) {
+            return;
+        }
         const form = document.getElementById('projectForm');
         const formData = new FormData(form);
         const projectData = {
@@ -898,6 +903,7 @@ class PolicyBudgetSimulator {
         this.currentInput = projectData;
 
         const analyzeBtn = document.getElementById('analyzeBtn');
+        this.analysisInFlight = true;
         analyzeBtn.disabled = true;
         analyzeBtn.innerHTML = '<i class="fas fa-spinner fa-spin"></i> 分析中...';
 
@@ -959,6 +965,7 @@ class PolicyBudgetSimulator {
             this.budgetInsights = this.calculateBudgetInsights();
             this.updateKpiSection();
         } finally {
+            this.analysisInFlight = false;
             analyzeBtn.disabled = false;
             analyzeBtn.innerHTML = '<i class="fas fa-search"></i> 比較分析を実行';
         }